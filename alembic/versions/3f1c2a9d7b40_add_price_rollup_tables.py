@@ -0,0 +1,72 @@
+"""Add price rollup tables
+
+Revision ID: 3f1c2a9d7b40
+Revises: bbde51518499
+Create Date: 2026-10-19 10:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b40'
+down_revision: Union[str, Sequence[str], None] = 'bbde51518499'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLLUPS = {
+    'price_rollup_hourly': 'hour',
+    'price_rollup_daily': 'day',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, trunc in ROLLUPS.items():
+        op.create_table(table_name,
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('marketplace', sa.String(), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('open', sa.Float(), nullable=False),
+        sa.Column('high', sa.Float(), nullable=False),
+        sa.Column('low', sa.Float(), nullable=False),
+        sa.Column('close', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('opened_at', sa.DateTime(), nullable=False),
+        sa.Column('closed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'marketplace', 'bucket')
+        )
+
+        # Заполняем свечи по уже накопленной истории
+        op.execute(f"""
+            INSERT INTO {table_name}
+                (product_id, marketplace, bucket, open, high, low, close, count, opened_at, closed_at)
+            SELECT
+                product_id,
+                marketplace,
+                date_trunc('{trunc}', created_at),
+                (array_agg(price ORDER BY created_at ASC, id ASC))[1],
+                max(price),
+                min(price),
+                (array_agg(price ORDER BY created_at DESC, id DESC))[1],
+                count(*),
+                min(created_at),
+                max(created_at)
+            FROM price_history
+            WHERE product_id IS NOT NULL
+              AND marketplace IS NOT NULL
+              AND price IS NOT NULL
+              AND created_at IS NOT NULL
+            GROUP BY product_id, marketplace, date_trunc('{trunc}', created_at)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ROLLUPS:
+        op.drop_table(table_name)
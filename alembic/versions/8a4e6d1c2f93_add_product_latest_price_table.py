@@ -0,0 +1,53 @@
+"""Add product_latest_price table
+
+Revision ID: 8a4e6d1c2f93
+Revises: 3f1c2a9d7b40
+Create Date: 2026-10-19 11:20:47.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e6d1c2f93'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9d7b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('product_latest_price',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('availability', sa.Boolean(), nullable=False),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'marketplace')
+    )
+    op.create_index(op.f('ix_product_latest_price_observed_at'), 'product_latest_price', ['observed_at'], unique=False)
+
+    # Заполняем текущие цены по уже накопленной истории
+    op.execute("""
+        INSERT INTO product_latest_price
+            (product_id, marketplace, price, currency, availability, observed_at)
+        SELECT DISTINCT ON (product_id, marketplace)
+            product_id, marketplace, price, coalesce(currency, 'RUB'), TRUE, created_at
+        FROM price_history
+        WHERE product_id IS NOT NULL
+          AND marketplace IS NOT NULL
+          AND price IS NOT NULL
+          AND created_at IS NOT NULL
+        ORDER BY product_id, marketplace, created_at DESC, id DESC
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_product_latest_price_observed_at'), table_name='product_latest_price')
+    op.drop_table('product_latest_price')
@@ -0,0 +1,48 @@
+"""Add price analytics summary table
+
+Revision ID: a5e3c9d1f762
+Revises: f4b2d8e6a193
+Create Date: 2026-10-19 17:48:30.542917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5e3c9d1f762'
+down_revision: Union[str, Sequence[str], None] = 'f4b2d8e6a193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_analytics_summary',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('window_days', sa.Integer(), nullable=False),
+    sa.Column('observations', sa.Integer(), nullable=False),
+    sa.Column('first_price', sa.Float(), nullable=False),
+    sa.Column('last_price', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=False),
+    sa.Column('max_price', sa.Float(), nullable=False),
+    sa.Column('mean_price', sa.Float(), nullable=False),
+    sa.Column('moving_average_short', sa.Float(), nullable=False),
+    sa.Column('moving_average_long', sa.Float(), nullable=False),
+    sa.Column('change_percent', sa.Float(), nullable=False),
+    sa.Column('volatility', sa.Float(), nullable=False),
+    sa.Column('trend_per_day', sa.Float(), nullable=False),
+    sa.Column('period_start', sa.DateTime(), nullable=False),
+    sa.Column('period_end', sa.DateTime(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'marketplace', 'window_days')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_analytics_summary')
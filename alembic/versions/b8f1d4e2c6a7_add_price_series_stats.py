@@ -0,0 +1,105 @@
+"""Add price series stats table
+
+Revision ID: b8f1d4e2c6a7
+Revises: a5e3c9d1f762
+Create Date: 2026-10-19 18:32:11.204615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f1d4e2c6a7'
+down_revision: Union[str, Sequence[str], None] = 'a5e3c9d1f762'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Должно совпадать с PRICE_STATS_WINDOW_DAYS на момент миграции
+WINDOW_SECONDS = 7 * 86400
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_series_stats',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('m2', sa.Float(), nullable=False),
+    sa.Column('ewma', sa.Float(), nullable=False),
+    sa.Column('ewm_variance', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=False),
+    sa.Column('max_price', sa.Float(), nullable=False),
+    sa.Column('window_started_at', sa.DateTime(), nullable=False),
+    sa.Column('window_min', sa.Float(), nullable=False),
+    sa.Column('window_max', sa.Float(), nullable=False),
+    sa.Column('prev_window_min', sa.Float(), nullable=True),
+    sa.Column('prev_window_max', sa.Float(), nullable=True),
+    sa.Column('last_price', sa.Float(), nullable=False),
+    sa.Column('first_observed_at', sa.DateTime(), nullable=False),
+    sa.Column('last_observed_at', sa.DateTime(), nullable=False),
+    sa.Column('last_changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'marketplace')
+    )
+
+    # Заполняем по накопленной истории. EWMA начинается с последней цены,
+    # а экспоненциальная дисперсия — с обычной: дальше их ведут записи цен
+    op.execute(f"""
+        WITH history AS (
+            SELECT product_id, marketplace, price, created_at,
+                   to_timestamp(floor(extract(epoch FROM created_at) / {WINDOW_SECONDS}) * {WINDOW_SECONDS})
+                       AT TIME ZONE 'UTC' AS bucket,
+                   lag(price) OVER w AS previous_price
+            FROM price_history
+            WHERE product_id IS NOT NULL
+              AND marketplace IS NOT NULL
+              AND price IS NOT NULL
+              AND created_at IS NOT NULL
+            WINDOW w AS (PARTITION BY product_id, marketplace ORDER BY created_at, id)
+        ),
+        series AS (
+            SELECT product_id, marketplace,
+                   count(*) AS count,
+                   avg(price) AS mean,
+                   coalesce(var_samp(price) * (count(*) - 1), 0) AS m2,
+                   coalesce(var_pop(price), 0) AS variance,
+                   min(price) AS min_price,
+                   max(price) AS max_price,
+                   max(bucket) AS window_started_at,
+                   (array_agg(price ORDER BY created_at DESC))[1] AS last_price,
+                   min(created_at) AS first_observed_at,
+                   max(created_at) AS last_observed_at,
+                   coalesce(max(created_at) FILTER (WHERE previous_price IS DISTINCT FROM price), min(created_at))
+                       AS last_changed_at
+            FROM history
+            GROUP BY product_id, marketplace
+        )
+        INSERT INTO price_series_stats
+            (product_id, marketplace, count, mean, m2, ewma, ewm_variance, min_price, max_price,
+             window_started_at, window_min, window_max, prev_window_min, prev_window_max,
+             last_price, first_observed_at, last_observed_at, last_changed_at)
+        SELECT s.product_id, s.marketplace, s.count, s.mean, s.m2, s.last_price, s.variance,
+               s.min_price, s.max_price, s.window_started_at,
+               cur.low, cur.high, prev.low, prev.high,
+               s.last_price, s.first_observed_at, s.last_observed_at, s.last_changed_at
+        FROM series s
+        CROSS JOIN LATERAL (
+            SELECT min(h.price) AS low, max(h.price) AS high FROM history h
+            WHERE h.product_id = s.product_id AND h.marketplace = s.marketplace
+              AND h.bucket = s.window_started_at
+        ) cur
+        CROSS JOIN LATERAL (
+            SELECT min(h.price) AS low, max(h.price) AS high FROM history h
+            WHERE h.product_id = s.product_id AND h.marketplace = s.marketplace
+              AND h.bucket = s.window_started_at - interval '{WINDOW_SECONDS} seconds'
+        ) prev
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_series_stats')
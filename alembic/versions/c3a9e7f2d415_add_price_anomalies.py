@@ -0,0 +1,48 @@
+"""Add price anomalies table
+
+Revision ID: c3a9e7f2d415
+Revises: b8f1d4e2c6a7
+Create Date: 2026-10-19 19:05:47.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9e7f2d415'
+down_revision: Union[str, Sequence[str], None] = 'b8f1d4e2c6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_anomalies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('baseline', sa.Float(), nullable=False),
+    sa.Column('std_dev', sa.Float(), nullable=False),
+    sa.Column('z_score', sa.Float(), nullable=True),
+    sa.Column('change_percent', sa.Float(), nullable=False),
+    sa.Column('rule', sa.String(), nullable=False),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_price_anomalies_id'), 'price_anomalies', ['id'], unique=False)
+    op.create_index(op.f('ix_price_anomalies_observed_at'), 'price_anomalies', ['observed_at'], unique=False)
+    op.create_index('ix_price_anomalies_product_observed', 'price_anomalies', ['product_id', 'observed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_anomalies_product_observed', table_name='price_anomalies')
+    op.drop_index(op.f('ix_price_anomalies_observed_at'), table_name='price_anomalies')
+    op.drop_index(op.f('ix_price_anomalies_id'), table_name='price_anomalies')
+    op.drop_table('price_anomalies')
@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes
+
+Revision ID: c7d2e5a91b06
+Revises: 8a4e6d1c2f93
+Create Date: 2026-10-19 12:41:03.551876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e5a91b06'
+down_revision: Union[str, Sequence[str], None] = '8a4e6d1c2f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_price_history_product_created_id', 'price_history', ['product_id', 'created_at', 'id'], unique=False)
+    op.drop_index(op.f('ix_product_latest_price_observed_at'), table_name='product_latest_price')
+    op.create_index('ix_product_latest_price_observed_key', 'product_latest_price', ['observed_at', 'product_id', 'marketplace'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_latest_price_observed_key', table_name='product_latest_price')
+    op.create_index(op.f('ix_product_latest_price_observed_at'), 'product_latest_price', ['observed_at'], unique=False)
+    op.drop_index('ix_price_history_product_created_id', table_name='price_history')
@@ -0,0 +1,54 @@
+"""Add price alert rules table
+
+Revision ID: d6b4f8a3e927
+Revises: c3a9e7f2d415
+Create Date: 2026-10-19 19:41:22.650381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b4f8a3e927'
+down_revision: Union[str, Sequence[str], None] = 'c3a9e7f2d415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_alert_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=True),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('reference_price', sa.Float(), nullable=True),
+    sa.Column('threshold', sa.Float(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('triggered_at', sa.DateTime(), nullable=True),
+    sa.Column('triggered_value', sa.Float(), nullable=True),
+    sa.Column('triggered_marketplace', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_price_alert_rules_id'), 'price_alert_rules', ['id'], unique=False)
+    op.create_index(op.f('ix_price_alert_rules_user_id'), 'price_alert_rules', ['user_id'], unique=False)
+    op.create_index(
+        'ix_price_alert_rules_lookup', 'price_alert_rules', ['product_id', 'kind', 'threshold'],
+        unique=False, postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_alert_rules_lookup', table_name='price_alert_rules')
+    op.drop_index(op.f('ix_price_alert_rules_user_id'), table_name='price_alert_rules')
+    op.drop_index(op.f('ix_price_alert_rules_id'), table_name='price_alert_rules')
+    op.drop_table('price_alert_rules')
@@ -0,0 +1,34 @@
+"""Add product marketplace ids
+
+Revision ID: e1a7c3f05d28
+Revises: c7d2e5a91b06
+Create Date: 2026-10-19 14:05:12.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c3f05d28'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e5a91b06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('yandex_market_url', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('wildberries_id', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('ozon_id', sa.String(), nullable=True))
+    op.add_column('products', sa.Column('yandex_market_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'yandex_market_id')
+    op.drop_column('products', 'ozon_id')
+    op.drop_column('products', 'wildberries_id')
+    op.drop_column('products', 'yandex_market_url')
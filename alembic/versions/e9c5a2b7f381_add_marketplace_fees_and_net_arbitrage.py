@@ -0,0 +1,70 @@
+"""Add marketplace fees and net arbitrage tables
+
+Revision ID: e9c5a2b7f381
+Revises: d6b4f8a3e927
+Create Date: 2026-10-19 20:14:36.907152
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c5a2b7f381'
+down_revision: Union[str, Sequence[str], None] = 'd6b4f8a3e927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    fees = op.create_table('marketplace_fees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('marketplace', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), server_default='', nullable=False),
+    sa.Column('commission_percent', sa.Float(), nullable=False),
+    sa.Column('logistics_cost', sa.Float(), nullable=False),
+    sa.Column('return_rate_percent', sa.Float(), nullable=False),
+    sa.Column('return_cost', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('marketplace', 'category', name='uq_marketplace_fees_marketplace_category')
+    )
+    op.create_index(op.f('ix_marketplace_fees_id'), 'marketplace_fees', ['id'], unique=False)
+
+    op.create_table('net_arbitrage_opportunities',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('buy_marketplace', sa.String(), nullable=False),
+    sa.Column('sell_marketplace', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('buy_price', sa.Float(), nullable=False),
+    sa.Column('sell_price', sa.Float(), nullable=False),
+    sa.Column('fees', sa.Float(), nullable=False),
+    sa.Column('net_profit', sa.Float(), nullable=False),
+    sa.Column('net_margin_percent', sa.Float(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'buy_marketplace', 'sell_marketplace')
+    )
+    op.create_index(op.f('ix_net_arbitrage_opportunities_rank'), 'net_arbitrage_opportunities', ['rank'], unique=False)
+
+    # Тарифы площадок по умолчанию — ориентиры, уточняются через API
+    op.bulk_insert(fees, [
+        {'marketplace': 'wildberries', 'category': '', 'commission_percent': 20.0,
+         'logistics_cost': 80.0, 'return_rate_percent': 5.0, 'return_cost': 50.0},
+        {'marketplace': 'ozon', 'category': '', 'commission_percent': 18.0,
+         'logistics_cost': 90.0, 'return_rate_percent': 4.0, 'return_cost': 50.0},
+        {'marketplace': 'yandex_market', 'category': '', 'commission_percent': 15.0,
+         'logistics_cost': 70.0, 'return_rate_percent': 3.0, 'return_cost': 50.0},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_net_arbitrage_opportunities_rank'), table_name='net_arbitrage_opportunities')
+    op.drop_table('net_arbitrage_opportunities')
+    op.drop_index(op.f('ix_marketplace_fees_id'), table_name='marketplace_fees')
+    op.drop_table('marketplace_fees')
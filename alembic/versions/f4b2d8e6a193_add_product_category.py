@@ -0,0 +1,30 @@
+"""Add product category
+
+Revision ID: f4b2d8e6a193
+Revises: e1a7c3f05d28
+Create Date: 2026-10-19 15:32:47.106283
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b2d8e6a193'
+down_revision: Union[str, Sequence[str], None] = 'e1a7c3f05d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('category', sa.String(), nullable=True))
+    op.create_index(op.f('ix_products_category'), 'products', ['category'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_category'), table_name='products')
+    op.drop_column('products', 'category')
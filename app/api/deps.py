@@ -0,0 +1,102 @@
+"""
+Общие зависимости эндпоинтов: авторизация по токену
+"""
+import logging
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_read_db
+from app.models.user import User
+from app.schemas.user import CurrentUser
+from app.utils.redis_client import async_redis_client
+from app.utils.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_PREFIX = "auth:user"
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _auth_cache_key(user_id: int) -> str:
+    return f"{AUTH_CACHE_PREFIX}:{user_id}"
+
+
+async def cache_current_user(user: CurrentUser) -> None:
+    try:
+        await async_redis_client.set(
+            _auth_cache_key(user.id), user.model_dump_json(), ex=settings.AUTH_CACHE_TTL
+        )
+    except RedisError as e:
+        logger.warning(f"Failed to cache auth data for user {user.id}: {e}")
+
+
+async def invalidate_user_auth_cache(user_id: int) -> None:
+    """Вызывать при изменении или удалении пользователя"""
+    try:
+        await async_redis_client.delete(_auth_cache_key(user_id))
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate auth cache for user {user_id}: {e}")
+
+
+async def _load_current_user(user_id: int, db: AsyncSession) -> Optional[CurrentUser]:
+    try:
+        cached = await async_redis_client.get(_auth_cache_key(user_id))
+        if cached:
+            return CurrentUser.model_validate_json(cached)
+    except RedisError as e:
+        logger.warning(f"Auth cache unavailable: {e}")
+
+    result = await db.execute(
+        select(User.id, User.username, User.is_active).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+
+    user = CurrentUser(id=row.id, username=row.username, is_active=row.is_active)
+    await cache_current_user(user)
+    return user
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> CurrentUser:
+    """
+    Пользователь по токену Bearer. Подпись проверяется локально, а статус
+    пользователя берется из кеша Redis на AUTH_CACHE_TTL секунд, поэтому
+    обычный запрос не трогает ни bcrypt, ни таблицу users.
+    """
+    unauthorized = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Требуется авторизация",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if credentials is None:
+        raise unauthorized
+
+    user_id = decode_access_token(credentials.credentials)
+    if user_id is None:
+        raise unauthorized
+
+    user = await _load_current_user(user_id, db)
+    if user is None or not user.is_active:
+        raise unauthorized
+    return user
+
+
+async def get_fee_operator(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """Пользователь, которому разрешено менять общие тарифы площадок"""
+    if user.username not in settings.FEE_OPERATOR_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для изменения тарифов",
+        )
+    return user
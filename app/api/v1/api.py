@@ -1,7 +1,17 @@
-from fastapi import APIRouter
-from app.api.v1.endpoints import users, products
+from fastapi import APIRouter, Depends
+from app.api.deps import get_current_user
+from app.config import settings
+from app.api.v1.endpoints import users, products, prices, monitoring, alerts
 
 api_router = APIRouter()
 
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
+api_router.include_router(
+    prices.router,
+    prefix="/prices",
+    tags=["prices"],
+    dependencies=[Depends(get_current_user)] if settings.PRICES_REQUIRE_AUTH else [],
+)
+api_router.include_router(monitoring.router, prefix="/monitoring", tags=["monitoring"])
+api_router.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
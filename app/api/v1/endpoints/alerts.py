@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from app.api.deps import get_current_user
+from app.database import get_async_db, get_async_read_db
+from app.external.registry import registered_marketplaces
+from app.models.price_alert import PriceAlertRule
+from app.models.product import Product
+from app.schemas.alert import PriceAlertRule as PriceAlertRuleSchema, PriceAlertRuleCreate
+from app.schemas.user import CurrentUser
+from app.services.price_alerts import RULE_DROP_PERCENT, reference_price, rule_threshold
+
+router = APIRouter()
+
+@router.post("/", response_model=PriceAlertRuleSchema, status_code=status.HTTP_201_CREATED)
+async def create_alert_rule(
+    rule: PriceAlertRuleCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Создать оповещение о цене товара. Срабатывает один раз и выключается;
+    падение в процентах считается от текущей цены на момент создания.
+    """
+    if rule.marketplace and rule.marketplace not in registered_marketplaces():
+        raise HTTPException(status_code=400, detail=f"Неизвестный маркетплейс: {rule.marketplace}")
+    if rule.kind == RULE_DROP_PERCENT and rule.value >= 100:
+        raise HTTPException(status_code=400, detail="Падение должно быть меньше 100%")
+    
+    if await db.get(Product, rule.product_id) is None:
+        raise HTTPException(status_code=404, detail="Продукт не найден")
+    
+    reference = None
+    if rule.kind == RULE_DROP_PERCENT:
+        reference = await reference_price(db, rule.product_id, rule.marketplace)
+        if reference is None:
+            raise HTTPException(status_code=400, detail="Нет текущей цены, от которой считать падение")
+    
+    db_rule = PriceAlertRule(
+        user_id=current_user.id,
+        product_id=rule.product_id,
+        kind=rule.kind,
+        marketplace=rule.marketplace,
+        value=rule.value,
+        reference_price=reference,
+        threshold=rule_threshold(rule.kind, rule.value, reference),
+    )
+    db.add(db_rule)
+    await db.commit()
+    await db.refresh(db_rule)
+    
+    return db_rule
+
+@router.get("/", response_model=List[PriceAlertRuleSchema])
+async def read_alert_rules(
+    product_id: Optional[int] = Query(None, description="Фильтр по товару"),
+    active: Optional[bool] = Query(None, description="Только активные или только сработавшие"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Оповещения текущего пользователя
+    """
+    query = (
+        select(PriceAlertRule)
+        .where(PriceAlertRule.user_id == current_user.id)
+        .order_by(PriceAlertRule.id)
+    )
+    if product_id is not None:
+        query = query.where(PriceAlertRule.product_id == product_id)
+    if active is not None:
+        query = query.where(PriceAlertRule.is_active.is_(active))
+    
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_alert_rule(
+    rule_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Удалить оповещение
+    """
+    rule = await db.get(PriceAlertRule, rule_id)
+    if rule is None or rule.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Оповещение не найдено")
+    
+    await db.delete(rule)
+    await db.commit()
+    
+    return None
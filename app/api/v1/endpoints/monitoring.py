@@ -1,37 +1,84 @@
+import json
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
 from app.schemas.monitoring import (
     MonitoringRequest,
     MonitoringResponse,
-    TaskResultResponse, 
-    MarketplaceRequest,
-    MarketplaceResponse,
+    TaskResultResponse,
     TaskListResponse,
-    TestTaskResponse
-)
-
-from celery.price_monitoring import (
-    test_task,
-    monitor_product_prices, 
-    monitor_all_products,
-    parse_amazon_price,
-    parse_wildberries_price,
-    parse_ozon_price
+    BatchTaskStatusRequest,
+    BatchTaskStatusResponse
 )
 
+from app.config import settings
 from app.models.task_history import TaskHistory
-from app.database import get_db
+from app.database import get_async_db
+from app.utils.redis_client import async_redis_client, mget_batched
 
 router = APIRouter()
 
+ACTIVE_STATUSES = ["started", "pending", "running"]
+# Ключи, под которыми Redis-бэкенд Celery хранит результаты задач
+CELERY_META_PREFIX = "celery-task-meta-"
+INSPECT_CACHE_KEY = "monitoring:celery:inspect"
+
+
+def _apply_celery_state(db_task: TaskHistory, meta: Optional[Dict[str, Any]]) -> None:
+    """Перенести состояние задачи из бэкенда результатов Celery в TaskHistory"""
+    state = meta.get("status", "PENDING") if meta else "PENDING"
+
+    if state == "PENDING":
+        db_task.status = "pending"
+    elif state == "SUCCESS":
+        db_task.status = "completed"
+        db_task.completed_at = db_task.completed_at or datetime.now()
+        if meta.get("result"):
+            db_task.result_data = json.dumps(meta["result"], ensure_ascii=False)
+    elif state == "FAILURE":
+        db_task.status = "failed"
+        db_task.completed_at = db_task.completed_at or datetime.now()
+        db_task.error_message = str(meta.get("result"))
+    else:
+        db_task.status = state.lower()
+
+
+def _task_response(db_task: TaskHistory, meta: Optional[Dict[str, Any]]) -> TaskResultResponse:
+    return TaskResultResponse(
+        task_id=db_task.task_id,
+        status=db_task.status,
+        result=meta.get("result") if meta and db_task.status == "completed" else None,
+        error=db_task.error_message
+    )
+
+
+async def _fetch_celery_meta(task_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Состояния задач одним MGET вместо AsyncResult.state на каждую задачу.
+    Ключи читаются из REDIS_URL — он же result_backend в celery/app.py.
+    """
+    raw = await mget_batched([f"{CELERY_META_PREFIX}{task_id}" for task_id in task_ids])
+    return {
+        task_id: json.loads(value) if value else None
+        for task_id, value in zip(task_ids, raw)
+    }
+
+
 @router.post("/start", response_model=MonitoringResponse)
-async def start_monitoring(request: MonitoringRequest, db: Session = Depends(get_db)):
+async def start_monitoring(request: MonitoringRequest, db: AsyncSession = Depends(get_async_db)):
     try:
+        # Задачи Celery импортируются при первом вызове, а не при старте API
+        from celery.price_monitoring import monitor_product_prices
+
         product_id = request.product_id or hash(request.product_name) % 10000
-        task = monitor_product_prices.delay(request.product_name, product_id)
+        # Публикация в брокер блокирующая — уводим ее из цикла событий
+        task = await run_in_threadpool(monitor_product_prices.delay, product_id)
 
         db_task = TaskHistory(
             task_id=task.id,
@@ -40,9 +87,8 @@ async def start_monitoring(request: MonitoringRequest, db: Session = Depends(get
             status="started"
         )
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-        
+        await db.commit()
+
         return MonitoringResponse(
             task_id=task.id,
             message=f"Мониторинг цен для {request.product_name} запущен",
@@ -52,63 +98,76 @@ async def start_monitoring(request: MonitoringRequest, db: Session = Depends(get
         raise HTTPException(status_code=500, detail=f"Ошибка при запуске мониторинга: {str(e)}")
 
 @router.get("/result/{task_id}", response_model=TaskResultResponse)
-async def get_result(task_id: str, db: Session = Depends(get_db)):
+async def get_result(task_id: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        from celery.result import AsyncResult
-        from celery.app import celery_app
-
-        result = AsyncResult(task_id, app=celery_app)
-        
         # Получаем задачу из базы данных
-        db_task = db.query(TaskHistory).filter(TaskHistory.task_id == task_id).first()
+        result = await db.execute(select(TaskHistory).where(TaskHistory.task_id == task_id))
+        db_task = result.scalar_one_or_none()
         if not db_task:
             raise HTTPException(status_code=404, detail="Задача не найдена")
 
+        meta = (await _fetch_celery_meta([task_id]))[task_id]
+
         # Обновляем статус в базе данных
-        if result.state == "PENDING":
-            db_task.status = "pending"
-        elif result.status == "SUCCESS":
-            db_task.status = "completed"
-            db_task.completed_at = datetime.now()
-            if result.result:
-                db_task.result_data = str(result.result)
-        elif result.status == "FAILURE":
-            db_task.status = "failed"
-            db_task.completed_at = datetime.now()
-            db_task.error_message = str(result.result)
-        else:
-            db_task.status = result.state.lower()
-            
-        db.commit()
-
-        return TaskResultResponse(
-            task_id=task_id, 
-            status=db_task.status, 
-            error=db_task.error_message
-        )
+        _apply_celery_state(db_task, meta)
+        await db.commit()
+
+        return _task_response(db_task, meta)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении результата: {str(e)}")
 
 
+@router.post("/results", response_model=BatchTaskStatusResponse)
+async def get_results_batch(request: BatchTaskStatusRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Статусы многих задач сразу: один запрос к базе и один MGET к Redis
+    """
+    try:
+        task_ids = list(dict.fromkeys(request.task_ids))
+
+        result = await db.execute(select(TaskHistory).where(TaskHistory.task_id.in_(task_ids)))
+        db_tasks = {task.task_id: task for task in result.scalars().all()}
+
+        metas = await _fetch_celery_meta(list(db_tasks))
+
+        responses = []
+        for task_id, db_task in db_tasks.items():
+            _apply_celery_state(db_task, metas[task_id])
+            responses.append(_task_response(db_task, metas[task_id]))
+        await db.commit()
+
+        return BatchTaskStatusResponse(
+            results=responses,
+            not_found=[task_id for task_id in task_ids if task_id not in db_tasks]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при получении результатов: {str(e)}")
+
+
 @router.get("/tasks", response_model=TaskListResponse)
-async def get_all_tasks(db: Session = Depends(get_db)):
+async def get_all_tasks(db: AsyncSession = Depends(get_async_db)):
     try:
-        active_tasks = db.query(TaskHistory).filter(
-            TaskHistory.status.in_(["started", "pending", "running"])
-        ).order_by(TaskHistory.started_at.desc()).all()
-        
-        tasks_data = []
+        result = await db.execute(
+            select(TaskHistory)
+            .where(TaskHistory.status.in_(ACTIVE_STATUSES))
+            .order_by(TaskHistory.started_at.desc())
+        )
+        active_tasks = result.scalars().all()
+
+        tasks_data = {}
         for task in active_tasks:
-            tasks_data.append({
+            tasks_data[task.task_id] = {
                 "task_id": task.task_id,
                 "product_name": task.product_name,
                 "product_id": task.product_id,
                 "status": task.status,
                 "started_at": task.started_at.isoformat()
-            })
-        
+            }
+
         return TaskListResponse(
-            tasks=tasks_data,
+            active_tasks=tasks_data,
             total_count=len(tasks_data)
         )
     except Exception as e:
@@ -116,57 +175,90 @@ async def get_all_tasks(db: Session = Depends(get_db)):
 
 
 @router.post("/stop/{task_id}")
-async def stop_task(task_id: str, db: Session = Depends(get_db)):
+async def stop_task(task_id: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        from celery.result import AsyncResult
-        from celery.app import celery_app
-        
+        from celery import celery_app
+
         # Получаем задачу из базы данных
-        db_task = db.query(TaskHistory).filter(TaskHistory.task_id == task_id).first()
+        result = await db.execute(select(TaskHistory).where(TaskHistory.task_id == task_id))
+        db_task = result.scalar_one_or_none()
         if not db_task:
             raise HTTPException(status_code=404, detail="Задача не найдена")
-        
+
         # Останавливаем задачу в Celery
-        result = AsyncResult(task_id, app=celery_app)
-        result.revoke(terminate=True)
-        
+        await run_in_threadpool(celery_app.control.revoke, task_id, terminate=True)
+
         # Обновляем статус в базе данных
         db_task.status = "stopped"
         db_task.completed_at = datetime.now()
-        db.commit()
-            
+        await db.commit()
+
         return {
-            "message": f"Задача {task_id} остановлена", 
+            "message": f"Задача {task_id} остановлена",
             "task_id": task_id,
             "product_name": db_task.product_name
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при остановке задачи: {str(e)}")
 
 
+def _inspect_celery() -> Dict[str, Any]:
+    from celery import celery_app
+
+    try:
+        active = celery_app.control.inspect(timeout=1.0).active()
+        return {
+            "status": "ok" if active is not None else "error",
+            "workers": len(active or {}),
+            "running_tasks": sum(len(tasks) for tasks in (active or {}).values())
+        }
+    except Exception:
+        return {"status": "error", "workers": 0, "running_tasks": 0}
+
+
+async def _cached_celery_status() -> Dict[str, Any]:
+    """
+    Опрос воркеров занимает до секунды, поэтому результат делится между
+    всеми процессами API через Redis на CELERY_INSPECT_CACHE_TTL секунд
+    """
+    try:
+        cached = await async_redis_client.get(INSPECT_CACHE_KEY)
+        if cached:
+            return json.loads(cached)
+    except RedisError:
+        pass
+
+    status = await run_in_threadpool(_inspect_celery)
+    status["checked_at"] = datetime.now().isoformat()
+    try:
+        await async_redis_client.set(
+            INSPECT_CACHE_KEY, json.dumps(status), ex=settings.CELERY_INSPECT_CACHE_TTL
+        )
+    except RedisError:
+        pass
+    return status
+
+
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     try:
-        from celery.app import celery_app
-        
-        # Проверяем подключение к Celery
-        celery_status = "ok"
-        try:
-            celery_app.control.inspect().active()
-        except Exception:
-            celery_status = "error"
-        
+        celery_info = await _cached_celery_status()
+
         # Считаем активные задачи из базы данных
-        active_count = db.query(TaskHistory).filter(
-            TaskHistory.status.in_(["started", "pending", "running"])
-        ).count()
-            
+        result = await db.execute(
+            select(func.count()).select_from(TaskHistory).where(TaskHistory.status.in_(ACTIVE_STATUSES))
+        )
+        active_count = result.scalar_one()
+
         return {
-            "status": "healthy" if celery_status == "ok" else "unhealthy",
-            "celery": celery_status,
+            "status": "healthy" if celery_info["status"] == "ok" else "unhealthy",
+            "celery": celery_info["status"],
+            "celery_workers": celery_info["workers"],
+            "celery_checked_at": celery_info.get("checked_at"),
             "active_tasks_count": active_count,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при проверке здоровья: {str(e)}")
-
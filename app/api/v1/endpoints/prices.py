@@ -1,30 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from typing import List, Optional
+from sqlalchemy import select, func, desc, tuple_, case
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by, insert as pg_insert
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
-from app.database import get_async_db
+from app.api.deps import get_fee_operator
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
 from app.models.price_history import PriceHistory
 from app.models.product import Product
+from app.models.latest_price import ProductLatestPrice
+from app.models.price_analytics import PriceAnalyticsSummary
+from app.models.price_stats import PriceSeriesStats
+from app.models.marketplace_fee import MarketplaceFee
+from app.models.net_arbitrage import NetArbitrageOpportunity
+from app.external.registry import registered_marketplaces
 from app.schemas.price_history import (
     PriceHistory as PriceHistorySchema,
     PriceHistoryCreate,
     PriceHistoryList,
-    PriceComparison
+    PriceComparison,
+    LatestPrice,
+    BulkComparisonRequest,
+    BulkComparison,
+    ArbitrageRanking,
+    PriceAnalytics,
+    PriceStats,
+    MarketplaceFee as MarketplaceFeeSchema,
+    NetArbitrageOpportunity as NetArbitrageOpportunitySchema
 )
+from app.schemas.pagination import Page
+from app.services.arbitrage_ranking import refresh_arbitrage_ranking, top_arbitrage
+from app.services.price_export import EXPORT_MEDIA_TYPES, export_price_history
+from app.services.net_arbitrage import FEE_FIELDS, best_net_arbitrage, load_fee_models
+from app.services.notification_service import notify_price_alerts, notify_price_drops
+from app.services.price_recorder import pop_recorded_anomalies, pop_triggered_alerts, record_price
+from app.services.price_stats import describe_stats
+from app.services.price_stream import build_price_event, publish_price_updates, price_update_broker
+from app.services.price_rollups import (
+    ROLLUP_MODELS,
+    RESOLUTION_RAW,
+    bucket_start,
+    choose_resolution,
+)
+from app.utils.cache import FEES_SCOPE, cached_json_response, invalidate_cache_scope, invalidate_product_cache
+from app.utils.metrics import observe_db_write
+from app.utils.pagination import decode_cursor, build_page
+from app.utils.serialization import check_page_size, columns_of, dumps, rows_to_dicts
 
 router = APIRouter()
 
+HISTORY_COLUMNS = ("id", "product_id", "marketplace", "price", "currency", "created_at")
+CANDLE_COLUMNS = ("marketplace", "bucket", "open", "high", "low", "close", "count")
+LATEST_COLUMNS = ("product_id", "marketplace", "price", "currency", "availability", "observed_at")
+
 @router.get("/{product_id}/history", response_model=PriceHistoryList)
 async def get_price_history(
+    request: Request,
     product_id: int,
     marketplace: Optional[str] = Query(None, description="Фильтр по маркетплейсу"),
-    days: int = Query(30, description="Количество дней для получения истории"),
-    db: AsyncSession = Depends(get_async_db)
+    days: int = Query(30, ge=1, description="Количество дней для получения истории"),
+    resolution: str = Query(
+        "auto",
+        pattern="^(auto|raw|hourly|daily)$",
+        description="Детализация: auto, raw, hourly или daily"
+    ),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(500, ge=1, le=settings.FAST_MAX_PAGE_SIZE),
+    fast: bool = Query(False, description="Быстрая сериализация без моделей Pydantic"),
 ):
     """
-    Получить историю цен для продукта
+    Получить историю цен для продукта постранично.
+    Для длинных окон отдаются свечи OHLC вместо сырых записей.
+    Ответ кешируется в Redis до следующей записи цены по товару.
     """
+    check_page_size(limit, fast, settings.HISTORY_MAX_PAGE_SIZE)
+    return await cached_json_response(
+        request,
+        product_id,
+        lambda db: _load_price_history(db, product_id, marketplace, days, resolution, cursor, limit, fast)
+    )
+
+async def _load_price_history(
+    db: AsyncSession,
+    product_id: int,
+    marketplace: Optional[str],
+    days: int,
+    resolution: str,
+    cursor: Optional[str],
+    limit: int,
+    fast: bool = False
+) -> Union[PriceHistoryList, bytes]:
     # Проверяем существование продукта
     result = await db.execute(
         select(Product).where(Product.id == product_id)
@@ -34,25 +103,104 @@ async def get_price_history(
     if not product:
         raise HTTPException(status_code=404, detail="Продукт не найден")
     
+    if resolution == "auto":
+        resolution = choose_resolution(days)
+    since = datetime.utcnow() - timedelta(days=days)
+    
+    if resolution != RESOLUTION_RAW:
+        rollup = ROLLUP_MODELS[resolution]
+        query = select(*columns_of(rollup, CANDLE_COLUMNS)) if fast else select(rollup)
+        query = query.where(
+            rollup.product_id == product_id,
+            rollup.bucket >= bucket_start(since, resolution)
+        )
+        if marketplace:
+            query = query.where(rollup.marketplace == marketplace)
+        if cursor:
+            last_bucket, last_marketplace = decode_cursor(cursor, (datetime, str))
+            query = query.where(
+                tuple_(rollup.bucket, rollup.marketplace) < tuple_(last_bucket, last_marketplace)
+            )
+        query = query.order_by(desc(rollup.bucket), desc(rollup.marketplace)).limit(limit + 1)
+        
+        result = await db.execute(query)
+        candles, next_cursor, has_more = build_page(
+            result.all() if fast else result.scalars().all(),
+            limit,
+            key=lambda row: (row.bucket, row.marketplace)
+        )
+        
+        if fast:
+            return dumps({
+                "product_id": product_id,
+                "product_name": product.name,
+                "resolution": resolution,
+                "total_records": len(candles),
+                "history": [],
+                "candles": rows_to_dicts(candles),
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+                "limit": limit
+            })
+        
+        return PriceHistoryList(
+            product_id=product_id,
+            product_name=product.name,
+            resolution=resolution,
+            total_records=len(candles),
+            candles=candles,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            limit=limit
+        )
+    
     # Строим запрос для истории цен
-    query = select(PriceHistory).where(
+    query = select(*columns_of(PriceHistory, HISTORY_COLUMNS)) if fast else select(PriceHistory)
+    query = query.where(
         PriceHistory.product_id == product_id,
-        PriceHistory.created_at >= datetime.utcnow() - timedelta(days=days)
+        PriceHistory.created_at >= since
     )
     
     if marketplace:
         query = query.where(PriceHistory.marketplace == marketplace)
     
-    query = query.order_by(desc(PriceHistory.created_at))
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor, (datetime, int))
+        query = query.where(
+            tuple_(PriceHistory.created_at, PriceHistory.id) < tuple_(last_created_at, last_id)
+        )
+    
+    query = query.order_by(desc(PriceHistory.created_at), desc(PriceHistory.id)).limit(limit + 1)
     
     result = await db.execute(query)
-    price_history = result.scalars().all()
+    price_history, next_cursor, has_more = build_page(
+        result.all() if fast else result.scalars().all(),
+        limit,
+        key=lambda row: (row.created_at, row.id)
+    )
+    
+    if fast:
+        return dumps({
+            "product_id": product_id,
+            "product_name": product.name,
+            "resolution": RESOLUTION_RAW,
+            "total_records": len(price_history),
+            "history": rows_to_dicts(price_history),
+            "candles": [],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "limit": limit
+        })
     
     return PriceHistoryList(
         product_id=product_id,
         product_name=product.name,
+        resolution=RESOLUTION_RAW,
         total_records=len(price_history),
-        history=price_history
+        history=price_history,
+        next_cursor=next_cursor,
+        has_more=has_more,
+        limit=limit
     )
 
 @router.post("/{product_id}/history", response_model=PriceHistorySchema)
@@ -73,26 +221,49 @@ async def create_price_history(
     if not product:
         raise HTTPException(status_code=404, detail="Продукт не найден")
     
-    # Создаем запись истории цен
-    db_price_history = PriceHistory(
-        product_id=product_id,
-        **price_data.model_dump()
-    )
+    # Создаем запись истории цен вместе со свечами
+    with observe_db_write("price_history", 1):
+        db_price_history = await record_price(
+            db,
+            product_id=product_id,
+            marketplace=price_data.marketplace,
+            price=price_data.price,
+            currency=price_data.currency
+        )
+        await db.commit()
     
-    db.add(db_price_history)
-    await db.commit()
     await db.refresh(db_price_history)
+    await invalidate_product_cache(product_id)
+    await refresh_arbitrage_ranking(db, [product_id])
+    await publish_price_updates([build_price_event(
+        product_id,
+        db_price_history.marketplace,
+        db_price_history.price,
+        db_price_history.currency,
+        db_price_history.created_at,
+        user_id=product.user_id
+    )])
+    await notify_price_drops(product, pop_recorded_anomalies(db))
+    await notify_price_alerts(product, pop_triggered_alerts(db))
     
     return db_price_history
 
 @router.get("/{product_id}/comparison", response_model=PriceComparison)
 async def get_price_comparison(
+    request: Request,
     product_id: int,
-    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Сравнить последние цены по всем маркетплейсам
     """
+    return await cached_json_response(
+        request,
+        product_id,
+        lambda db: _load_price_comparison(db, product_id),
+        scopes=(FEES_SCOPE,),
+    )
+
+async def _load_price_comparison(db: AsyncSession, product_id: int) -> PriceComparison:
     # Проверяем существование продукта
     result = await db.execute(
         select(Product).where(Product.id == product_id)
@@ -102,30 +273,25 @@ async def get_price_comparison(
     if not product:
         raise HTTPException(status_code=404, detail="Продукт не найден")
     
-    # Получаем последние цены по каждому маркетплейсу
-    marketplaces = ['amazon', 'wildberries', 'ozon']
-    prices = []
-    
-    for marketplace in marketplaces:
-        # Получаем последнюю цену для каждого маркетплейса
-        result = await db.execute(
-            select(PriceHistory)
-            .where(
-                PriceHistory.product_id == product_id,
-                PriceHistory.marketplace == marketplace
-            )
-            .order_by(desc(PriceHistory.created_at))
-            .limit(1)
+    # Текущие цены берем из материализованной таблицы: одна строка на маркетплейс
+    result = await db.execute(
+        select(ProductLatestPrice)
+        .where(
+            ProductLatestPrice.product_id == product_id,
+            ProductLatestPrice.marketplace.in_(registered_marketplaces())
         )
-        latest_price = result.scalar_one_or_none()
-        
-        if latest_price:
-            prices.append({
-                "marketplace": marketplace,
-                "price": latest_price.price,
-                "currency": latest_price.currency,
-                "last_updated": latest_price.created_at
-            })
+        .order_by(ProductLatestPrice.marketplace)
+    )
+    prices = [
+        {
+            "marketplace": latest_price.marketplace,
+            "price": latest_price.price,
+            "currency": latest_price.currency,
+            "availability": latest_price.availability,
+            "last_updated": latest_price.observed_at
+        }
+        for latest_price in result.scalars().all()
+    ]
     
     if not prices:
         raise HTTPException(
@@ -137,8 +303,13 @@ async def get_price_comparison(
     min_price = min(prices, key=lambda x: x["price"])
     max_price = max(prices, key=lambda x: x["price"])
     
-    # Вычисляем потенциальную прибыль
+    # Вычисляем потенциальную прибыль: разрыв цен и чистую прибыль после тарифов площадок
     arbitrage_opportunity = max_price["price"] - min_price["price"]
+    net_arbitrage = best_net_arbitrage(
+        {price["marketplace"]: price["price"] for price in prices if price["availability"]},
+        product.category,
+        await load_fee_models(db)
+    )
     
     return PriceComparison(
         product_id=product_id,
@@ -147,26 +318,316 @@ async def get_price_comparison(
         min_price=min_price,
         max_price=max_price,
         arbitrage_opportunity=arbitrage_opportunity,
+        net_arbitrage=net_arbitrage,
         comparison_date=datetime.utcnow()
     )
 
-@router.get("/latest", response_model=List[PriceHistorySchema])
-async def get_latest_prices(
-    limit: int = Query(50, description="Количество последних записей"),
+@router.get("/{product_id}/analytics", response_model=List[PriceAnalytics])
+async def get_price_analytics(
+    product_id: int,
+    window_days: Optional[int] = Query(None, ge=1, description="Окно в днях; по умолчанию все рассчитанные"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Сводная аналитика цен: скользящие средние, изменение, волатильность, тренд.
+    Считается периодической задачей Celery, здесь только читается.
+    """
+    query = (
+        select(PriceAnalyticsSummary)
+        .where(PriceAnalyticsSummary.product_id == product_id)
+        .order_by(PriceAnalyticsSummary.window_days, PriceAnalyticsSummary.marketplace)
+    )
+    if window_days is not None:
+        query = query.where(PriceAnalyticsSummary.window_days == window_days)
+    
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@router.get("/{product_id}/stats", response_model=List[PriceStats])
+async def get_price_stats(
+    product_id: int,
     marketplace: Optional[str] = Query(None, description="Фильтр по маркетплейсу"),
+    price: Optional[float] = Query(None, gt=0, description="Цена для оценки; по умолчанию последняя"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Накопительная статистика цен по маркетплейсам и оценка цены относительно нее.
+    Читается одна строка на маркетплейс, история не сканируется.
+    """
+    query = (
+        select(PriceSeriesStats)
+        .where(PriceSeriesStats.product_id == product_id)
+        .order_by(PriceSeriesStats.marketplace)
+    )
+    if marketplace:
+        query = query.where(PriceSeriesStats.marketplace == marketplace)
+    
+    result = await db.execute(query)
+    return [describe_stats(stats, price) for stats in result.scalars().all()]
+
+@router.post("/comparison/bulk", response_model=BulkComparison)
+async def get_bulk_price_comparison(
+    request: BulkComparisonRequest,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Сравнить текущие цены для набора товаров одним запросом.
+    Набор задается списком ID, пользователем или подстрокой названия.
+    """
+    marketplaces = registered_marketplaces()
+    if request.marketplaces:
+        marketplaces = [m for m in marketplaces if m in request.marketplaces]
+    
+    lp = ProductLatestPrice
+    min_price = func.min(lp.price)
+    max_price = func.max(lp.price)
+    # Как и в ProductMatch: спред имеет смысл, только если цена есть хотя бы на двух площадках
+    arbitrage = case((func.count(lp.marketplace) >= 2, max_price - min_price), else_=0.0)
+    
+    query = (
+        select(
+            Product.id,
+            Product.name,
+            min_price.label("min_price"),
+            func.array_agg(aggregate_order_by(lp.marketplace, lp.price.asc()))[1].label("min_marketplace"),
+            max_price.label("max_price"),
+            func.array_agg(aggregate_order_by(lp.marketplace, lp.price.desc()))[1].label("max_marketplace"),
+            arbitrage.label("arbitrage_opportunity"),
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "marketplace", lp.marketplace,
+                        "price", lp.price,
+                        "currency", lp.currency,
+                        "availability", lp.availability,
+                        "last_updated", lp.observed_at
+                    ),
+                    lp.marketplace
+                ),
+                type_=JSON
+            ).label("prices")
+        )
+        .join(lp, lp.product_id == Product.id)
+        .where(lp.marketplace.in_(marketplaces))
+        .group_by(Product.id, Product.name)
+    )
+    
+    if request.product_ids:
+        query = query.where(Product.id.in_(request.product_ids))
+    if request.user_id is not None:
+        query = query.where(Product.user_id == request.user_id)
+    if request.name_contains:
+        # autoescape: % и _ из запроса ищутся буквально, а не как шаблон
+        query = query.where(Product.name.icontains(request.name_contains, autoescape=True))
+    if request.min_arbitrage > 0:
+        query = query.having(arbitrage >= request.min_arbitrage)
+    
+    query = query.order_by(desc("arbitrage_opportunity"), Product.id).limit(request.limit)
+    
+    result = await db.execute(query)
+    items = [
+        {
+            "product_id": row.id,
+            "product_name": row.name,
+            "prices": row.prices,
+            "min_price": row.min_price,
+            "min_marketplace": row.min_marketplace,
+            "max_price": row.max_price,
+            "max_marketplace": row.max_marketplace,
+            "arbitrage_opportunity": row.arbitrage_opportunity
+        }
+        for row in result.all()
+    ]
+    
+    return BulkComparison(
+        comparison_date=datetime.utcnow(),
+        marketplaces=marketplaces,
+        total=len(items),
+        items=items
+    )
+
+@router.get("/arbitrage/top", response_model=ArbitrageRanking)
+async def get_top_arbitrage(
+    sort: str = Query("absolute", pattern="^(absolute|relative)$", description="Разрыв в рублях или в процентах"),
+    limit: int = Query(20, ge=1, le=settings.MAX_PAGE_SIZE),
+    user_id: Optional[int] = Query(None, description="Только товары пользователя"),
+    category: Optional[str] = Query(None, description="Только товары категории"),
+    min_spread: Optional[float] = Query(None, ge=0, description="Минимальный разрыв в единицах sort")
+):
+    """
+    Лучшие арбитражные возможности из рейтинга в Redis.
+    Рейтинг обновляется при каждой записи цены, Postgres здесь не читается.
+    """
+    items = await top_arbitrage(sort, limit, user_id=user_id, category=category, min_spread=min_spread)
+    return ArbitrageRanking(sort=sort, items=items)
+
+@router.get("/arbitrage/net", response_model=List[NetArbitrageOpportunitySchema])
+async def get_net_arbitrage(
+    limit: int = Query(20, ge=1, le=settings.MAX_PAGE_SIZE),
+    min_margin: Optional[float] = Query(None, description="Минимальная чистая маржа, % от цены покупки"),
+    category: Optional[str] = Query(None, description="Только товары категории"),
+    buy_marketplace: Optional[str] = Query(None, description="Площадка покупки"),
+    sell_marketplace: Optional[str] = Query(None, description="Площадка продажи"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Лучшие пары «купить — продать» по чистой прибыли после комиссии,
+    логистики и возвратов. Рейтинг пересчитывается задачей Celery.
+    """
+    query = select(NetArbitrageOpportunity).order_by(NetArbitrageOpportunity.rank).limit(limit)
+    if min_margin is not None:
+        query = query.where(NetArbitrageOpportunity.net_margin_percent >= min_margin)
+    if category:
+        query = query.where(NetArbitrageOpportunity.category == category)
+    if buy_marketplace:
+        query = query.where(NetArbitrageOpportunity.buy_marketplace == buy_marketplace)
+    if sell_marketplace:
+        query = query.where(NetArbitrageOpportunity.sell_marketplace == sell_marketplace)
+    
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@router.get("/arbitrage/fees", response_model=List[MarketplaceFeeSchema])
+async def get_marketplace_fees(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Тарифы площадок, по которым считается чистая прибыль
+    """
+    result = await db.execute(
+        select(MarketplaceFee).order_by(MarketplaceFee.marketplace, MarketplaceFee.category)
+    )
+    return result.scalars().all()
+
+@router.put("/arbitrage/fees", response_model=MarketplaceFeeSchema, dependencies=[Depends(get_fee_operator)])
+async def set_marketplace_fee(
+    fee: MarketplaceFeeSchema,
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить последние обновления цен
+    Задать тариф площадки или категории на площадке. Доступно только
+    пользователям из FEE_OPERATOR_USERNAMES: тарифы общие для всех.
+    Рейтинг чистой прибыли учтет его при следующем пересчете.
+    """
+    if fee.marketplace not in registered_marketplaces():
+        raise HTTPException(status_code=400, detail=f"Неизвестный маркетплейс: {fee.marketplace}")
+    
+    values = fee.model_dump()
+    stmt = pg_insert(MarketplaceFee).values(**values)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            constraint="uq_marketplace_fees_marketplace_category",
+            set_={**{field: stmt.excluded[field] for field in FEE_FIELDS}, "updated_at": func.now()}
+        )
+    )
+    await db.commit()
+    await invalidate_cache_scope(FEES_SCOPE)
+    
+    return fee
+
+@router.get("/latest", response_model=Page[LatestPrice])
+async def get_latest_prices(
+    limit: int = Query(50, ge=1, le=settings.FAST_MAX_PAGE_SIZE, description="Количество последних записей"),
+    marketplace: Optional[str] = Query(None, description="Фильтр по маркетплейсу"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    fast: bool = Query(False, description="Быстрая сериализация без моделей Pydantic"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Получить последние обновления цен постранично
     """
-    query = select(PriceHistory).order_by(desc(PriceHistory.created_at))
+    check_page_size(limit, fast, settings.MAX_PAGE_SIZE)
+    query = select(*columns_of(ProductLatestPrice, LATEST_COLUMNS)) if fast else select(ProductLatestPrice)
     
     if marketplace:
-        query = query.where(PriceHistory.marketplace == marketplace)
+        query = query.where(ProductLatestPrice.marketplace == marketplace)
+    
+    if cursor:
+        last_observed_at, last_product_id, last_marketplace = decode_cursor(
+            cursor, (datetime, int, str)
+        )
+        query = query.where(
+            tuple_(
+                ProductLatestPrice.observed_at,
+                ProductLatestPrice.product_id,
+                ProductLatestPrice.marketplace
+            ) < tuple_(last_observed_at, last_product_id, last_marketplace)
+        )
     
-    query = query.limit(limit)
+    query = query.order_by(
+        desc(ProductLatestPrice.observed_at),
+        desc(ProductLatestPrice.product_id),
+        desc(ProductLatestPrice.marketplace)
+    ).limit(limit + 1)
     
     result = await db.execute(query)
-    price_history = result.scalars().all()
+    latest_prices, next_cursor, has_more = build_page(
+        result.all() if fast else result.scalars().all(),
+        limit,
+        key=lambda row: (row.observed_at, row.product_id, row.marketplace)
+    )
+    
+    if fast:
+        return ORJSONResponse({
+            "items": rows_to_dicts(latest_prices),
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "limit": limit
+        })
+    
+    return Page(items=latest_prices, next_cursor=next_cursor, has_more=has_more, limit=limit)
+
+@router.get("/export")
+async def export_prices(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Формат: ndjson или csv"),
+    product_ids: Optional[List[int]] = Query(None, description="ID товаров"),
+    marketplace: Optional[str] = Query(None, description="Фильтр по маркетплейсу"),
+    since: Optional[datetime] = Query(None, description="Начало периода"),
+    until: Optional[datetime] = Query(None, description="Конец периода")
+):
+    """
+    Потоковая выгрузка истории цен.
+    Строки читаются серверным курсором и отдаются кусками, память не растет с объемом.
+    """
+    filename = f"price_history.{format}"
+    return StreamingResponse(
+        export_price_history(format, product_ids, marketplace, since, until),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+SSE_HEARTBEAT_SECONDS = 15
+
+@router.get("/stream")
+async def stream_price_updates(
+    request: Request,
+    product_id: Optional[List[int]] = Query(None, description="Фильтр по товарам"),
+    user_id: Optional[List[int]] = Query(None, description="Фильтр по владельцам товаров"),
+    marketplace: Optional[List[str]] = Query(None, description="Фильтр по маркетплейсам")
+):
+    """
+    Поток обновлений цен (Server-Sent Events).
+    Все клиенты процесса обслуживаются одной подпиской Redis.
+    """
+    subscription = price_update_broker.subscribe(
+        product_ids=product_id or (),
+        user_ids=user_id or (),
+        marketplaces=marketplace or ()
+    )
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Комментарий SSE держит соединение живым через прокси
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: price\ndata: {json.dumps(event)}\n\n"
+        finally:
+            price_update_broker.unsubscribe(subscription)
     
-    return price_history 
\ No newline at end of file
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
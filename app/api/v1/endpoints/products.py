@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
-from app.database import get_async_db
+from typing import Optional
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
 from app.models.product import Product
-from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate
+from app.schemas.pagination import Page
+from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate, ProductImportJob
+from app.services.arbitrage_ranking import refresh_arbitrage_ranking, remove_from_arbitrage_ranking
+from app.services.product_import import create_import_job, get_import_job, import_products
+from app.utils.cache import cached_json_response, invalidate_product_cache
+from app.utils.pagination import decode_cursor, build_page
+from app.utils.serialization import check_page_size, columns_of, rows_to_dicts
 
 router = APIRouter()
 
+PRODUCT_COLUMNS = (
+    "id", "name", "description", "category", "amazon_url", "wildberries_url", "ozon_url", "yandex_market_url",
+    "wildberries_id", "ozon_id", "yandex_market_id", "user_id", "created_at"
+)
+
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product: ProductCreate, 
@@ -24,6 +38,8 @@ async def create_product(
         product_data['wildberries_url'] = str(product_data['wildberries_url'])
     if product_data.get('ozon_url'):
         product_data['ozon_url'] = str(product_data['ozon_url'])
+    if product_data.get('yandex_market_url'):
+        product_data['yandex_market_url'] = str(product_data['yandex_market_url'])
     
     db_product = Product(**product_data)
     
@@ -33,29 +49,82 @@ async def create_product(
     
     return db_product
 
-@router.get("/", response_model=List[ProductSchema])
+@router.get("/", response_model=Page[ProductSchema])
 async def read_products(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: AsyncSession = Depends(get_async_db)
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(100, ge=1, le=settings.FAST_MAX_PAGE_SIZE),
+    fast: bool = Query(False, description="Быстрая сериализация без моделей Pydantic"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Получить список продуктов
+    Получить список продуктов постранично (keyset по id)
     """
-    result = await db.execute(
-        select(Product).offset(skip).limit(limit)
+    check_page_size(limit, fast, settings.MAX_PAGE_SIZE)
+    query = select(*columns_of(Product, PRODUCT_COLUMNS)) if fast else select(Product)
+    query = query.order_by(Product.id).limit(limit + 1)
+    
+    if cursor:
+        (last_id,) = decode_cursor(cursor, (int,))
+        query = query.where(Product.id > last_id)
+    
+    result = await db.execute(query)
+    products, next_cursor, has_more = build_page(
+        result.all() if fast else result.scalars().all(), limit, key=lambda row: (row.id,)
+    )
+    if fast:
+        return ORJSONResponse({
+            "items": rows_to_dicts(products),
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "limit": limit
+        })
+    return Page(items=products, next_cursor=next_cursor, has_more=has_more, limit=limit)
+
+@router.post("/import", response_model=ProductImportJob, status_code=status.HTTP_202_ACCEPTED)
+async def import_products_bulk(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Формат тела: csv или ndjson"),
+    user_id: Optional[int] = Query(None, description="Владелец загружаемых товаров"),
+    match: bool = Query(True, description="Искать карточки на площадках для товаров без ID")
+):
+    """
+    Массовая загрузка товаров. Тело запроса — CSV с заголовком или NDJSON
+    с полями ProductCreate. Вставка идет пакетами в фоне, ответ сразу
+    возвращает задачу, прогресс которой читается через GET /products/import/{job_id}.
+    """
+    body = (await request.body()).decode("utf-8-sig")
+    job = await create_import_job(format)
+    background_tasks.add_task(
+        import_products, io.StringIO(body, newline=""), format, job.job_id, user_id, match=match
     )
-    products = result.scalars().all()
-    return products
+    return job
+
+@router.get("/import/{job_id}", response_model=ProductImportJob)
+async def read_import_job(job_id: str):
+    """
+    Состояние загрузки: счетчики вставленных, ошибочных и сопоставленных товаров
+    """
+    job = await get_import_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача загрузки не найдена")
+    return job
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def read_product(
-    product_id: int, 
-    db: AsyncSession = Depends(get_async_db)
+    request: Request,
+    product_id: int,
 ):
     """
     Получить продукт по ID
     """
+    return await cached_json_response(
+        request,
+        product_id,
+        lambda db: _load_product(db, product_id)
+    )
+
+async def _load_product(db: AsyncSession, product_id: int) -> ProductSchema:
     result = await db.execute(
         select(Product).where(Product.id == product_id)
     )
@@ -64,7 +133,7 @@ async def read_product(
     if product is None:
         raise HTTPException(status_code=404, detail="Продукт не найден")
     
-    return product
+    return ProductSchema.model_validate(product)
 
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
@@ -93,6 +162,8 @@ async def update_product(
         update_data['wildberries_url'] = str(update_data['wildberries_url'])
     if 'ozon_url' in update_data and update_data['ozon_url']:
         update_data['ozon_url'] = str(update_data['ozon_url'])
+    if 'yandex_market_url' in update_data and update_data['yandex_market_url']:
+        update_data['yandex_market_url'] = str(update_data['yandex_market_url'])
     
     # Обновляем поля
     for field, value in update_data.items():
@@ -100,6 +171,9 @@ async def update_product(
     
     await db.commit()
     await db.refresh(product)
+    await invalidate_product_cache(product_id)
+    # Название, владелец и категория хранятся в записи рейтинга
+    await refresh_arbitrage_ranking(db, [product_id])
     
     return product
 
@@ -121,5 +195,7 @@ async def delete_product(
     
     await db.delete(product)
     await db.commit()
+    await invalidate_product_cache(product_id)
+    await remove_from_arbitrage_ranking(product_id)
     
     return None
\ No newline at end of file
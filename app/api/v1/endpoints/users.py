@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import Optional
+from app.config import settings
 from app.database import get_async_db
 from app.models.user import User
-from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
-from app.utils.security import hash_password
+from app.schemas.pagination import Page
+from app.api.deps import cache_current_user, invalidate_user_auth_cache
+from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, TokenRequest, Token, CurrentUser
+from app.utils.pagination import decode_cursor, build_page
+from app.utils.security import hash_password_async, verify_password_async, create_access_token
 
 router = APIRouter()
 
@@ -41,7 +45,7 @@ async def create_user(
     db_user = User(
         email=user.email,
         username=user.username,
-        hashed_password=hash_password(user.password)
+        hashed_password=await hash_password_async(user.password)
     )
     
     db.add(db_user)
@@ -50,20 +54,59 @@ async def create_user(
     
     return db_user
 
-@router.get("/", response_model=List[UserSchema])
-async def read_users(
-    skip: int = 0, 
-    limit: int = 100, 
+@router.post("/token", response_model=Token)
+async def login(
+    credentials: TokenRequest,
     db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить список пользователей
+    Выдать токен доступа по логину и паролю.
+    bcrypt выполняется только здесь — дальше запросы проверяют подпись токена.
     """
     result = await db.execute(
-        select(User).offset(skip).limit(limit)
+        select(User).where(User.username == credentials.username)
+    )
+    user = result.scalar_one_or_none()
+    
+    if (
+        user is None
+        or not user.is_active
+        or not await verify_password_async(credentials.password, user.hashed_password)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный логин или пароль",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    await cache_current_user(
+        CurrentUser(id=user.id, username=user.username, is_active=user.is_active)
+    )
+    return Token(
+        access_token=create_access_token(user.id),
+        expires_in=settings.ACCESS_TOKEN_TTL
+    )
+
+@router.get("/", response_model=Page[UserSchema])
+async def read_users(
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить список пользователей постранично (keyset по id)
+    """
+    query = select(User).order_by(User.id).limit(limit + 1)
+    
+    if cursor:
+        (last_id,) = decode_cursor(cursor, (int,))
+        query = query.where(User.id > last_id)
+    
+    result = await db.execute(query)
+    users, next_cursor, has_more = build_page(
+        result.scalars().all(), limit, key=lambda row: (row.id,)
     )
-    users = result.scalars().all()
-    return users
+    return Page(items=users, next_cursor=next_cursor, has_more=has_more, limit=limit)
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user(
@@ -105,12 +148,13 @@ async def update_user(
     for field, value in update_data.items():
         if field == "password":
             # Хешируем пароль при обновлении
-            setattr(user, "hashed_password", hash_password(value))
+            setattr(user, "hashed_password", await hash_password_async(value))
         else:
             setattr(user, field, value)
     
     await db.commit()
     await db.refresh(user)
+    await invalidate_user_auth_cache(user_id)
     
     return user
 
@@ -132,5 +176,6 @@ async def delete_user(
     
     await db.delete(user)
     await db.commit()
+    await invalidate_user_auth_cache(user_id)
     
     return None
@@ -2,7 +2,10 @@
 Настройка базы данных
 """
 import logging
+import os
 from contextlib import asynccontextmanager
+from typing import Optional
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.exc import SQLAlchemyError
@@ -14,21 +17,42 @@ logger = logging.getLogger(__name__)
 class Base(DeclarativeBase):
     pass
 
+# Пул записи: API-мутации и пакетные записи Celery
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.DB_WRITE_POOL_SIZE,
+    max_overflow=settings.DB_WRITE_MAX_OVERFLOW,
     pool_pre_ping=True,
     pool_recycle=300,
 )
 
+# Отдельный пул чтения (реплика или та же база), чтобы тяжелые GET-запросы
+# не конкурировали с записью за соединения
+if settings.DB_READ_ROUTING:
+    read_engine = create_async_engine(
+        settings.DATABASE_READ_URL or settings.DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=300,
+    )
+else:
+    read_engine = engine
+
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+async_read_session_maker = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 async def get_async_db() -> AsyncSession:
     async with async_session_maker() as session:
@@ -42,6 +66,19 @@ async def get_async_db() -> AsyncSession:
             await session.close()
 
 
+async def get_async_read_db() -> AsyncSession:
+    """Сессия только для чтения: история, сравнения, списки"""
+    async with async_read_session_maker() as session:
+        try:
+            yield session
+        except SQLAlchemyError as e:
+            logger.error(f"Database read session error: {e}")
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
 @asynccontextmanager
 async def get_async_session():
     async with async_session_maker() as session:
@@ -55,9 +92,25 @@ async def get_async_session():
             await session.close()
 
 
+@asynccontextmanager
+async def get_async_read_session():
+    async with async_read_session_maker() as session:
+        try:
+            yield session
+        except SQLAlchemyError as e:
+            logger.error(f"Database read session error: {e}")
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+
 async def init_db():
     """Инициализация базы данных"""
-    from .models import user, product, price_history, task_history
+    from .models import (
+        user, product, price_history, task_history, price_rollup, latest_price, price_analytics,
+        price_stats, price_anomaly, price_alert, marketplace_fee, net_arbitrage,
+    )
     
     try:
         async with engine.begin() as conn:
@@ -68,6 +121,41 @@ async def init_db():
         raise
 
 
+def get_alembic_head() -> Optional[str]:
+    """Последняя ревизия миграций из каталога alembic"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+    return ScriptDirectory.from_config(Config(config_path)).get_current_head()
+
+
+async def check_db_revision() -> bool:
+    """
+    Быстрая проверка схемы при старте: сравнить ревизию в базе с головой миграций
+    вместо create_all по всем моделям
+    """
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = result.scalar_one_or_none()
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to read alembic revision: {e}")
+        raise
+
+    head = get_alembic_head()
+    if current != head:
+        logger.warning(
+            f"Database schema is at revision {current}, expected {head}. Run: alembic upgrade head"
+        )
+        return False
+
+    logger.info(f"Database schema is up to date (revision {current})")
+    return True
+
+
 async def close_db():
     """Закрытие соединения с базой данных"""
+    if read_engine is not engine:
+        await read_engine.dispose()
     await engine.dispose()
\ No newline at end of file
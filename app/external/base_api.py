@@ -6,11 +6,39 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 import re
+import time
 import httpx
-from fake_useragent import UserAgent
+
+from app.external.identity_pool import Identity, get_identity_pool
+from app.utils.metrics import MARKETPLACE_REQUEST_SECONDS, MARKETPLACE_RESPONSES, MATCH_SECONDS, observe
 
 logger = logging.getLogger(__name__)
 
+_user_agent = None
+
+
+def get_user_agent():
+    """Общий на процесс генератор User-Agent: датасет fake_useragent грузится один раз"""
+    global _user_agent
+    if _user_agent is None:
+        from fake_useragent import UserAgent
+        _user_agent = UserAgent()
+    return _user_agent
+
+
+def preload_shared_data() -> None:
+    """Прогреть общие данные клиентов при старте процесса, а не на первом запросе"""
+    get_user_agent()
+    get_identity_pool()
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-After в секундах; дату вместо числа площадки не присылают"""
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
 
 @dataclass
 class ProductInfo:
@@ -74,6 +102,11 @@ class ProductMatcher:
         if not products:
             return None
         
+        with observe(MATCH_SECONDS):
+            return ProductMatcher._find_best_match(query, products)
+    
+    @staticmethod
+    def _find_best_match(query: str, products: List[ProductInfo]) -> Optional[ProductInfo]:
         best_product = None
         best_score = 0.0
         
@@ -105,8 +138,10 @@ class ProductMatcher:
 class BaseMarketplaceAPI(ABC):
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
+        # session — прямое подключение, его заголовки общие для всех маршрутов
         self.session: Optional[httpx.AsyncClient] = None
-        self._user_agent = UserAgent()
+        self._proxy_sessions: Dict[str, httpx.AsyncClient] = {}
+        self._identities = get_identity_pool()
         
     async def __aenter__(self):
         await self._init_session()
@@ -120,7 +155,6 @@ class BaseMarketplaceAPI(ABC):
             self.session = httpx.AsyncClient(
                 timeout=30.0,
                 headers={
-                    'User-Agent': self._user_agent.random,
                     'Accept': 'application/json',
                     'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8',
                     'Accept-Encoding': 'gzip, deflate, br',
@@ -131,16 +165,57 @@ class BaseMarketplaceAPI(ABC):
             )
     
     async def _close_session(self):
+        for client in self._proxy_sessions.values():
+            await client.aclose()
+        self._proxy_sessions.clear()
         if self.session:
             await self.session.aclose()
             self.session = None
     
-    async def _make_request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+    def _client_for(self, identity: Identity) -> httpx.AsyncClient:
+        """Клиент маршрута личности: соединения через один прокси переиспользуются"""
+        if identity.proxy is None:
+            return self.session
+        if identity.proxy not in self._proxy_sessions:
+            self._proxy_sessions[identity.proxy] = httpx.AsyncClient(timeout=30.0, proxies=identity.proxy)
+        return self._proxy_sessions[identity.proxy]
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Запрос к площадке от очередной личности из общего пула с замером
+        времени и учетом кода ответа; результат идет в оценку личности
+        """
         if not self.session:
             await self._init_session()
         
+        identity = self._identities.acquire(self.marketplace_name)
+        # Копия httpx.Headers: присваивание заменяет заголовок без учета регистра,
+        # а не добавляет второй рядом с User-Agent по умолчанию от httpx
+        headers = self.session.headers.copy()
+        headers['User-Agent'] = identity.user_agent
+        headers.update(kwargs.pop('headers', None) or {})
+        response: Optional[httpx.Response] = None
+        started = time.perf_counter()
+        try:
+            with observe(MARKETPLACE_REQUEST_SECONDS, marketplace=self.marketplace_name):
+                response = await self._client_for(identity).request(method, url, headers=headers, **kwargs)
+            return response
+        finally:
+            status = response.status_code if response is not None else None
+            self._identities.report(
+                self.marketplace_name,
+                identity,
+                status,
+                time.perf_counter() - started,
+                parse_retry_after(response) if status == 429 else None,
+            )
+            MARKETPLACE_RESPONSES.labels(
+                marketplace=self.marketplace_name, status=str(status) if status else "error"
+            ).inc()
+    
+    async def _make_request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
         try:
-            response = await self.session.request(method, url, **kwargs)
+            response = await self._send(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
         except httpx.HTTPStatusError as e:
@@ -0,0 +1,156 @@
+"""
+Общий на процесс пул сетевых «личностей» клиентов маркетплейсов
+
+Личность — пара User-Agent и маршрута: прямое подключение или прокси из
+SCRAPER_PROXIES. Для каждой площадки у личности своя оценка здоровья:
+EWMA доли ответов без блокировки и EWMA задержки. Запрос получает личность
+выбором лучшей из двух случайных (power of two choices) — нагрузка
+расходится по пулу, а плохие личности берутся реже. После 403, 429 или
+сетевой ошибки личность уходит на паузу, растущую вдвое с каждой неудачей
+подряд; 429 — ограничение по IP, поэтому на паузу уходит весь маршрут.
+"""
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.metrics import MARKETPLACE_IDENTITY_COOLDOWNS
+
+BLOCK_STATUSES = (403, 429)
+
+
+@dataclass(frozen=True)
+class Identity:
+    index: int
+    user_agent: str
+    proxy: Optional[str] = None
+
+
+@dataclass
+class IdentityHealth:
+    score: float = 1.0  # EWMA: 1 — отвечают, 0 — блокируют
+    latency: float = 0.0  # EWMA времени ответа, с
+    failures: int = 0  # неудач подряд
+    cooldown_until: float = 0.0
+
+
+class IdentityPool:
+    def __init__(
+        self,
+        identities: Sequence[Identity],
+        alpha: float = 0.2,
+        cooldown: float = 30.0,
+        max_cooldown: float = 900.0,
+        latency_target: float = 1.0,
+    ):
+        if not identities:
+            raise ValueError("Identity pool is empty")
+        self.identities = list(identities)
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency_target = latency_target
+        self._health: Dict[Tuple[str, int], IdentityHealth] = {}
+        self._route_cooldown: Dict[Tuple[str, Optional[str]], float] = {}
+
+    def health(self, marketplace: str, identity: Identity) -> IdentityHealth:
+        key = (marketplace, identity.index)
+        if key not in self._health:
+            self._health[key] = IdentityHealth()
+        return self._health[key]
+
+    def rating(self, marketplace: str, identity: Identity) -> float:
+        """Оценка для выбора: успешность, пониженная за медленные ответы"""
+        health = self.health(marketplace, identity)
+        return health.score / (1 + health.latency / self.latency_target)
+
+    def available_at(self, marketplace: str, identity: Identity) -> float:
+        return max(
+            self.health(marketplace, identity).cooldown_until,
+            self._route_cooldown.get((marketplace, identity.proxy), 0.0),
+        )
+
+    def acquire(self, marketplace: str) -> Identity:
+        """Личность для одного запроса к площадке"""
+        now = time.monotonic()
+        candidates = [
+            identity for identity in random.sample(self.identities, min(2, len(self.identities)))
+            if self.available_at(marketplace, identity) <= now
+        ]
+        if not candidates:
+            # Обе случайные на паузе — ищем любую доступную
+            candidates = [
+                identity for identity in self.identities
+                if self.available_at(marketplace, identity) <= now
+            ]
+        if not candidates:
+            # На паузе весь пул: лучше та, что освободится раньше, чем простой
+            return min(self.identities, key=lambda identity: self.available_at(marketplace, identity))
+        return max(candidates, key=lambda identity: self.rating(marketplace, identity))
+
+    def report(
+        self,
+        marketplace: str,
+        identity: Identity,
+        status: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Учесть результат запроса. status None — запрос не дошел до площадки.
+        Ответы 5xx говорят о площадке, а не о личности, и оценку не меняют.
+        """
+        health = self.health(marketplace, identity)
+        if status is not None:
+            health.latency = latency if health.latency == 0 else health.latency + self.alpha * (latency - health.latency)
+        if status is not None and status >= 500:
+            return
+
+        blocked = status is None or status in BLOCK_STATUSES
+        health.score += self.alpha * ((0.0 if blocked else 1.0) - health.score)
+        if not blocked:
+            health.failures = 0
+            return
+
+        health.failures += 1
+        pause = min(self.cooldown * 2 ** (health.failures - 1), self.max_cooldown)
+        if retry_after:
+            pause = max(pause, min(retry_after, self.max_cooldown))
+        health.cooldown_until = time.monotonic() + pause
+        if status == 429:
+            self._route_cooldown[(marketplace, identity.proxy)] = health.cooldown_until
+        MARKETPLACE_IDENTITY_COOLDOWNS.labels(
+            marketplace=marketplace, reason=str(status) if status else "error"
+        ).inc()
+
+
+def build_identities(user_agents: Sequence[str], proxies: Sequence[str], direct: bool) -> List[Identity]:
+    """Каждый User-Agent на каждом маршруте; без прокси остается прямое подключение"""
+    routes: List[Optional[str]] = ([None] if direct or not proxies else []) + list(proxies)
+    return [
+        Identity(index, user_agent, proxy)
+        for index, (proxy, user_agent) in enumerate(
+            (proxy, user_agent) for proxy in routes for user_agent in user_agents
+        )
+    ]
+
+
+_identity_pool: Optional[IdentityPool] = None
+
+
+def get_identity_pool() -> IdentityPool:
+    global _identity_pool
+    if _identity_pool is None:
+        from app.external.base_api import get_user_agent
+
+        generator = get_user_agent()
+        user_agents = list(dict.fromkeys(generator.random for _ in range(settings.SCRAPER_USER_AGENTS)))
+        _identity_pool = IdentityPool(
+            build_identities(user_agents, settings.SCRAPER_PROXIES, settings.SCRAPER_DIRECT_CONNECTION),
+            alpha=settings.SCRAPER_HEALTH_ALPHA,
+            cooldown=settings.SCRAPER_COOLDOWN_SECONDS,
+            max_cooldown=settings.SCRAPER_MAX_COOLDOWN_SECONDS,
+            latency_target=settings.SCRAPER_LATENCY_TARGET,
+        )
+    return _identity_pool
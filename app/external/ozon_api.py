@@ -8,6 +8,7 @@ from urllib.parse import quote
 import asyncio
 
 from .base_api import BaseMarketplaceAPI, ProductInfo, ProductNotFoundError
+from app.utils.metrics import PARSE_SECONDS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +47,7 @@ class OzonAPI(BaseMarketplaceAPI):
                 'from_global': 'true'
             }
             
-            response = await self.session.get(search_url, params=params)
+            response = await self._send('GET', search_url, params=params)
             
             if response.status_code == 403:
                 return []
@@ -82,7 +83,7 @@ class OzonAPI(BaseMarketplaceAPI):
             product_url = f"{self.BASE_URL}/product/{product_id}/"
             
             try:
-                response = await self.session.get(product_url)
+                response = await self._send('GET', product_url)
                 if response.status_code == 403:
                     return None
                 response.raise_for_status()
@@ -95,6 +96,7 @@ class OzonAPI(BaseMarketplaceAPI):
             logger.error(f"Error getting Ozon product {product_id}: {e}")
             return None
 
+    @timed(PARSE_SECONDS, marketplace="ozon", page="search")
     async def _parse_search_page(self, html: str, limit: int) -> List[ProductInfo]:
         try:
             soup = BeautifulSoup(html, 'html.parser')
@@ -209,6 +211,7 @@ class OzonAPI(BaseMarketplaceAPI):
             logger.error(f"Error parsing search item: {e}")
             return None
 
+    @timed(PARSE_SECONDS, marketplace="ozon", page="product")
     async def _parse_product_page(self, html: str, product_id: str) -> Optional[ProductInfo]:
         try:
             soup = BeautifulSoup(html, 'html.parser')
@@ -0,0 +1,22 @@
+"""
+Реестр клиентов маркетплейсов
+"""
+from importlib import import_module
+from typing import Dict, List, Type
+
+# Имя маркетплейса -> путь к классу клиента. Классы импортируются по требованию,
+# чтобы процессу API не приходилось грузить httpx и данные клиентов ради списка имен.
+MARKETPLACE_CLIENTS: Dict[str, str] = {
+    "wildberries": "app.external.wildberries_api.WildberriesAPI",
+    "ozon": "app.external.ozon_api.OzonAPI",
+    "yandex_market": "app.external.yandex_market_api.YandexMarketAPI",
+}
+
+
+def registered_marketplaces() -> List[str]:
+    return list(MARKETPLACE_CLIENTS)
+
+
+def get_client_class(marketplace: str) -> Type:
+    module_path, class_name = MARKETPLACE_CLIENTS[marketplace].rsplit(".", 1)
+    return getattr(import_module(module_path), class_name)
@@ -6,6 +6,7 @@ from typing import List, Optional, Dict, Any
 from urllib.parse import quote
 
 from .base_api import BaseMarketplaceAPI, ProductInfo, ProductNotFoundError
+from app.utils.metrics import PARSE_SECONDS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +94,7 @@ class WildberriesAPI(BaseMarketplaceAPI):
             logger.error(f"Error getting Wildberries product {product_id}: {e}")
             return None
     
+    @timed(PARSE_SECONDS, marketplace="wildberries", page="item")
     async def _parse_product_item(self, item: Dict[str, Any]) -> Optional[ProductInfo]:
         try:
             product_id = str(item.get('id', ''))
@@ -7,6 +7,7 @@ from typing import List, Optional, Dict, Any
 from urllib.parse import quote, urlencode
 
 from .base_api import BaseMarketplaceAPI, ProductInfo, ProductNotFoundError
+from app.utils.metrics import PARSE_SECONDS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -109,6 +110,7 @@ class YandexMarketAPI(BaseMarketplaceAPI):
             logger.error(f"Error getting Yandex.Market product {product_id}: {e}")
             return None
 
+    @timed(PARSE_SECONDS, marketplace="yandex_market", page="item")
     async def _parse_product_item(self, item: Dict[str, Any]) -> Optional[ProductInfo]:
         try:
             product_id = str(item.get('id', ''))
@@ -4,17 +4,28 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import init_db, close_db
+from .config import settings
+from .database import init_db, check_db_revision, close_db
+from .services.price_stream import price_update_broker
+from .utils.redis_client import init_redis, close_redis
+from .utils.metrics import CONTENT_TYPE_LATEST, render_metrics
+from .utils.profiling import ProfilingMiddleware, api_profiling_enabled
 from .api.v1.api import api_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    if settings.DB_CREATE_ALL_ON_STARTUP:
+        await init_db()
+    else:
+        await check_db_revision()
+    await init_redis()
     yield
+    await price_update_broker.stop()
+    await close_redis()
     await close_db()
 
 
@@ -33,6 +44,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Выключенное профилирование не добавляет в цепочку даже проверку
+if api_profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
 try:
     app.include_router(api_router, prefix="/api/v1")
 except Exception as e:
@@ -49,6 +64,11 @@ async def health_check():
     return {"status": "healthy", "message": "API is working correctly"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -3,6 +3,19 @@ from app.models.user import User
 from app.models.product import Product
 from app.models.price_history import PriceHistory
 from app.models.task_history import TaskHistory
+from app.models.price_rollup import PriceRollupHourly, PriceRollupDaily
+from app.models.latest_price import ProductLatestPrice
+from app.models.price_analytics import PriceAnalyticsSummary
+from app.models.price_stats import PriceSeriesStats
+from app.models.price_anomaly import PriceAnomaly
+from app.models.price_alert import PriceAlertRule
+from app.models.marketplace_fee import MarketplaceFee
+from app.models.net_arbitrage import NetArbitrageOpportunity
 
 
-__all__ = ["Base", "User", "Product", "PriceHistory", "TaskHistory"]
\ No newline at end of file
+__all__ = [
+    "Base", "User", "Product", "PriceHistory", "TaskHistory",
+    "PriceRollupHourly", "PriceRollupDaily", "ProductLatestPrice",
+    "PriceAnalyticsSummary", "PriceSeriesStats", "PriceAnomaly", "PriceAlertRule",
+    "MarketplaceFee", "NetArbitrageOpportunity",
+]
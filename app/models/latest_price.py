@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, ForeignKey, PrimaryKeyConstraint, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class ProductLatestPrice(Base):
+    """Текущая цена товара на маркетплейсе, обновляется при каждой записи цены"""
+    __tablename__ = "product_latest_price"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "marketplace"),
+        # Keyset-пагинация ленты последних обновлений
+        Index("ix_product_latest_price_observed_key", "observed_at", "product_id", "marketplace"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    marketplace = Column(String, nullable=False)
+    price = Column(Float, nullable=False)
+    currency = Column(String, nullable=False, default="RUB")
+    availability = Column(Boolean, nullable=False, default=True)
+    observed_at = Column(DateTime, nullable=False)
+
+    product = relationship("Product")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class MarketplaceFee(Base):
+    """
+    Тариф продавца на маркетплейсе. Пустая категория — тариф площадки по
+    умолчанию, строка с категорией переопределяет его для товаров категории.
+    """
+    __tablename__ = "marketplace_fees"
+    __table_args__ = (
+        UniqueConstraint("marketplace", "category", name="uq_marketplace_fees_marketplace_category"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    marketplace = Column(String, nullable=False)
+    category = Column(String, nullable=False, default="")
+    commission_percent = Column(Float, nullable=False, default=0.0)  # от цены продажи
+    logistics_cost = Column(Float, nullable=False, default=0.0)  # за единицу, ₽
+    return_rate_percent = Column(Float, nullable=False, default=0.0)  # доля возвратов
+    return_cost = Column(Float, nullable=False, default=0.0)  # потери на одном возврате, ₽
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
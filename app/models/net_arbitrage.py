@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, PrimaryKeyConstraint
+from app.database import Base
+
+
+class NetArbitrageOpportunity(Base):
+    """
+    Чистая маржа перепродажи товара: купить на одной площадке, продать
+    на другой с учетом ее комиссии, логистики и возвратов. Таблица целиком
+    пересчитывается пакетной задачей; rank — место по чистой прибыли.
+    """
+    __tablename__ = "net_arbitrage_opportunities"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "buy_marketplace", "sell_marketplace"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    buy_marketplace = Column(String, nullable=False)
+    sell_marketplace = Column(String, nullable=False)
+    category = Column(String, nullable=True)
+    buy_price = Column(Float, nullable=False)
+    sell_price = Column(Float, nullable=False)
+    fees = Column(Float, nullable=False)  # комиссия, логистика и ожидаемые потери на возвратах
+    net_profit = Column(Float, nullable=False)
+    net_margin_percent = Column(Float, nullable=False)  # от цены покупки
+    rank = Column(Integer, nullable=False, index=True)
+    computed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class PriceAlertRule(Base):
+    """
+    Оповещение пользователя о цене товара. Правило одноразовое: при
+    срабатывании оно выключается и запоминает, на каком значении сработало.
+    """
+    __tablename__ = "price_alert_rules"
+    __table_args__ = (
+        # Срабатывание — диапазонный поиск по порогу среди активных правил товара
+        Index(
+            "ix_price_alert_rules_lookup", "product_id", "kind", "threshold",
+            postgresql_where=text("is_active"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # below, drop_percent, spread
+    marketplace = Column(String, nullable=True)  # None — любая площадка
+    value = Column(Float, nullable=False)  # как задал пользователь: цена или проценты
+    reference_price = Column(Float, nullable=True)  # цена, от которой считается падение
+    threshold = Column(Float, nullable=False)  # цена срабатывания или порог разрыва в процентах
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=func.now())
+    triggered_at = Column(DateTime, nullable=True)
+    triggered_value = Column(Float, nullable=True)  # цена или разрыв при срабатывании
+    triggered_marketplace = Column(String, nullable=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, PrimaryKeyConstraint
+from app.database import Base
+
+
+class PriceAnalyticsSummary(Base):
+    """Сводная аналитика ряда цен товара на маркетплейсе за окно в днях"""
+    __tablename__ = "price_analytics_summary"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "marketplace", "window_days"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    marketplace = Column(String, nullable=False)
+    window_days = Column(Integer, nullable=False)
+    observations = Column(Integer, nullable=False)
+    first_price = Column(Float, nullable=False)
+    last_price = Column(Float, nullable=False)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    mean_price = Column(Float, nullable=False)
+    moving_average_short = Column(Float, nullable=False)  # скользящее среднее последних наблюдений
+    moving_average_long = Column(Float, nullable=False)
+    change_percent = Column(Float, nullable=False)  # последняя цена к первой в окне
+    volatility = Column(Float, nullable=False)  # ст. отклонение изменений цены между наблюдениями, %
+    trend_per_day = Column(Float, nullable=False)  # наклон линейной регрессии цены, руб./день
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class PriceAnomaly(Base):
+    """Подозрительная цена: резкое отклонение от EWMA ряда на момент записи"""
+    __tablename__ = "price_anomalies"
+    __table_args__ = (
+        Index("ix_price_anomalies_product_observed", "product_id", "observed_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    marketplace = Column(String, nullable=False)
+    price = Column(Float, nullable=False)
+    baseline = Column(Float, nullable=False)  # EWMA до наблюдения
+    std_dev = Column(Float, nullable=False)  # экспоненциальное отклонение до наблюдения
+    z_score = Column(Float, nullable=True)
+    change_percent = Column(Float, nullable=False)
+    rule = Column(String, nullable=False)  # сработавшие правила: z_score, percent_drop
+    observed_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=func.now())
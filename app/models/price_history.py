@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class PriceHistory(Base):
     __tablename__ = "price_history"
+    __table_args__ = (
+        # Keyset-пагинация истории товара по (created_at, id)
+        Index("ix_price_history_product_created_id", "product_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
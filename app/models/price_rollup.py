@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, PrimaryKeyConstraint
+from app.database import Base
+
+
+class PriceRollupMixin:
+    """Свечи OHLC по товару и маркетплейсу за один интервал"""
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    marketplace = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)  # начало интервала
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False, default=1)
+    opened_at = Column(DateTime, nullable=False)  # время первой цены в интервале
+    closed_at = Column(DateTime, nullable=False)  # время последней цены в интервале
+
+
+class PriceRollupHourly(PriceRollupMixin, Base):
+    __tablename__ = "price_rollup_hourly"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "marketplace", "bucket"),
+    )
+
+
+class PriceRollupDaily(PriceRollupMixin, Base):
+    __tablename__ = "price_rollup_daily"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "marketplace", "bucket"),
+    )
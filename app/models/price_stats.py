@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, PrimaryKeyConstraint
+from app.database import Base
+
+
+class PriceSeriesStats(Base):
+    """
+    Накопительная статистика ряда цен товара на маркетплейсе.
+    Обновляется за O(1) при каждой записи цены, историю не перечитывает.
+    """
+    __tablename__ = "price_series_stats"
+    __table_args__ = (
+        PrimaryKeyConstraint("product_id", "marketplace"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    marketplace = Column(String, nullable=False)
+
+    # Welford: число наблюдений, среднее и сумма квадратов отклонений
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+
+    # Экспоненциально взвешенные среднее и дисперсия
+    ewma = Column(Float, nullable=False)
+    ewm_variance = Column(Float, nullable=False, default=0.0)
+
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+
+    # Минимум и максимум в текущем и предыдущем окне фиксированной длины
+    window_started_at = Column(DateTime, nullable=False)
+    window_min = Column(Float, nullable=False)
+    window_max = Column(Float, nullable=False)
+    prev_window_min = Column(Float, nullable=True)
+    prev_window_max = Column(Float, nullable=True)
+
+    last_price = Column(Float, nullable=False)
+    first_observed_at = Column(DateTime, nullable=False)
+    last_observed_at = Column(DateTime, nullable=False)
+    last_changed_at = Column(DateTime, nullable=False)  # когда цена последний раз отличалась от предыдущей
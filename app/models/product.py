@@ -9,9 +9,16 @@ class Product(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
+    category = Column(String, nullable=True, index=True)
     amazon_url = Column(String, nullable=True)
     wildberries_url = Column(String, nullable=True)
     ozon_url = Column(String, nullable=True)
+    yandex_market_url = Column(String, nullable=True)
+
+    # Идентификаторы карточек на площадках — по ним мониторинг запрашивает цены
+    wildberries_id = Column(String, nullable=True)
+    ozon_id = Column(String, nullable=True)
+    yandex_market_id = Column(String, nullable=True)
 
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=func.now())
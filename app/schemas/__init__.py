@@ -1,18 +1,36 @@
-from .user import User, UserCreate, UserUpdate
-from .product import Product, ProductCreate, ProductUpdate
-from .price_history import PriceHistory, PriceHistoryCreate
-from .monitoring import ProductMatch, MonitoringTask
+from .user import User, UserCreate, UserUpdate, TokenRequest, Token, CurrentUser
+from .product import Product, ProductCreate, ProductUpdate, ProductImportJob
+from .price_history import (
+    PriceHistory, PriceHistoryCreate, PriceHistoryUpdate, PriceCandle,
+    LatestPrice, MarketplacePrice, PriceComparison,
+    BulkComparisonRequest, ProductComparisonSummary, BulkComparison,
+    ArbitrageOpportunity, ArbitrageRanking, PriceAnalytics, PriceStats,
+    NetArbitragePair, MarketplaceFee, NetArbitrageOpportunity
+)
+from .alert import PriceAlertRuleCreate, PriceAlertRule
+from .monitoring import (
+    MonitoringRequest, MonitoringResponse, TaskResultResponse,
+    MarketplaceRequest, MarketplaceResponse, PriceResult,
+    ArbitrageAnalysis, MonitoringResult, TaskListResponse,
+    TestTaskResponse, BatchTaskStatusRequest, BatchTaskStatusResponse
+)
 
 __all__ = [
     # User schemas
-    "User", "UserCreate", "UserUpdate",
+    "User", "UserCreate", "UserUpdate", "TokenRequest", "Token", "CurrentUser",
     # Product schemas  
-    "Product", "ProductCreate", "ProductUpdate",
+    "Product", "ProductCreate", "ProductUpdate", "ProductImportJob",
     # Price history schemas
-    "PriceHistory", "PriceHistoryCreate", "PriceHistoryUpdate",
+    "PriceHistory", "PriceHistoryCreate", "PriceHistoryUpdate", "PriceCandle",
+    "LatestPrice", "MarketplacePrice", "PriceComparison",
+    "BulkComparisonRequest", "ProductComparisonSummary", "BulkComparison",
+    "ArbitrageOpportunity", "ArbitrageRanking", "PriceAnalytics", "PriceStats",
+    "NetArbitragePair", "MarketplaceFee", "NetArbitrageOpportunity",
+    # Alert schemas
+    "PriceAlertRuleCreate", "PriceAlertRule",
     # Monitoring schemas
     "MonitoringRequest", "MonitoringResponse", "TaskResultResponse",
     "MarketplaceRequest", "MarketplaceResponse", "PriceResult",
     "ArbitrageAnalysis", "MonitoringResult", "TaskListResponse",
-    "TestTaskResponse"
+    "TestTaskResponse", "BatchTaskStatusRequest", "BatchTaskStatusResponse"
 ]
\ No newline at end of file
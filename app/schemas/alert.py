@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class PriceAlertRuleCreate(BaseModel):
+    product_id: int
+    kind: str = Field(
+        ...,
+        pattern="^(below|drop_percent|spread)$",
+        description="below — цена не выше value, drop_percent — падение на value процентов, "
+                    "spread — разрыв цен между площадками не меньше value процентов"
+    )
+    value: float = Field(..., gt=0)
+    marketplace: Optional[str] = Field(None, description="Площадка; по умолчанию любая")
+
+class PriceAlertRule(BaseModel):
+    id: int
+    user_id: int
+    product_id: int
+    kind: str
+    marketplace: Optional[str] = None
+    value: float
+    reference_price: Optional[float] = None
+    threshold: float
+    is_active: bool
+    created_at: datetime
+    triggered_at: Optional[datetime] = None
+    triggered_value: Optional[float] = None
+    triggered_marketplace: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class MonitoringRequest(BaseModel):
@@ -15,9 +15,16 @@ class MonitoringResponse(BaseModel):
 class TaskResultResponse(BaseModel):
     task_id: str
     status: str
-    result: Optional[Dict[str, Any]] = None
+    result: Optional[Any] = None
     error: Optional[str] = None
 
+class BatchTaskStatusRequest(BaseModel):
+    task_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+class BatchTaskStatusResponse(BaseModel):
+    results: List[TaskResultResponse]
+    not_found: List[str] = []
+
 class MarketplaceRequest(BaseModel):
     product_name: str
     marketplace: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
@@ -35,24 +35,65 @@ class PriceHistory(PriceHistoryBase):
             }
         }
 
+class PriceCandle(BaseModel):
+    marketplace: str
+    bucket: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int
+
+    class Config:
+        from_attributes = True
+
 class PriceHistoryList(BaseModel):
-    items: list[PriceHistory]
-    total: int
-    page: int
-    size: int
+    product_id: int
+    product_name: str
+    resolution: str = "raw"
+    total_records: int
+    history: list[PriceHistory] = []
+    candles: list[PriceCandle] = []
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    limit: int
 
-class PriceComparisonItem(BaseModel):
+class LatestPrice(BaseModel):
+    product_id: int
     marketplace: str
-    current_price: float
-    previous_price: Optional[float] = None
-    price_change: Optional[float] = None
-    price_change_percent: Optional[float] = None
+    price: float
+    currency: str = "RUB"
+    availability: bool = True
+    observed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class MarketplacePrice(BaseModel):
+    marketplace: str
+    price: float
+    currency: str = "RUB"
+    availability: bool = True
+    last_updated: datetime
+
+class NetArbitragePair(BaseModel):
+    buy_marketplace: str
+    sell_marketplace: str
+    buy_price: float
+    sell_price: float
+    fees: float
+    net_profit: float
+    net_margin_percent: float
 
 class PriceComparison(BaseModel):
     product_id: int
     product_name: str
     comparison_date: datetime
-    marketplaces: list[PriceComparisonItem]
+    prices: list[MarketplacePrice]
+    min_price: MarketplacePrice
+    max_price: MarketplacePrice
+    arbitrage_opportunity: float
+    net_arbitrage: Optional[NetArbitragePair] = None  # лучшая пара с учетом тарифов площадок
     
     class Config:
         schema_extra = {
@@ -60,14 +101,155 @@ class PriceComparison(BaseModel):
                 "product_id": 1,
                 "product_name": "iPhone 15",
                 "comparison_date": "2024-01-15T10:30:00",
-                "marketplaces": [
+                "prices": [
+                    {
+                        "marketplace": "wildberries",
+                        "price": 1500.00,
+                        "currency": "RUB",
+                        "availability": True,
+                        "last_updated": "2024-01-15T10:00:00"
+                    },
                     {
-                        "marketplace": "amazon",
-                        "current_price": 1500.00,
-                        "previous_price": 1600.00,
-                        "price_change": -100.00,
-                        "price_change_percent": -6.25
+                        "marketplace": "ozon",
+                        "price": 1600.00,
+                        "currency": "RUB",
+                        "availability": True,
+                        "last_updated": "2024-01-15T10:05:00"
                     }
-                ]
+                ],
+                "min_price": {
+                    "marketplace": "wildberries",
+                    "price": 1500.00,
+                    "currency": "RUB",
+                    "availability": True,
+                    "last_updated": "2024-01-15T10:00:00"
+                },
+                "max_price": {
+                    "marketplace": "ozon",
+                    "price": 1600.00,
+                    "currency": "RUB",
+                    "availability": True,
+                    "last_updated": "2024-01-15T10:05:00"
+                },
+                "arbitrage_opportunity": 100.00
             }
-        }
\ No newline at end of file
+        }
+
+class BulkComparisonRequest(BaseModel):
+    product_ids: Optional[list[int]] = None
+    user_id: Optional[int] = None
+    name_contains: Optional[str] = None
+    marketplaces: Optional[list[str]] = None
+    min_arbitrage: float = 0.0
+    limit: int = Field(500, ge=1, le=5000)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "user_id": 1,
+                "min_arbitrage": 100.0,
+                "limit": 500
+            }
+        }
+
+class ProductComparisonSummary(BaseModel):
+    product_id: int
+    product_name: str
+    prices: list[MarketplacePrice]
+    min_price: float
+    min_marketplace: str
+    max_price: float
+    max_marketplace: str
+    arbitrage_opportunity: float
+
+class BulkComparison(BaseModel):
+    comparison_date: datetime
+    marketplaces: list[str]
+    total: int
+    items: list[ProductComparisonSummary]
+
+
+class ArbitrageOpportunity(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None
+    user_id: Optional[int] = None
+    category: Optional[str] = None
+    min_marketplace: str
+    min_price: float
+    max_marketplace: str
+    max_price: float
+    spread: float
+    spread_percent: float
+    updated_at: datetime
+
+
+class ArbitrageRanking(BaseModel):
+    sort: str
+    items: list[ArbitrageOpportunity]
+
+
+class PriceAnalytics(BaseModel):
+    product_id: int
+    marketplace: str
+    window_days: int
+    observations: int
+    first_price: float
+    last_price: float
+    min_price: float
+    max_price: float
+    mean_price: float
+    moving_average_short: float
+    moving_average_long: float
+    change_percent: float
+    volatility: float
+    trend_per_day: float
+    period_start: datetime
+    period_end: datetime
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PriceStats(BaseModel):
+    product_id: int
+    marketplace: str
+    count: int
+    mean: float
+    std_dev: float
+    ewma: float
+    ewm_std_dev: float
+    min_price: float
+    max_price: float
+    window_days: int
+    window_min: float
+    window_max: float
+    last_price: float
+    first_observed_at: datetime
+    last_observed_at: datetime
+    last_changed_at: datetime
+    price: float  # оцениваемая цена: переданная в запросе или последняя
+    z_score: float
+    ewma_deviation_percent: float
+
+
+class MarketplaceFee(BaseModel):
+    marketplace: str
+    category: str = Field("", description="Пусто — тариф площадки по умолчанию")
+    commission_percent: float = Field(0.0, ge=0, lt=100)
+    logistics_cost: float = Field(0.0, ge=0)
+    return_rate_percent: float = Field(0.0, ge=0, le=100)
+    return_cost: float = Field(0.0, ge=0)
+
+    class Config:
+        from_attributes = True
+
+
+class NetArbitrageOpportunity(NetArbitragePair):
+    product_id: int
+    category: Optional[str] = None
+    rank: int
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
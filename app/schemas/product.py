@@ -5,9 +5,14 @@ from datetime import datetime
 class ProductBase(BaseModel):
     name: str
     description: Optional[str] = None
+    category: Optional[str] = None
     amazon_url: Optional[HttpUrl] = None
     wildberries_url: Optional[HttpUrl] = None
     ozon_url: Optional[HttpUrl] = None
+    yandex_market_url: Optional[HttpUrl] = None
+    wildberries_id: Optional[str] = None
+    ozon_id: Optional[str] = None
+    yandex_market_id: Optional[str] = None
 
 class ProductCreate(ProductBase):
     pass
@@ -15,9 +20,11 @@ class ProductCreate(ProductBase):
 class ProductUpdate(ProductBase):
     name: Optional[str] = None
     description: Optional[str] = None
+    category: Optional[str] = None
     amazon_url: Optional[HttpUrl] = None
     wildberries_url: Optional[HttpUrl] = None
     ozon_url: Optional[HttpUrl] = None
+    yandex_market_url: Optional[HttpUrl] = None
 
 class Product(ProductBase):
     id: int
@@ -25,4 +32,17 @@ class Product(ProductBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProductImportJob(BaseModel):
+    """Состояние фоновой загрузки товаров"""
+    job_id: str
+    status: str
+    format: str
+    total: int = 0
+    inserted: int = 0
+    failed: int = 0
+    queued_for_matching: int = 0
+    matched: int = 0
+    unmatched: int = 0
+    last_error: Optional[str] = None
@@ -20,4 +20,19 @@ class User(UserBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TokenRequest(BaseModel):
+    username: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+class CurrentUser(BaseModel):
+    """Минимум данных о пользователе, который хранится в кеше авторизации"""
+    id: int
+    username: str
+    is_active: bool
@@ -1 +1,235 @@
- 
\ No newline at end of file
+"""
+Пакетная аналитика цен на NumPy
+
+История многих товаров загружается одним запросом в плоские массивы,
+которые сортируются по (товар, маркетплейс, время). Границы рядов находятся
+один раз, дальше все показатели — скользящие средние, минимум/максимум,
+изменение цены, волатильность, тренд — считаются для всех рядов сразу через
+reduceat/bincount/cumsum без цикла Python по рядам или наблюдениям.
+Результат перезаписывает таблицу price_analytics_summary.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_read_session, get_async_session
+from app.models.price_analytics import PriceAnalyticsSummary
+from app.models.price_history import PriceHistory
+from app.models.product import Product
+from app.utils.metrics import observe_db_write
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+# Строк на один INSERT: 17 колонок, asyncpg допускает до 32767 параметров
+SUMMARY_INSERT_BATCH = 1000
+
+SUMMARY_FIELDS = (
+    "product_id", "marketplace", "observations", "first_price", "last_price",
+    "min_price", "max_price", "mean_price", "moving_average_short", "moving_average_long",
+    "change_percent", "volatility", "trend_per_day", "period_start", "period_end",
+)
+
+
+def _empty_stats() -> Dict[str, np.ndarray]:
+    return {field: np.empty(0) for field in SUMMARY_FIELDS}
+
+
+def rolling_means(prices: np.ndarray, series_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    Скользящее среднее последних window наблюдений для каждой точки.
+    series_start — индекс начала ряда для каждой точки: окно не заходит в соседний ряд.
+    """
+    index = np.arange(prices.size)
+    lower = np.maximum(index - window + 1, series_start)
+    cumulative = np.concatenate(([0.0], np.cumsum(prices)))
+    return (cumulative[index + 1] - cumulative[lower]) / (index + 1 - lower)
+
+
+def compute_series_stats(
+    product_ids: np.ndarray,
+    marketplaces: np.ndarray,
+    prices: np.ndarray,
+    observed_at: np.ndarray,
+    short_window: int = 7,
+    long_window: int = 30,
+) -> Dict[str, np.ndarray]:
+    """
+    Показатели по каждому ряду (товар, маркетплейс); массивы на входе — по
+    наблюдению, на выходе — по ряду. observed_at — datetime64.
+    """
+    if prices.size == 0:
+        return _empty_stats()
+
+    marketplace_names, marketplace_codes = np.unique(marketplaces, return_inverse=True)
+    seconds = observed_at.astype("datetime64[us]").astype(np.int64) / 1e6
+
+    order = np.lexsort((seconds, marketplace_codes, product_ids))
+    product_ids = product_ids[order]
+    marketplace_codes = marketplace_codes[order]
+    prices = prices[order].astype(np.float64)
+    seconds = seconds[order]
+    observed_at = observed_at[order]
+
+    # Границы рядов
+    new_series = np.empty(prices.size, dtype=bool)
+    new_series[0] = True
+    new_series[1:] = (product_ids[1:] != product_ids[:-1]) | (marketplace_codes[1:] != marketplace_codes[:-1])
+    starts = np.flatnonzero(new_series)
+    series = np.cumsum(new_series) - 1
+    counts = np.diff(np.append(starts, prices.size))
+    ends = starts + counts - 1
+
+    first = prices[starts]
+    last = prices[ends]
+    means = np.add.reduceat(prices, starts) / counts
+
+    # Изменения между соседними наблюдениями одного ряда
+    same_series = ~new_series[1:]
+    returns = np.divide(
+        prices[1:] - prices[:-1], prices[:-1],
+        out=np.zeros(prices.size - 1), where=prices[:-1] > 0,
+    )[same_series]
+    return_series = series[1:][same_series]
+    return_count = np.bincount(return_series, minlength=starts.size)
+    return_sum = np.bincount(return_series, weights=returns, minlength=starts.size)
+    return_sq_sum = np.bincount(return_series, weights=returns ** 2, minlength=starts.size)
+    has_returns = return_count > 0
+    return_mean = np.divide(return_sum, return_count, out=np.zeros(starts.size), where=has_returns)
+    return_var = np.divide(return_sq_sum, return_count, out=np.zeros(starts.size), where=has_returns) - return_mean ** 2
+
+    # Наклон МНК цены по времени; время от начала ряда — ради точности float64
+    days = (seconds - seconds[starts][series]) / SECONDS_PER_DAY
+    sum_t = np.add.reduceat(days, starts)
+    sum_tt = np.add.reduceat(days * days, starts)
+    sum_tp = np.add.reduceat(days * prices, starts)
+    sum_p = means * counts
+    denominator = counts * sum_tt - sum_t ** 2
+    trend = np.divide(
+        counts * sum_tp - sum_t * sum_p, denominator,
+        out=np.zeros(starts.size), where=np.abs(denominator) > 1e-12,
+    )
+
+    series_start = starts[series]
+    return {
+        "product_id": product_ids[starts],
+        "marketplace": marketplace_names[marketplace_codes[starts]],
+        "observations": counts,
+        "first_price": first,
+        "last_price": last,
+        "min_price": np.minimum.reduceat(prices, starts),
+        "max_price": np.maximum.reduceat(prices, starts),
+        "mean_price": means,
+        "moving_average_short": rolling_means(prices, series_start, short_window)[ends],
+        "moving_average_long": rolling_means(prices, series_start, long_window)[ends],
+        "change_percent": np.divide(last - first, first, out=np.zeros(starts.size), where=first > 0) * 100,
+        "volatility": np.sqrt(np.clip(return_var, 0, None)) * 100,
+        "trend_per_day": trend,
+        "period_start": observed_at[starts],
+        "period_end": observed_at[ends],
+    }
+
+
+async def load_price_series(
+    session: AsyncSession,
+    product_ids: Sequence[int],
+    since: datetime,
+) -> Dict[str, np.ndarray]:
+    """История товаров с момента since одним запросом — сразу в массивы"""
+    result = await session.execute(
+        select(PriceHistory.product_id, PriceHistory.marketplace, PriceHistory.price, PriceHistory.created_at)
+        .where(PriceHistory.product_id.in_(product_ids), PriceHistory.created_at >= since)
+    )
+    rows = result.all()
+    if not rows:
+        return {
+            "product_ids": np.empty(0, dtype=np.int64),
+            "marketplaces": np.empty(0, dtype=object),
+            "prices": np.empty(0),
+            "observed_at": np.empty(0, dtype="datetime64[us]"),
+        }
+
+    product_column, marketplace_column, price_column, created_column = zip(*rows)
+    return {
+        "product_ids": np.fromiter(product_column, dtype=np.int64, count=len(rows)),
+        "marketplaces": np.array(marketplace_column, dtype=object),
+        "prices": np.fromiter(price_column, dtype=np.float64, count=len(rows)),
+        "observed_at": np.array(created_column, dtype="datetime64[us]"),
+    }
+
+
+def build_summary_rows(
+    series: Dict[str, np.ndarray],
+    windows: Iterable[int],
+    now: datetime,
+) -> List[Dict[str, Any]]:
+    """Строки сводки по каждому окну: окно — маска по времени над теми же массивами"""
+    rows: List[Dict[str, Any]] = []
+    for window_days in windows:
+        mask = series["observed_at"] >= np.datetime64(now - timedelta(days=window_days), "us")
+        stats = compute_series_stats(
+            series["product_ids"][mask],
+            series["marketplaces"][mask],
+            series["prices"][mask],
+            series["observed_at"][mask],
+            short_window=settings.ANALYTICS_SHORT_WINDOW,
+            long_window=settings.ANALYTICS_LONG_WINDOW,
+        )
+        # tolist() переводит numpy-скаляры в int/float/datetime одним проходом
+        columns = [stats[field].tolist() for field in SUMMARY_FIELDS]
+        for values in zip(*columns):
+            row = dict(zip(SUMMARY_FIELDS, values))
+            row["window_days"] = window_days
+            row["computed_at"] = now
+            rows.append(row)
+    return rows
+
+
+async def refresh_price_analytics(
+    windows: Optional[Sequence[int]] = None,
+    product_batch_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Пересчитать сводку по всем товарам пачками. История пачки читается с
+    реплики, сводка пачки заменяется целиком в одной транзакции записи.
+    """
+    windows = sorted(set(windows or settings.ANALYTICS_WINDOWS_DAYS))
+    product_batch_size = product_batch_size or settings.ANALYTICS_PRODUCT_BATCH_SIZE
+    now = datetime.utcnow()
+    since = now - timedelta(days=max(windows))
+
+    last_id = 0
+    products = summaries = 0
+    while True:
+        async with get_async_read_session() as read_session:
+            result = await read_session.execute(
+                select(Product.id).where(Product.id > last_id).order_by(Product.id).limit(product_batch_size)
+            )
+            product_ids = result.scalars().all()
+            if not product_ids:
+                break
+            series = await load_price_series(read_session, product_ids, since)
+
+        rows = build_summary_rows(series, windows, now)
+        async with get_async_session() as session:
+            with observe_db_write("price_analytics", len(rows)):
+                await session.execute(
+                    delete(PriceAnalyticsSummary).where(PriceAnalyticsSummary.product_id.in_(product_ids))
+                )
+                for start in range(0, len(rows), SUMMARY_INSERT_BATCH):
+                    await session.execute(
+                        insert(PriceAnalyticsSummary).values(rows[start:start + SUMMARY_INSERT_BATCH])
+                    )
+                await session.commit()
+
+        products += len(product_ids)
+        summaries += len(rows)
+        last_id = product_ids[-1]
+
+    logger.info(f"Price analytics refreshed: {products} products, {summaries} summaries")
+    return {"products": products, "summaries": summaries}
@@ -0,0 +1,336 @@
+"""
+Рейтинг арбитражных возможностей в сортированных множествах Redis.
+
+На каждый товар хранится разрыв между самой низкой и самой высокой текущей
+ценой — в рублях (absolute) и в процентах от низкой (relative). Множества
+ведутся глобально, по пользователю и по категории, поэтому топ-N читается
+через ZREVRANGE за O(log n + N) без обращения к Postgres.
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.external.registry import registered_marketplaces
+from app.models.latest_price import ProductLatestPrice
+from app.models.product import Product
+from app.services.notification_service import notify_arbitrage
+from app.utils.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+RANKING_PREFIX = "arbitrage"
+DETAILS_KEY = f"{RANKING_PREFIX}:details"
+# Полная перестройка собирается в отдельных ключах и подменяет рабочие разом
+REBUILD_PREFIX = f"{RANKING_PREFIX}-rebuild"
+# Состояние перестройки лежит вне обоих префиксов, чтобы не попасть под RENAME:
+# флаг идущей перестройки и товары, измененные в рабочем рейтинге за время прохода
+REBUILD_ACTIVE_KEY = f"{RANKING_PREFIX}-rebuild-state:active"
+REBUILD_DIRTY_KEY = f"{RANKING_PREFIX}-rebuild-state:dirty"
+# Флаг переживает упавшую перестройку не дольше суток
+REBUILD_STATE_TTL = 24 * 3600
+# Попыток подмены, если рабочий рейтинг меняется прямо во время нее
+REBUILD_SWAP_ATTEMPTS = 20
+# RENAME отсутствующего ключа — ошибка, а множество может опустеть при переносе
+# удалений; тогда прежний рабочий ключ просто удаляется
+_RENAME_OR_DELETE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+"""
+# Вид рейтинга -> поле записи, которое служит счетом
+RANKING_SORTS = {
+    "absolute": "spread",
+    "relative": "spread_percent",
+}
+
+
+def ranking_key(
+    sort: str,
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    prefix: str = RANKING_PREFIX,
+) -> str:
+    if user_id is not None:
+        return f"{prefix}:{sort}:user:{user_id}"
+    if category is not None:
+        return f"{prefix}:{sort}:category:{category}"
+    return f"{prefix}:{sort}:all"
+
+
+def _scope_keys(sort: str, entry: Dict[str, Any], prefix: str = RANKING_PREFIX) -> List[str]:
+    keys = [ranking_key(sort, prefix=prefix)]
+    if entry.get("user_id") is not None:
+        keys.append(ranking_key(sort, user_id=entry["user_id"], prefix=prefix))
+    if entry.get("category"):
+        keys.append(ranking_key(sort, category=entry["category"], prefix=prefix))
+    return keys
+
+
+def build_arbitrage_entry(
+    product_id: int,
+    product_name: Optional[str],
+    user_id: Optional[int],
+    category: Optional[str],
+    prices: Dict[str, float],
+) -> Optional[Dict[str, Any]]:
+    """Запись рейтинга по текущим ценам товара; None — сравнивать не с чем"""
+    prices = {marketplace: price for marketplace, price in prices.items() if price and price > 0}
+    if len(prices) < 2:
+        return None
+
+    min_marketplace = min(prices, key=prices.get)
+    max_marketplace = max(prices, key=prices.get)
+    spread = prices[max_marketplace] - prices[min_marketplace]
+    return {
+        "product_id": product_id,
+        "product_name": product_name,
+        "user_id": user_id,
+        "category": category,
+        "min_marketplace": min_marketplace,
+        "min_price": prices[min_marketplace],
+        "max_marketplace": max_marketplace,
+        "max_price": prices[max_marketplace],
+        "spread": round(spread, 2),
+        "spread_percent": round(spread / prices[min_marketplace] * 100, 2),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def compute_arbitrage_entries(
+    session: AsyncSession,
+    product_ids: Iterable[int],
+) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Записи рейтинга по product_latest_price — по строке на площадку, история не читается"""
+    product_ids = list(product_ids)
+    lp = ProductLatestPrice
+    result = await session.execute(
+        select(lp.product_id, lp.marketplace, lp.price, Product.name, Product.user_id, Product.category)
+        .join(Product, Product.id == lp.product_id)
+        .where(
+            lp.product_id.in_(product_ids),
+            lp.availability.is_(True),
+            lp.marketplace.in_(registered_marketplaces()),
+        )
+    )
+
+    prices: Dict[int, Dict[str, float]] = defaultdict(dict)
+    products: Dict[int, Any] = {}
+    for row in result.all():
+        prices[row.product_id][row.marketplace] = row.price
+        products[row.product_id] = row
+
+    entries: Dict[int, Optional[Dict[str, Any]]] = {}
+    for product_id in product_ids:
+        row = products.get(product_id)
+        entries[product_id] = row and build_arbitrage_entry(
+            product_id, row.name, row.user_id, row.category, prices[product_id]
+        )
+    return entries
+
+
+def _stage_updates(
+    pipe,
+    entries: Dict[int, Optional[Dict[str, Any]]],
+    previous: List[Optional[str]],
+    prefix: str = RANKING_PREFIX,
+) -> None:
+    """Старая запись нужна, чтобы убрать товар из множеств прежнего владельца или категории"""
+    details_key = f"{prefix}:details"
+    for (product_id, entry), old_raw in zip(entries.items(), previous):
+        if old_raw:
+            old = json.loads(old_raw)
+            for sort in RANKING_SORTS:
+                for key in _scope_keys(sort, old, prefix):
+                    pipe.zrem(key, product_id)
+
+        if entry is None:
+            pipe.hdel(details_key, product_id)
+            continue
+
+        for sort, field in RANKING_SORTS.items():
+            for key in _scope_keys(sort, entry, prefix):
+                pipe.zadd(key, {product_id: entry[field]})
+        pipe.hset(details_key, product_id, json.dumps(entry))
+
+
+async def store_arbitrage_entries(entries: Dict[int, Optional[Dict[str, Any]]], notify: bool = True) -> None:
+    """notify — уведомить владельцев о товарах, разрыв которых впервые превысил порог"""
+    if not entries:
+        return
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.hmget(DETAILS_KEY, list(entries))
+            pipe.exists(REBUILD_ACTIVE_KEY)
+            previous, rebuilding = await pipe.execute()
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            _stage_updates(pipe, entries, previous)
+            if rebuilding:
+                # Перестройка перенесет эти товары, включая удаленные, из рабочего рейтинга
+                pipe.sadd(REBUILD_DIRTY_KEY, *entries)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to update arbitrage ranking for {list(entries)}: {e}")
+        return
+
+    if notify:
+        await notify_arbitrage(
+            entries,
+            {product_id: json.loads(old_raw) for product_id, old_raw in zip(entries, previous) if old_raw},
+        )
+
+
+async def refresh_arbitrage_ranking(session: AsyncSession, product_ids: Iterable[int]) -> None:
+    """Пересчитать товары после записи цен; вызывать после коммита"""
+    await store_arbitrage_entries(await compute_arbitrage_entries(session, product_ids))
+
+
+async def remove_from_arbitrage_ranking(*product_ids: int) -> None:
+    await store_arbitrage_entries({product_id: None for product_id in product_ids})
+
+
+async def top_arbitrage(
+    sort: str = "absolute",
+    limit: int = 20,
+    user_id: Optional[int] = None,
+    category: Optional[str] = None,
+    min_spread: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Топ-N записей рейтинга по убыванию разрыва"""
+    low = min_spread if min_spread is not None else "-inf"
+
+    if user_id is not None and category is not None:
+        # Счет товара одинаков во всех множествах, MAX его сохраняет
+        members = await async_redis_client.zinter(
+            [ranking_key(sort, user_id=user_id), ranking_key(sort, category=category)],
+            aggregate="MAX",
+            withscores=True,
+        )
+        members = sorted(
+            (member for member in members if min_spread is None or member[1] >= min_spread),
+            key=lambda member: member[1],
+            reverse=True,
+        )[:limit]
+    else:
+        members = await async_redis_client.zrevrangebyscore(
+            ranking_key(sort, user_id=user_id, category=category),
+            "+inf",
+            low,
+            start=0,
+            num=limit,
+            withscores=True,
+        )
+
+    if not members:
+        return []
+    details = await async_redis_client.hmget(DETAILS_KEY, [member for member, _ in members])
+    return [json.loads(detail) for detail in details if detail]
+
+
+async def _scan_keys(prefix: str) -> List[str]:
+    return [key async for key in async_redis_client.scan_iter(match=f"{prefix}:*")]
+
+
+async def _swap_rebuilt_ranking() -> bool:
+    """
+    Подменить рабочий рейтинг собранным. Товары, измененные или удаленные
+    в рабочем рейтинге за время прохода, сначала переносятся из него в
+    собранный — в той же транзакции, что и RENAME. WATCH на рабочих
+    записях и множестве измененных прерывает транзакцию, если между чтением
+    и подменой пришло новое обновление; тогда попытка повторяется.
+    """
+    staged_details = f"{REBUILD_PREFIX}:details"
+    for _ in range(REBUILD_SWAP_ATTEMPTS):
+        try:
+            async with async_redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(DETAILS_KEY, REBUILD_DIRTY_KEY)
+                dirty = [int(product_id) for product_id in await pipe.smembers(REBUILD_DIRTY_KEY)]
+                live_raw = await pipe.hmget(DETAILS_KEY, dirty) if dirty else []
+                staged_raw = await pipe.hmget(staged_details, dirty) if dirty else []
+                staged = await _scan_keys(REBUILD_PREFIX)
+                live = set(await _scan_keys(RANKING_PREFIX))
+
+                pipe.multi()
+                _stage_updates(
+                    pipe,
+                    {product_id: raw and json.loads(raw) for product_id, raw in zip(dirty, live_raw)},
+                    staged_raw,
+                    prefix=REBUILD_PREFIX,
+                )
+                # Ключи, которые появятся от переноса, тоже переименовываются
+                for key in set(staged) | _carried_keys(live_raw):
+                    target = RANKING_PREFIX + key[len(REBUILD_PREFIX):]
+                    pipe.eval(_RENAME_OR_DELETE, 2, key, target)
+                    live.discard(target)
+                if live:
+                    pipe.delete(*live)
+                pipe.delete(REBUILD_ACTIVE_KEY, REBUILD_DIRTY_KEY)
+                await pipe.execute()
+                return True
+        except WatchError:
+            continue
+    logger.warning("Arbitrage ranking swap kept conflicting with live updates, rebuild discarded")
+    await async_redis_client.delete(REBUILD_ACTIVE_KEY, REBUILD_DIRTY_KEY, *await _scan_keys(REBUILD_PREFIX))
+    return False
+
+
+def _carried_keys(live_raw: List[Optional[str]]) -> set:
+    """Ключи собранного рейтинга, которые создаст перенос рабочих записей"""
+    keys = {f"{REBUILD_PREFIX}:details"} if any(live_raw) else set()
+    for raw in live_raw:
+        if raw:
+            entry = json.loads(raw)
+            for sort in RANKING_SORTS:
+                keys.update(_scope_keys(sort, entry, REBUILD_PREFIX))
+    return keys
+
+
+async def rebuild_arbitrage_ranking(session: AsyncSession, batch_size: int = 1000) -> int:
+    """
+    Полная перестройка рейтинга по product_latest_price — страховка на случай
+    потерянных обновлений или очистки Redis. Рейтинг собирается в отдельных
+    ключах: пока идет проход, читатели и refresh_arbitrage_ranking работают
+    с прежним рейтингом целиком, а не с пустым или частичным.
+    """
+    stale = await _scan_keys(REBUILD_PREFIX)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        if stale:
+            pipe.delete(*stale)
+        pipe.delete(REBUILD_DIRTY_KEY)
+        pipe.set(REBUILD_ACTIVE_KEY, 1, ex=REBUILD_STATE_TTL)
+        await pipe.execute()
+
+    ranked = 0
+    last_id = 0
+    while True:
+        result = await session.execute(
+            select(ProductLatestPrice.product_id)
+            .where(ProductLatestPrice.product_id > last_id)
+            .group_by(ProductLatestPrice.product_id)
+            .order_by(ProductLatestPrice.product_id)
+            .limit(batch_size)
+        )
+        product_ids = result.scalars().all()
+        if not product_ids:
+            break
+
+        entries = await compute_arbitrage_entries(session, product_ids)
+        staged = {product_id: entry for product_id, entry in entries.items() if entry}
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            _stage_updates(pipe, staged, [None] * len(staged), prefix=REBUILD_PREFIX)
+            await pipe.execute()
+        ranked += len(staged)
+        last_id = product_ids[-1]
+
+    if not await _swap_rebuilt_ranking():
+        return 0
+
+    logger.info(f"Arbitrage ranking rebuilt: {ranked} products")
+    return ranked
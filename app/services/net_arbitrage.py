@@ -0,0 +1,228 @@
+"""
+Чистая арбитражная маржа с учетом тарифов площадок
+
+Текущие цены пачки товаров раскладываются в матрицу товар × площадка
+(NaN — цены нет), тарифы — в матрицы той же формы с учетом категории
+товара. Выручка продавца считается сразу для всех ячеек, а прибыль всех
+пар «купить здесь — продать там» — одной операцией над тензором
+товар × покупка × продажа. Прибыльные пары всего каталога ранжируются по
+чистой прибыли и заменяют таблицу net_arbitrage_opportunities целиком.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_read_session, get_async_session
+from app.external.registry import registered_marketplaces
+from app.models.latest_price import ProductLatestPrice
+from app.models.marketplace_fee import MarketplaceFee
+from app.models.net_arbitrage import NetArbitrageOpportunity
+from app.models.product import Product
+from app.utils.metrics import observe_db_write
+
+logger = logging.getLogger(__name__)
+
+FEE_FIELDS = ("commission_percent", "logistics_cost", "return_rate_percent", "return_cost")
+# Категория тарифа площадки по умолчанию
+DEFAULT_CATEGORY = ""
+# Строк на один INSERT: 11 колонок, asyncpg допускает до 32767 параметров
+NET_INSERT_BATCH = 2000
+
+PAIR_FIELDS = (
+    "buy_marketplace", "sell_marketplace", "buy_price", "sell_price",
+    "fees", "net_profit", "net_margin_percent",
+)
+
+FeeModels = Dict[Tuple[str, str], Tuple[float, ...]]
+
+
+async def load_fee_models(session: AsyncSession) -> FeeModels:
+    result = await session.execute(select(MarketplaceFee))
+    return {
+        (fee.marketplace, fee.category): tuple(getattr(fee, field) for field in FEE_FIELDS)
+        for fee in result.scalars().all()
+    }
+
+
+def fee_matrices(
+    categories: np.ndarray,
+    marketplaces: Sequence[str],
+    fee_models: FeeModels,
+) -> Dict[str, np.ndarray]:
+    """
+    Тарифы [товар, площадка]: тариф категории, иначе тариф площадки по
+    умолчанию, иначе нулевой. Перебираются только различные категории.
+    """
+    category_names, category_codes = np.unique(categories.astype(str), return_inverse=True)
+    zero = (0.0,) * len(FEE_FIELDS)
+    table = np.empty((category_names.size, len(marketplaces), len(FEE_FIELDS)))
+    for m, marketplace in enumerate(marketplaces):
+        default = fee_models.get((marketplace, DEFAULT_CATEGORY), zero)
+        for c, category in enumerate(category_names):
+            table[c, m] = fee_models.get((marketplace, category), default)
+
+    per_product = table[category_codes]
+    return {field: per_product[:, :, i] for i, field in enumerate(FEE_FIELDS)}
+
+
+def seller_proceeds(prices: np.ndarray, fees: Dict[str, np.ndarray]) -> np.ndarray:
+    """Сколько продавец получает в среднем с продажи за вычетом тарифа и потерь на возвратах"""
+    return (
+        prices * (1 - fees["commission_percent"] / 100)
+        - fees["logistics_cost"]
+        - fees["return_rate_percent"] / 100 * fees["return_cost"]
+    )
+
+
+def compute_net_arbitrage(
+    prices: np.ndarray,
+    fees: Dict[str, np.ndarray],
+    marketplaces: Sequence[str],
+) -> Dict[str, np.ndarray]:
+    """
+    Все пары (покупка, продажа) по матрице цен [товар, площадка].
+    product_index — строка матрицы, к которой относится пара.
+    """
+    proceeds = seller_proceeds(prices, fees)
+    net = proceeds[:, None, :] - prices[:, :, None]
+    valid = ~np.isnan(net) & ~np.eye(len(marketplaces), dtype=bool)[None, :, :]
+
+    product_index, buy, sell = np.nonzero(valid)
+    buy_price = prices[product_index, buy]
+    sell_price = prices[product_index, sell]
+    net_profit = net[valid]
+    names = np.array(marketplaces, dtype=object)
+    return {
+        "product_index": product_index,
+        "buy_marketplace": names[buy],
+        "sell_marketplace": names[sell],
+        "buy_price": buy_price,
+        "sell_price": sell_price,
+        "fees": sell_price - proceeds[product_index, sell],
+        "net_profit": net_profit,
+        "net_margin_percent": net_profit / buy_price * 100,
+    }
+
+
+def rank_by_profit(net_profit: np.ndarray) -> np.ndarray:
+    """Место каждой пары по убыванию чистой прибыли, с единицы"""
+    ranks = np.empty(net_profit.size, dtype=np.int64)
+    ranks[np.argsort(-net_profit, kind="stable")] = np.arange(1, net_profit.size + 1)
+    return ranks
+
+
+def best_net_arbitrage(
+    prices: Dict[str, float],
+    category: Optional[str],
+    fee_models: FeeModels,
+) -> Optional[Dict[str, Any]]:
+    """Самая прибыльная пара для одного товара по его текущим ценам"""
+    marketplaces = [marketplace for marketplace, price in prices.items() if price and price > 0]
+    if len(marketplaces) < 2:
+        return None
+    matrix = np.array([[prices[marketplace] for marketplace in marketplaces]], dtype=np.float64)
+    categories = np.array([category or DEFAULT_CATEGORY], dtype=object)
+    pairs = compute_net_arbitrage(matrix, fee_matrices(categories, marketplaces, fee_models), marketplaces)
+    best = int(np.argmax(pairs["net_profit"]))
+    # tolist() отдает обычные str и float вместо numpy-скаляров
+    return dict(zip(PAIR_FIELDS, (pairs[field][best:best + 1].tolist()[0] for field in PAIR_FIELDS)))
+
+
+async def load_latest_price_matrix(
+    session: AsyncSession,
+    product_ids: Sequence[int],
+    marketplaces: Sequence[str],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Идентификаторы товаров, их категории и матрица текущих цен [товар, площадка]"""
+    lp = ProductLatestPrice
+    result = await session.execute(
+        select(lp.product_id, lp.marketplace, lp.price, Product.category)
+        .join(Product, Product.id == lp.product_id)
+        .where(
+            lp.product_id.in_(product_ids),
+            lp.availability.is_(True),
+            lp.price > 0,
+            lp.marketplace.in_(marketplaces),
+        )
+    )
+    rows = result.all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty((0, len(marketplaces)))
+
+    product_column, marketplace_column, price_column, category_column = zip(*rows)
+    ids, product_codes = np.unique(np.fromiter(product_column, dtype=np.int64, count=len(rows)), return_inverse=True)
+    column_of = {marketplace: i for i, marketplace in enumerate(marketplaces)}
+    marketplace_codes = np.fromiter((column_of[m] for m in marketplace_column), dtype=np.int64, count=len(rows))
+
+    matrix = np.full((ids.size, len(marketplaces)), np.nan)
+    matrix[product_codes, marketplace_codes] = np.fromiter(price_column, dtype=np.float64, count=len(rows))
+    categories = np.empty(ids.size, dtype=object)
+    categories[product_codes] = [category or DEFAULT_CATEGORY for category in category_column]
+    return ids, categories, matrix
+
+
+async def refresh_net_arbitrage(
+    product_batch_size: Optional[int] = None,
+    min_profit: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    Пересчитать чистую маржу по всему каталогу. Цены читаются с реплики
+    пачками товаров, ранжирование — по всему каталогу сразу, замена
+    таблицы — в одной транзакции, так что читатели не видят ее пустой.
+    """
+    product_batch_size = product_batch_size or settings.NET_ARBITRAGE_PRODUCT_BATCH_SIZE
+    min_profit = settings.NET_ARBITRAGE_MIN_PROFIT if min_profit is None else min_profit
+    marketplaces = registered_marketplaces()
+    now = datetime.utcnow()
+
+    chunks: List[Dict[str, np.ndarray]] = []
+    products = 0
+    last_id = 0
+    async with get_async_read_session() as session:
+        fee_models = await load_fee_models(session)
+        while True:
+            result = await session.execute(
+                select(Product.id).where(Product.id > last_id).order_by(Product.id).limit(product_batch_size)
+            )
+            product_ids = result.scalars().all()
+            if not product_ids:
+                break
+            last_id = product_ids[-1]
+
+            ids, categories, matrix = await load_latest_price_matrix(session, product_ids, marketplaces)
+            products += ids.size
+            pairs = compute_net_arbitrage(matrix, fee_matrices(categories, marketplaces, fee_models), marketplaces)
+            keep = pairs["net_profit"] > min_profit
+            chunk = {field: pairs[field][keep] for field in PAIR_FIELDS}
+            chunk["product_id"] = ids[pairs["product_index"][keep]]
+            chunk["category"] = categories[pairs["product_index"][keep]]
+            chunks.append(chunk)
+
+    columns = ("product_id", "category") + PAIR_FIELDS
+    merged = {
+        field: np.concatenate([chunk[field] for chunk in chunks]) if chunks else np.empty(0)
+        for field in columns
+    }
+    ranks = rank_by_profit(merged["net_profit"])
+    values = [merged[field].tolist() for field in columns] + [ranks.tolist()]
+    rows = [
+        {**dict(zip(columns, row[:-1])), "category": row[1] or None, "rank": row[-1], "computed_at": now}
+        for row in zip(*values)
+    ]
+
+    async with get_async_session() as session:
+        with observe_db_write("net_arbitrage", len(rows)):
+            await session.execute(delete(NetArbitrageOpportunity))
+            for start in range(0, len(rows), NET_INSERT_BATCH):
+                await session.execute(
+                    insert(NetArbitrageOpportunity).values(rows[start:start + NET_INSERT_BATCH])
+                )
+            await session.commit()
+
+    logger.info(f"Net arbitrage refreshed: {products} products, {len(rows)} profitable pairs")
+    return {"products": products, "opportunities": len(rows)}
@@ -1 +1,416 @@
- 
\ No newline at end of file
+"""
+Уведомления пользователей сводками по почте
+
+События (сработавшее оповещение, падение цены, арбитражная возможность,
+сбой задачи) не отправляются сразу, а складываются в Redis в хеш
+получателя. Ключ события
+описывает, о чем оно: новое событие о том же товаре и площадке заменяет
+старое, поэтому всплеск из тысяч изменений цен схлопывается в несколько
+строк. Первое событие назначает получателю время отправки через
+NOTIFICATION_DIGEST_WINDOW секунд; периодическая задача Celery
+(celery/notifications.py) забирает созревшие сводки и отправляет их через
+пул SMTP-соединений с ограничением частоты на получателя и общим.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import get_async_read_session
+from app.models.user import User
+from app.utils.metrics import NOTIFICATIONS_SENT
+from app.utils.rate_limiter import RateLimiter
+from app.utils.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_PREFIX = "notifications"
+DUE_KEY = f"{NOTIFICATION_PREFIX}:due"
+ADMIN_RECIPIENT = "admin"
+
+KIND_PRICE_ALERT = "price_alert"
+KIND_PRICE_DROP = "price_drop"
+KIND_ARBITRAGE = "arbitrage"
+KIND_TASK_FAILURE = "task_failure"
+
+DIGEST_SECTIONS = {
+    KIND_PRICE_ALERT: "Сработавшие оповещения",
+    KIND_PRICE_DROP: "Падения цен",
+    KIND_ARBITRAGE: "Арбитражные возможности",
+    KIND_TASK_FAILURE: "Сбои задач",
+}
+
+user_limiter = RateLimiter(
+    "notifications:user", settings.NOTIFICATION_USER_LIMIT, settings.NOTIFICATION_USER_PERIOD
+)
+global_limiter = RateLimiter(
+    "notifications:global", settings.NOTIFICATION_GLOBAL_LIMIT, settings.NOTIFICATION_GLOBAL_PERIOD
+)
+
+
+def user_recipient(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def events_key(recipient: str) -> str:
+    return f"{NOTIFICATION_PREFIX}:events:{recipient}"
+
+
+def notification_event(kind: str, key: Any, **data: Any) -> Dict[str, Any]:
+    return {"kind": kind, "key": f"{kind}:{key}", "at": time.time(), **data}
+
+
+def price_drop_event(product_id: int, product_name: Optional[str], anomaly) -> Dict[str, Any]:
+    return notification_event(
+        KIND_PRICE_DROP,
+        f"{product_id}:{anomaly.marketplace}",
+        product_id=product_id,
+        product_name=product_name,
+        marketplace=anomaly.marketplace,
+        price=anomaly.price,
+        baseline=anomaly.baseline,
+        change_percent=anomaly.change_percent,
+    )
+
+
+def price_alert_event(product_name: Optional[str], alert) -> Dict[str, Any]:
+    return notification_event(
+        KIND_PRICE_ALERT,
+        alert.id,
+        product_id=alert.product_id,
+        product_name=product_name,
+        rule=alert.kind,
+        value=alert.value,
+        threshold=alert.threshold,
+        triggered_value=alert.triggered_value,
+        marketplace=alert.triggered_marketplace,
+    )
+
+
+def arbitrage_event(entry: Dict[str, Any]) -> Dict[str, Any]:
+    fields = ("product_id", "product_name", "min_marketplace", "min_price",
+              "max_marketplace", "max_price", "spread", "spread_percent")
+    return notification_event(KIND_ARBITRAGE, entry["product_id"], **{field: entry[field] for field in fields})
+
+
+def task_failure_event(task_name: str, task_id: Optional[str], error: Any) -> Dict[str, Any]:
+    return notification_event(KIND_TASK_FAILURE, task_name, task=task_name, task_id=task_id, error=str(error)[:500])
+
+
+def stage_notifications(pipe, recipient: str, events: Sequence[Dict[str, Any]]) -> None:
+    """
+    Поставить события в pipeline — синхронный или асинхронный. ZADD NX:
+    срок отправки назначает первое событие окна, следующие его не сдвигают.
+    """
+    pipe.hset(events_key(recipient), mapping={event["key"]: json.dumps(event) for event in events})
+    pipe.zadd(DUE_KEY, {recipient: time.time() + settings.NOTIFICATION_DIGEST_WINDOW}, nx=True)
+
+
+async def queue_notifications(recipient: str, events: Sequence[Dict[str, Any]]) -> None:
+    if not settings.NOTIFICATIONS_ENABLED or not events:
+        return
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            stage_notifications(pipe, recipient, events)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to queue notifications for {recipient}: {e}")
+
+
+async def notify_price_drops(product, anomalies: Iterable) -> None:
+    """Сообщить владельцу товара о ценах, упавших ниже обычной; вызывать после коммита"""
+    if product.user_id is None:
+        return
+    events = [
+        price_drop_event(product.id, product.name, anomaly)
+        for anomaly in anomalies
+        if anomaly.change_percent < 0
+    ]
+    await queue_notifications(user_recipient(product.user_id), events)
+
+
+async def notify_price_alerts(product, alerts: Iterable) -> None:
+    """Сообщить авторам сработавших оповещений; вызывать после коммита"""
+    events: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for alert in alerts:
+        events[alert.user_id].append(price_alert_event(product.name, alert))
+    for user_id, user_events in events.items():
+        await queue_notifications(user_recipient(user_id), user_events)
+
+
+async def notify_arbitrage(
+    entries: Dict[int, Optional[Dict[str, Any]]],
+    previous: Dict[int, Optional[Dict[str, Any]]],
+) -> None:
+    """Сообщить о товарах, разрыв цен которых только что превысил порог"""
+    threshold = settings.NOTIFY_ARBITRAGE_MIN_PERCENT
+    events: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for product_id, entry in entries.items():
+        if not entry or entry.get("user_id") is None or entry["spread_percent"] < threshold:
+            continue
+        old = previous.get(product_id)
+        if old and old["spread_percent"] >= threshold:
+            continue
+        events[entry["user_id"]].append(arbitrage_event(entry))
+
+    for user_id, user_events in events.items():
+        await queue_notifications(user_recipient(user_id), user_events)
+
+
+def _format_event(event: Dict[str, Any]) -> str:
+    kind = event["kind"]
+    if kind == KIND_PRICE_ALERT:
+        name = event["product_name"] or event["product_id"]
+        if event["rule"] == "spread":
+            return f"{name}: разрыв цен {event['triggered_value']:.1f}% (порог {event['value']:.1f}%)"
+        condition = (
+            f"падение на {event['value']:.0f}% (порог {event['threshold']:.2f} ₽)"
+            if event["rule"] == "drop_percent"
+            else f"порог {event['value']:.2f} ₽"
+        )
+        return f"{name} — {event['marketplace']}: {event['triggered_value']:.2f} ₽, {condition}"
+    if kind == KIND_PRICE_DROP:
+        return (
+            f"{event['product_name'] or event['product_id']} — {event['marketplace']}: "
+            f"{event['price']:.2f} ₽ ({event['change_percent']:+.1f}% к обычной {event['baseline']:.2f} ₽)"
+        )
+    if kind == KIND_ARBITRAGE:
+        return (
+            f"{event['product_name'] or event['product_id']}: "
+            f"{event['min_marketplace']} {event['min_price']:.2f} ₽ → "
+            f"{event['max_marketplace']} {event['max_price']:.2f} ₽, разрыв {event['spread_percent']:.1f}%"
+        )
+    return f"{event['task']} ({event['task_id']}): {event['error']}"
+
+
+def render_digest(events: Sequence[Dict[str, Any]]) -> Tuple[str, str]:
+    """Тема и текст сводки; свежие события — первыми, не больше NOTIFICATION_DIGEST_MAX_ITEMS строк"""
+    by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for event in sorted(events, key=lambda event: event["at"], reverse=True):
+        by_kind[event["kind"]].append(event)
+
+    lines: List[str] = []
+    budget = settings.NOTIFICATION_DIGEST_MAX_ITEMS
+    for kind, title in DIGEST_SECTIONS.items():
+        kind_events = by_kind.get(kind)
+        if not kind_events:
+            continue
+        lines.append(f"{title} ({len(kind_events)}):")
+        shown = kind_events[:max(budget, 0)]
+        lines.extend(f"  • {_format_event(event)}" for event in shown)
+        if len(kind_events) > len(shown):
+            lines.append(f"  … и еще {len(kind_events) - len(shown)}")
+        budget -= len(shown)
+        lines.append("")
+
+    subject = f"Сводка уведомлений: {len(events)} событий"
+    return subject, "\n".join(lines).rstrip() + "\n"
+
+
+def build_message(to: Sequence[str], subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_USERNAME
+    message["To"] = ", ".join(to)
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+class SMTPPool:
+    """
+    Пул долгоживущих SMTP-соединений: сводки одного прогона уходят через
+    несколько открытых сессий вместо подключения и входа на каждое письмо.
+    aiosmtplib импортируется здесь — он нужен только воркеру, который отправляет почту.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: List[Any] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self):
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            use_tls=settings.SMTP_PORT == 465,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+        await smtp.connect()
+        if settings.EMAIL_USERNAME:
+            await smtp.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            smtp = self._idle.pop() if self._idle else None
+            if smtp is None or not smtp.is_connected:
+                smtp = await self._connect()
+            try:
+                yield smtp
+            except Exception:
+                smtp.close()
+                raise
+            self._idle.append(smtp)
+
+    async def send(self, message: EmailMessage) -> None:
+        import aiosmtplib
+
+        async with self.connection() as smtp:
+            try:
+                await smtp.send_message(message)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                # Сервер закрыл простаивавшую сессию — одна попытка через новую
+                smtp.close()
+                await smtp.connect()
+                if settings.EMAIL_USERNAME:
+                    await smtp.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)
+                await smtp.send_message(message)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+smtp_pool = SMTPPool(settings.SMTP_POOL_SIZE)
+
+
+async def close_smtp_pool() -> None:
+    await smtp_pool.close()
+
+
+async def _take_events(recipient: str) -> List[Dict[str, Any]]:
+    """Забрать события получателя атомарно: параллельный прогон их уже не увидит"""
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.hgetall(events_key(recipient))
+        pipe.delete(events_key(recipient))
+        pipe.zrem(DUE_KEY, recipient)
+        raw, _, _ = await pipe.execute()
+    return [json.loads(value) for value in raw.values()]
+
+
+async def _requeue(recipient: str, events: Sequence[Dict[str, Any]], delay: float) -> None:
+    """Вернуть неотправленные события; HSETNX — пришедшие за это время новее"""
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for event in events:
+            pipe.hsetnx(events_key(recipient), event["key"], json.dumps(event))
+        pipe.zadd(DUE_KEY, {recipient: time.time() + delay})
+        await pipe.execute()
+
+
+async def _resolve_addresses(recipients: Sequence[str]) -> Dict[str, List[str]]:
+    addresses: Dict[str, List[str]] = {}
+    if ADMIN_RECIPIENT in recipients and settings.NOTIFICATION_ADMIN_EMAILS:
+        addresses[ADMIN_RECIPIENT] = list(settings.NOTIFICATION_ADMIN_EMAILS)
+
+    user_ids = [int(recipient.split(":", 1)[1]) for recipient in recipients if recipient.startswith("user:")]
+    if user_ids:
+        async with get_async_read_session() as session:
+            result = await session.execute(
+                select(User.id, User.email).where(
+                    User.id.in_(user_ids),
+                    User.is_active.is_(True),
+                    User.email.is_not(None),
+                )
+            )
+            for user_id, email in result.all():
+                addresses[user_recipient(user_id)] = [email]
+    return addresses
+
+
+# Отказы по адресу или письму: повтор в следующем окне получит тот же ответ.
+# Отказ входа или отправителя — ошибка настройки, такие сводки не теряем
+PERMANENT_SMTP_ERRORS = ("SMTPRecipientsRefused", "SMTPRecipientRefused", "SMTPDataError")
+
+
+def is_permanent_smtp_error(error: Exception) -> bool:
+    """5xx на получателя или текст письма; ошибки aiosmtplib различаются по имени класса"""
+    if type(error).__name__ not in PERMANENT_SMTP_ERRORS:
+        return False
+    refused = getattr(error, "recipients", None)
+    if refused:
+        return all(getattr(item, "code", 0) >= 500 for item in refused)
+    return getattr(error, "code", 0) >= 500
+
+
+async def _deliver(recipient: str, to: List[str], events: List[Dict[str, Any]]) -> bool:
+    subject, body = render_digest(events)
+    try:
+        await smtp_pool.send(build_message(to, subject, body))
+    except Exception as e:
+        if is_permanent_smtp_error(e):
+            logger.error(f"Digest to {recipient} rejected permanently, {len(events)} events dropped: {e}")
+            NOTIFICATIONS_SENT.labels(status="rejected").inc()
+            return False
+        logger.warning(f"Failed to send digest to {recipient}: {e}")
+        NOTIFICATIONS_SENT.labels(status="error").inc()
+        await _requeue(recipient, events, settings.NOTIFICATION_DIGEST_WINDOW)
+        return False
+    NOTIFICATIONS_SENT.labels(status="sent").inc()
+    return True
+
+
+async def send_due_digests() -> Dict[str, int]:
+    """
+    Отправить созревшие сводки. Получатель над своим лимитом откладывается
+    до следующего окна лимита; при исчерпании общего лимита прогон
+    останавливается, оставшиеся сводки уйдут в следующий.
+    """
+    stats = {"sent": 0, "failed": 0, "deferred": 0, "dropped": 0, "events": 0}
+    due = await async_redis_client.zrangebyscore(
+        DUE_KEY, "-inf", time.time(), start=0, num=settings.NOTIFICATION_FLUSH_BATCH
+    )
+    if not due:
+        return stats
+
+    addresses = await _resolve_addresses(due)
+    deliveries = []
+    for position, recipient in enumerate(due):
+        to = addresses.get(recipient)
+        if not to:
+            # Адреса нет (пользователь удален или отключен) — копить события незачем
+            await async_redis_client.delete(events_key(recipient))
+            await async_redis_client.zrem(DUE_KEY, recipient)
+            stats["dropped"] += 1
+            continue
+
+        # Сначала лимит получателя: отложенный им не должен тратить общий лимит
+        if not await user_limiter.acquire(recipient):
+            delay = await user_limiter.retry_after(recipient) or settings.NOTIFICATION_USER_PERIOD
+            await async_redis_client.zadd(DUE_KEY, {recipient: time.time() + delay})
+            stats["deferred"] += 1
+            continue
+        if not await global_limiter.acquire():
+            await user_limiter.release(recipient)
+            stats["deferred"] += len(due) - position
+            break
+
+        events = await _take_events(recipient)
+        if events:
+            deliveries.append((recipient, to, events))
+            stats["events"] += len(events)
+
+    # Параллельно не больше SMTP_POOL_SIZE: лишние ждут соединение в пуле
+    results = await asyncio.gather(*(_deliver(*delivery) for delivery in deliveries))
+    stats["sent"] = sum(results)
+    stats["failed"] = len(results) - stats["sent"]
+    if deliveries:
+        logger.info(f"Notification digests: {stats}")
+    return stats
@@ -0,0 +1,113 @@
+"""
+Пользовательские оповещения о ценах
+
+Правило хранит порог в сопоставимом виде: «ниже Y» и «упала на P%» —
+как цену срабатывания (для процентов она считается от текущей цены при
+создании), «разрыв между площадками» — как порог в процентах. Частичный
+индекс (product_id, kind, threshold) по активным правилам превращает
+проверку записи цены в диапазонный поиск: новая цена находит только
+правила с порогом не ниже себя, новый разрыв — с порогом не выше себя,
+за O(log n) плюс число сработавших правил.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, func, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.external.registry import registered_marketplaces
+from app.models.latest_price import ProductLatestPrice
+from app.models.price_alert import PriceAlertRule
+
+RULE_BELOW = "below"
+RULE_DROP_PERCENT = "drop_percent"
+RULE_SPREAD = "spread"
+
+PRICE_RULE_KINDS = (RULE_BELOW, RULE_DROP_PERCENT)
+RULE_KINDS = PRICE_RULE_KINDS + (RULE_SPREAD,)
+
+
+def rule_threshold(kind: str, value: float, reference_price: Optional[float] = None) -> float:
+    """Порог правила в том виде, в котором он хранится в индексе"""
+    if kind == RULE_DROP_PERCENT:
+        return reference_price * (1 - value / 100)
+    return value
+
+
+async def reference_price(session: AsyncSession, product_id: int, marketplace: Optional[str]) -> Optional[float]:
+    """Текущая цена, от которой считается падение: площадки или самая низкая"""
+    lp = ProductLatestPrice
+    query = select(func.min(lp.price)).where(
+        lp.product_id == product_id,
+        lp.availability.is_(True),
+        lp.price > 0,
+    )
+    if marketplace:
+        query = query.where(lp.marketplace == marketplace)
+    result = await session.execute(query)
+    return result.scalar_one_or_none()
+
+
+def _current_spread(product_id: int):
+    """Разрыв текущих цен товара в процентах от низкой — подзапрос к product_latest_price"""
+    lp = ProductLatestPrice
+    return (
+        select((func.max(lp.price) - func.min(lp.price)) / func.min(lp.price) * 100)
+        .where(
+            lp.product_id == product_id,
+            lp.availability.is_(True),
+            lp.price > 0,
+            lp.marketplace.in_(registered_marketplaces()),
+        )
+        .scalar_subquery()
+    )
+
+
+def _trigger_statement(product_id: int, marketplace: str, price: float, observed_at: datetime):
+    rule = PriceAlertRule
+    spread = _current_spread(product_id)
+    price_rules = select(rule.id).where(
+        rule.is_active,
+        rule.product_id == product_id,
+        rule.kind.in_(PRICE_RULE_KINDS),
+        rule.threshold >= price,
+        or_(rule.marketplace.is_(None), rule.marketplace == marketplace),
+    )
+    spread_rules = select(rule.id).where(
+        rule.is_active,
+        rule.product_id == product_id,
+        rule.kind == RULE_SPREAD,
+        rule.threshold <= spread,
+    )
+    # is_active повторяется снаружи: при гонке двух записей UPDATE перепроверит
+    # строку после чужого коммита и не выключит правило второй раз
+    return (
+        update(rule)
+        .where(rule.id.in_(union_all(price_rules, spread_rules)), rule.is_active)
+        .values(
+            is_active=False,
+            triggered_at=observed_at,
+            triggered_marketplace=marketplace,
+            triggered_value=case((rule.kind == RULE_SPREAD, spread), else_=price),
+        )
+        .returning(
+            rule.id, rule.user_id, rule.product_id, rule.kind, rule.marketplace,
+            rule.value, rule.threshold, rule.triggered_value, rule.triggered_marketplace,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def trigger_price_alerts(
+    session: AsyncSession,
+    product_id: int,
+    marketplace: str,
+    price: float,
+    observed_at: datetime,
+) -> List:
+    """
+    Выключить и вернуть правила, которые срабатывают на новой цене.
+    Вызывать после обновления product_latest_price: разрыв считается по ней.
+    """
+    result = await session.execute(_trigger_statement(product_id, marketplace, price, observed_at))
+    return result.all()
@@ -0,0 +1,57 @@
+"""
+Обнаружение аномальных цен по состоянию онлайн-статистики ряда
+
+Наблюдение сравнивается с EWMA и экспоненциальной дисперсией ряда до его
+учета — они уже заблокированы и прочитаны при обновлении статистики, так
+что проверка стоит O(1) и историю не перечитывает. Правила:
+
+* z_score — |цена - EWMA| / σ не меньше ANOMALY_Z_THRESHOLD;
+* percent_drop — цена ниже EWMA на ANOMALY_DROP_PERCENT процентов и больше.
+
+Пока в ряду меньше ANOMALY_MIN_OBSERVATIONS наблюдений, EWMA не устоялась
+и цена не оценивается.
+"""
+import math
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+def detect_anomaly(
+    baseline: Optional[Dict[str, Any]],
+    price: float,
+    observed_at: datetime,
+) -> Optional[Dict[str, Any]]:
+    """
+    Оценить цену по состоянию ряда до наблюдения (см. update_price_stats).
+    Возвращает поля PriceAnomaly или None, если цена обычная.
+    """
+    if baseline is None or baseline["count"] < settings.ANOMALY_MIN_OBSERVATIONS:
+        return None
+    # Запоздавшее наблюдение сравнивать с более свежей EWMA бессмысленно
+    if observed_at < baseline["last_observed_at"] or baseline["ewma"] <= 0:
+        return None
+
+    ewma = baseline["ewma"]
+    std_dev = math.sqrt(baseline["ewm_variance"])
+    z_score = (price - ewma) / std_dev if std_dev > 0 else None
+    change_percent = (price - ewma) / ewma * 100
+
+    rules = []
+    if z_score is not None and abs(z_score) >= settings.ANOMALY_Z_THRESHOLD:
+        rules.append("z_score")
+    if -change_percent >= settings.ANOMALY_DROP_PERCENT:
+        rules.append("percent_drop")
+    if not rules:
+        return None
+
+    return {
+        "price": price,
+        "baseline": ewma,
+        "std_dev": std_dev,
+        "z_score": z_score,
+        "change_percent": change_percent,
+        "rule": ",".join(rules),
+        "observed_at": observed_at,
+    }
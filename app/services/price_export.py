@@ -0,0 +1,153 @@
+"""
+Потоковая выгрузка истории цен в NDJSON/CSV через серверный курсор
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_read_session, close_db
+from app.models.price_history import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_COLUMNS = ("id", "product_id", "marketplace", "price", "currency", "created_at")
+EXPORT_CHUNK_SIZE = 1000
+
+
+def build_export_query(
+    product_ids: Optional[Sequence[int]] = None,
+    marketplace: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Запрос по колонкам истории цен с фильтрами выгрузки"""
+    query = select(*(getattr(PriceHistory, column) for column in EXPORT_COLUMNS))
+
+    if product_ids:
+        query = query.where(PriceHistory.product_id.in_(product_ids))
+    if marketplace:
+        query = query.where(PriceHistory.marketplace == marketplace)
+    if since:
+        query = query.where(PriceHistory.created_at >= since)
+    if until:
+        query = query.where(PriceHistory.created_at < until)
+
+    return query.order_by(PriceHistory.id)
+
+
+def _encode_ndjson(rows: Sequence[Sequence]) -> str:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        if record["created_at"] is not None:
+            record["created_at"] = record["created_at"].isoformat()
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def _encode_csv(rows: Sequence[Sequence]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row
+        )
+    return buffer.getvalue()
+
+
+async def stream_price_history(
+    session: AsyncSession,
+    fmt: str,
+    product_ids: Optional[Sequence[int]] = None,
+    marketplace: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[str]:
+    """
+    Отдавать выгрузку кусками по chunk_size строк.
+    В памяти держится не больше одного куска, независимо от объема выгрузки.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    encode = _encode_ndjson if fmt == "ndjson" else _encode_csv
+    if fmt == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+
+    query = build_export_query(product_ids, marketplace, since, until)
+    result = await session.stream(query.execution_options(yield_per=chunk_size))
+
+    exported = 0
+    async for partition in result.partitions():
+        exported += len(partition)
+        yield encode(partition)
+
+    logger.info(f"Price history export finished: {exported} rows ({fmt})")
+
+
+async def export_price_history(
+    fmt: str,
+    product_ids: Optional[Sequence[int]] = None,
+    marketplace: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[str]:
+    """Выгрузка в собственной сессии чтения — живет столько же, сколько поток ответа"""
+    async with get_async_read_session() as session:
+        async for chunk in stream_price_history(
+            session, fmt, product_ids, marketplace, since, until, chunk_size
+        ):
+            yield chunk
+
+
+async def _export_to_file(args: argparse.Namespace) -> None:
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        async for chunk in export_price_history(
+            args.format,
+            product_ids=args.product_id,
+            marketplace=args.marketplace,
+            since=args.since,
+            until=args.until,
+            chunk_size=args.chunk_size,
+        ):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await close_db()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Выгрузка истории цен в NDJSON/CSV")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--product-id", type=int, action="append", help="ID товара, можно повторять")
+    parser.add_argument("--marketplace")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Начало периода (ISO 8601)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Конец периода (ISO 8601)")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("--output", help="Файл для записи; по умолчанию stdout")
+    args = parser.parse_args(argv)
+
+    asyncio.run(_export_to_file(args))
+
+
+if __name__ == "__main__":
+    main()
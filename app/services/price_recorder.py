@@ -0,0 +1,118 @@
+"""
+Единая точка записи цен: история и производные агрегаты в одной транзакции
+"""
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.price_history import PriceHistory
+from app.models.latest_price import ProductLatestPrice
+from app.models.price_anomaly import PriceAnomaly
+from app.services.price_alerts import trigger_price_alerts
+from app.services.price_anomalies import detect_anomaly
+from app.services.price_rollups import update_rollups
+from app.services.price_stats import update_price_stats
+from app.utils.metrics import PRICE_ANOMALIES
+
+logger = logging.getLogger(__name__)
+
+# Ключ session.info: аномалии, отмеченные в транзакции, для уведомлений после коммита
+RECORDED_ANOMALIES = "recorded_price_anomalies"
+TRIGGERED_ALERTS = "triggered_price_alerts"
+
+
+def _latest_price_upsert(
+    product_id: int,
+    marketplace: str,
+    price: float,
+    currency: str,
+    availability: bool,
+    observed_at: datetime,
+):
+    table = ProductLatestPrice.__table__
+    stmt = insert(table).values(
+        product_id=product_id,
+        marketplace=marketplace,
+        price=price,
+        currency=currency,
+        availability=availability,
+        observed_at=observed_at,
+    )
+    excluded = stmt.excluded
+    # Запоздавшее наблюдение не должно перетирать более свежую цену
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id, table.c.marketplace],
+        set_={
+            "price": excluded.price,
+            "currency": excluded.currency,
+            "availability": excluded.availability,
+            "observed_at": excluded.observed_at,
+        },
+        where=table.c.observed_at <= excluded.observed_at,
+    ).returning(table.c.product_id)
+
+
+async def record_price(
+    session: AsyncSession,
+    product_id: int,
+    marketplace: str,
+    price: float,
+    currency: str = "RUB",
+    availability: bool = True,
+    observed_at: Optional[datetime] = None,
+) -> PriceHistory:
+    """
+    Записать цену товара, обновить свечи, текущую цену и статистику ряда,
+    отметить цену как аномальную, если она резко отклонилась от EWMA,
+    и выключить сработавшие на ней оповещения пользователей.
+    Коммит остается за вызывающим кодом.
+    """
+    observed_at = observed_at or datetime.utcnow()
+
+    entry = PriceHistory(
+        product_id=product_id,
+        marketplace=marketplace,
+        price=price,
+        currency=currency,
+        created_at=observed_at,
+    )
+    session.add(entry)
+
+    await update_rollups(session, product_id, marketplace, price, observed_at)
+    # Строки нет — наблюдение запоздало и текущую цену не изменило
+    latest = await session.execute(
+        _latest_price_upsert(product_id, marketplace, price, currency, availability, observed_at)
+    )
+    is_latest = latest.first() is not None
+    baseline = await update_price_stats(session, product_id, marketplace, price, observed_at)
+    anomaly = detect_anomaly(baseline, price, observed_at)
+    if anomaly:
+        anomaly_row = PriceAnomaly(product_id=product_id, marketplace=marketplace, **anomaly)
+        session.add(anomaly_row)
+        session.info.setdefault(RECORDED_ANOMALIES, []).append(anomaly_row)
+        PRICE_ANOMALIES.labels(marketplace=marketplace, rule=anomaly["rule"]).inc()
+        logger.info(
+            f"Price anomaly for product {product_id} on {marketplace}: "
+            f"{price} vs EWMA {anomaly['baseline']:.2f} ({anomaly['rule']})"
+        )
+    # Оповещения сравниваются с текущей ценой, а не с запоздавшей
+    if availability and is_latest:
+        alerts = await trigger_price_alerts(session, product_id, marketplace, price, observed_at)
+        if alerts:
+            session.info.setdefault(TRIGGERED_ALERTS, []).extend(alerts)
+    await session.flush()
+
+    return entry
+
+
+def pop_recorded_anomalies(session: AsyncSession) -> List[PriceAnomaly]:
+    """Забрать аномалии, записанные через record_price в этой сессии"""
+    return session.info.pop(RECORDED_ANOMALIES, [])
+
+
+def pop_triggered_alerts(session: AsyncSession) -> List:
+    """Забрать оповещения, сработавшие в record_price в этой сессии"""
+    return session.info.pop(TRIGGERED_ALERTS, [])
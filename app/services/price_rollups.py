@@ -0,0 +1,98 @@
+"""
+Почасовые и дневные свечи (OHLC) по истории цен
+"""
+import logging
+from datetime import datetime
+from typing import Optional, Type
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.price_rollup import PriceRollupHourly, PriceRollupDaily
+
+logger = logging.getLogger(__name__)
+
+RESOLUTION_RAW = "raw"
+RESOLUTION_HOURLY = "hourly"
+RESOLUTION_DAILY = "daily"
+
+ROLLUP_MODELS = {
+    RESOLUTION_HOURLY: PriceRollupHourly,
+    RESOLUTION_DAILY: PriceRollupDaily,
+}
+
+# Максимальное окно (в днях), для которого отдаются сырые записи и почасовые свечи.
+# Дальше — дневные свечи: год истории укладывается в ~365 строк на маркетплейс.
+RAW_MAX_DAYS = 2
+HOURLY_MAX_DAYS = 14
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """Начало интервала, в который попадает момент времени"""
+    if resolution == RESOLUTION_HOURLY:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == RESOLUTION_DAILY:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+
+def choose_resolution(days: int) -> str:
+    """Выбрать детализацию истории по длине запрошенного окна"""
+    if days <= RAW_MAX_DAYS:
+        return RESOLUTION_RAW
+    if days <= HOURLY_MAX_DAYS:
+        return RESOLUTION_HOURLY
+    return RESOLUTION_DAILY
+
+
+def _rollup_upsert(
+    model: Type,
+    resolution: str,
+    product_id: int,
+    marketplace: str,
+    price: float,
+    observed_at: datetime,
+):
+    table = model.__table__
+    stmt = insert(table).values(
+        product_id=product_id,
+        marketplace=marketplace,
+        bucket=bucket_start(observed_at, resolution),
+        open=price,
+        high=price,
+        low=price,
+        close=price,
+        count=1,
+        opened_at=observed_at,
+        closed_at=observed_at,
+    )
+    excluded = stmt.excluded
+    # Цены могут приходить не по порядку, поэтому open/close выбираются по времени наблюдения
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.product_id, table.c.marketplace, table.c.bucket],
+        set_={
+            "open": case((excluded.opened_at < table.c.opened_at, excluded.open), else_=table.c.open),
+            "opened_at": func.least(table.c.opened_at, excluded.opened_at),
+            "close": case((excluded.closed_at >= table.c.closed_at, excluded.close), else_=table.c.close),
+            "closed_at": func.greatest(table.c.closed_at, excluded.closed_at),
+            "high": func.greatest(table.c.high, excluded.high),
+            "low": func.least(table.c.low, excluded.low),
+            "count": table.c.count + 1,
+        },
+    )
+
+
+async def update_rollups(
+    session: AsyncSession,
+    product_id: int,
+    marketplace: str,
+    price: float,
+    observed_at: Optional[datetime] = None,
+) -> None:
+    """Учесть новую цену в почасовых и дневных свечах (в текущей транзакции)"""
+    observed_at = observed_at or datetime.utcnow()
+    for resolution, model in ROLLUP_MODELS.items():
+        await session.execute(
+            _rollup_upsert(model, resolution, product_id, marketplace, price, observed_at)
+        )
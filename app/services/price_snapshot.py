@@ -0,0 +1,234 @@
+"""
+Колоночные снимки истории цен в Parquet для аналитики
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select
+
+from app.config import settings
+from app.database import get_async_read_session
+from app.models.price_history import PriceHistory
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow не установлен. Выгрузка в Parquet недоступна.")
+
+WATERMARK_FILE = "_watermark.json"
+SNAPSHOT_COLUMNS = ("id", "product_id", "marketplace", "price", "currency", "created_at")
+
+if PYARROW_AVAILABLE:
+    # У marketplace и currency всего несколько различных значений — храним словарем
+    SNAPSHOT_SCHEMA = pa.schema([
+        ("id", pa.int64()),
+        ("product_id", pa.int32()),
+        ("marketplace", pa.dictionary(pa.int8(), pa.string())),
+        ("price", pa.float64()),
+        ("currency", pa.dictionary(pa.int8(), pa.string())),
+        ("created_at", pa.timestamp("ms")),
+    ])
+
+
+Gap = Tuple[int, int, str]
+
+
+def _read_watermark(root: str) -> Tuple[int, List[Gap]]:
+    path = os.path.join(root, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return 0, []
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    return int(state.get("last_id", 0)), [tuple(gap) for gap in state.get("gaps", [])]
+
+
+def _write_watermark(root: str, last_id: int, gaps: Sequence[Gap] = ()) -> None:
+    # Атомарная замена: при падении посередине остается предыдущая отметка
+    path = os.path.join(root, WATERMARK_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "last_id": last_id,
+            "gaps": [list(gap) for gap in gaps],
+            "updated_at": datetime.utcnow().isoformat(),
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def missing_ranges(low: int, high: int, present: Sequence[int]) -> List[Tuple[int, int]]:
+    """Диапазоны id из [low, high], которых нет среди отсортированных present"""
+    ranges = []
+    expected = low
+    for row_id in present:
+        if row_id > expected:
+            ranges.append((expected, row_id - 1))
+        expected = max(expected, row_id + 1)
+    if expected <= high:
+        ranges.append((expected, high))
+    return ranges
+
+
+def close_gaps(gaps: Sequence[Gap], found: Sequence[int], expire_before: str) -> List[Gap]:
+    """
+    Убрать из пропусков найденные id. Пропуск старше expire_before считается
+    окончательным: транзакция откатилась, а не закоммитилась позже.
+    """
+    found = sorted(found)
+    remaining = []
+    for low, high, seen_at in gaps:
+        if seen_at < expire_before:
+            continue
+        inside = [row_id for row_id in found if low <= row_id <= high]
+        remaining.extend((start, end, seen_at) for start, end in missing_ranges(low, high, inside))
+    return remaining
+
+
+def partition_dir(root: str, day: date, marketplace: str) -> str:
+    return os.path.join(root, f"date={day.isoformat()}", f"marketplace={marketplace}")
+
+
+def write_partitions(root: str, rows: Sequence[Sequence]) -> int:
+    """Разложить строки по разделам (дата, маркетплейс) и записать по файлу на раздел"""
+    groups: Dict[Tuple[date, str], List[Sequence]] = defaultdict(list)
+    for row in rows:
+        groups[(row[5].date(), row[2])].append(row)
+
+    files = 0
+    for (day, marketplace), group in groups.items():
+        columns = {name: [row[i] for row in group] for i, name in enumerate(SNAPSHOT_COLUMNS)}
+        table = pa.Table.from_pydict(columns, schema=SNAPSHOT_SCHEMA)
+
+        directory = partition_dir(root, day, marketplace)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{group[0][0]}-{group[-1][0]}.parquet")
+        pq.write_table(table, path, compression="zstd")
+        files += 1
+
+    return files
+
+
+def _exportable(rows: Sequence[Sequence]) -> List[Sequence]:
+    return [row for row in rows if row[2] is not None and row[5] is not None]
+
+
+async def export_new_price_history(
+    root: str,
+    batch_size: int = 50000,
+    lag_margin: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    Дописать в снимок строки истории цен, появившиеся после прошлой выгрузки.
+
+    id выдается при вставке, а видна строка после коммита, к тому же на
+    отстающей реплике: строка с меньшим id может появиться, когда больший
+    уже выгружен. Поэтому кроме отметки последнего id хранятся пропуски
+    ниже нее; каждая выгрузка перечитывает их и дописывает появившиеся
+    строки, а пропуск, не заполнившийся за lag_margin секунд, забывается.
+    """
+    if not PYARROW_AVAILABLE:
+        logger.error("pyarrow не установлен. Установите: pip install pyarrow")
+        return {"rows": 0, "files": 0, "last_id": 0, "gaps": 0}
+
+    lag_margin = settings.PARQUET_EXPORT_LAG_MARGIN if lag_margin is None else lag_margin
+    os.makedirs(root, exist_ok=True)
+    last_id, gaps = _read_watermark(root)
+    now = datetime.utcnow()
+    seen_at = now.isoformat(timespec="seconds")
+    expire_before = (now - timedelta(seconds=lag_margin)).isoformat(timespec="seconds")
+    columns = [getattr(PriceHistory, column) for column in SNAPSHOT_COLUMNS]
+    exported_rows = 0
+    exported_files = 0
+
+    async with get_async_read_session() as session:
+        if gaps:
+            result = await session.execute(
+                select(*columns)
+                .where(or_(*(PriceHistory.id.between(low, high) for low, high, _ in gaps)))
+                .order_by(PriceHistory.id)
+            )
+            rows = result.all()
+            late = _exportable(rows)
+            exported_files += write_partitions(root, late)
+            exported_rows += len(late)
+            gaps = close_gaps(gaps, [row[0] for row in rows], expire_before)
+            _write_watermark(root, last_id, gaps)
+
+        while True:
+            result = await session.execute(
+                select(*columns)
+                .where(PriceHistory.id > last_id)
+                .order_by(PriceHistory.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            # Строки без площадки или даты не выгружаются, но и пропуском не считаются
+            batch = _exportable(rows)
+            exported_files += write_partitions(root, batch)
+            exported_rows += len(batch)
+            gaps.extend(
+                (low, high, seen_at)
+                for low, high in missing_ranges(last_id + 1, rows[-1][0], [row[0] for row in rows])
+            )
+            last_id = rows[-1][0]
+            _write_watermark(root, last_id, gaps)
+
+    logger.info(
+        f"Parquet snapshot: exported {exported_rows} rows into {exported_files} files, "
+        f"{len(gaps)} id gaps pending"
+    )
+    return {"rows": exported_rows, "files": exported_files, "last_id": last_id, "gaps": len(gaps)}
+
+
+def read_price_snapshot(
+    root: str,
+    marketplace: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> "pa.Table":
+    """
+    Прочитать снимок с отсечением разделов по имени каталога.
+    Файлы отображаются в память, поэтому повторные сканы не копируют данные.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow не установлен. Установите: pip install pyarrow")
+
+    tables = []
+    for date_dir in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if not date_dir.startswith("date="):
+            continue
+        day = date.fromisoformat(date_dir[len("date="):])
+        if (since and day < since) or (until and day >= until):
+            continue
+
+        for marketplace_dir in sorted(os.listdir(os.path.join(root, date_dir))):
+            if marketplace and marketplace_dir != f"marketplace={marketplace}":
+                continue
+            directory = os.path.join(root, date_dir, marketplace_dir)
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith(".parquet"):
+                    tables.append(pq.read_table(
+                        os.path.join(directory, filename),
+                        columns=list(columns) if columns else None,
+                        memory_map=True
+                    ))
+
+    if not tables:
+        schema = SNAPSHOT_SCHEMA
+        if columns:
+            schema = pa.schema([SNAPSHOT_SCHEMA.field(name) for name in columns])
+        return schema.empty_table()
+
+    return pa.concat_tables(tables)
@@ -0,0 +1,191 @@
+"""
+Онлайн-статистика рядов цен (товар, маркетплейс)
+
+Каждая запись цены обновляет одну строку price_series_stats за O(1):
+среднее и дисперсия — алгоритмом Welford, EWMA и экспоненциальная
+дисперсия — рекуррентно, минимум и максимум — за все время и по окнам
+фиксированной длины. Окна выровнены по эпохе; хранятся текущее и
+предыдущее, поэтому «минимум за окно» покрывает от PRICE_STATS_WINDOW_DAYS
+до двойной длины окна — цена компактного хранения без очереди наблюдений.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.price_stats import PriceSeriesStats
+
+EPOCH = datetime(1970, 1, 1)
+# Состояние ряда до наблюдения, по которому оценивается новая цена
+BASELINE_FIELDS = ("count", "ewma", "ewm_variance", "last_price", "last_observed_at")
+
+
+def window_start(ts: datetime, window_days: int) -> datetime:
+    """Начало окна фиксированной длины, в которое попадает момент времени"""
+    size = timedelta(days=window_days)
+    return EPOCH + size * ((ts - EPOCH) // size)
+
+
+def initial_stats(price: float, observed_at: datetime, window_days: int) -> Dict[str, Any]:
+    return {
+        "count": 1,
+        "mean": price,
+        "m2": 0.0,
+        "ewma": price,
+        "ewm_variance": 0.0,
+        "min_price": price,
+        "max_price": price,
+        "window_started_at": window_start(observed_at, window_days),
+        "window_min": price,
+        "window_max": price,
+        "prev_window_min": None,
+        "prev_window_max": None,
+        "last_price": price,
+        "first_observed_at": observed_at,
+        "last_observed_at": observed_at,
+        "last_changed_at": observed_at,
+    }
+
+
+def apply_observation(
+    stats: PriceSeriesStats,
+    price: float,
+    observed_at: datetime,
+    alpha: float,
+    window_days: int,
+) -> None:
+    """Учесть одно наблюдение; запоздавшее не двигает EWMA и последнюю цену"""
+    stats.count += 1
+    delta = price - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (price - stats.mean)
+    stats.min_price = min(stats.min_price, price)
+    stats.max_price = max(stats.max_price, price)
+
+    bucket = window_start(observed_at, window_days)
+    size = timedelta(days=window_days)
+    if bucket == stats.window_started_at:
+        stats.window_min = min(stats.window_min, price)
+        stats.window_max = max(stats.window_max, price)
+    elif bucket > stats.window_started_at:
+        adjacent = bucket - stats.window_started_at == size
+        stats.prev_window_min = stats.window_min if adjacent else None
+        stats.prev_window_max = stats.window_max if adjacent else None
+        stats.window_started_at = bucket
+        stats.window_min = stats.window_max = price
+    elif bucket == stats.window_started_at - size and stats.prev_window_min is not None:
+        stats.prev_window_min = min(stats.prev_window_min, price)
+        stats.prev_window_max = max(stats.prev_window_max, price)
+
+    stats.first_observed_at = min(stats.first_observed_at, observed_at)
+    if observed_at < stats.last_observed_at:
+        return
+
+    ew_delta = price - stats.ewma
+    stats.ewma += alpha * ew_delta
+    stats.ewm_variance = (1 - alpha) * (stats.ewm_variance + alpha * ew_delta * ew_delta)
+    if price != stats.last_price:
+        stats.last_changed_at = observed_at
+    stats.last_price = price
+    stats.last_observed_at = observed_at
+
+
+def variance(stats: PriceSeriesStats) -> float:
+    """Несмещенная выборочная дисперсия"""
+    return stats.m2 / (stats.count - 1) if stats.count > 1 else 0.0
+
+
+def window_range(stats: PriceSeriesStats, now: Optional[datetime] = None) -> Tuple[float, float]:
+    """Минимум и максимум за последние одно-два окна на момент now"""
+    now = now or datetime.utcnow()
+    size = timedelta(days=settings.PRICE_STATS_WINDOW_DAYS)
+    current = window_start(now, settings.PRICE_STATS_WINDOW_DAYS)
+    if stats.window_started_at >= current - size:
+        lows, highs = [stats.window_min], [stats.window_max]
+        if stats.window_started_at == current and stats.prev_window_min is not None:
+            lows.append(stats.prev_window_min)
+            highs.append(stats.prev_window_max)
+        return min(lows), max(highs)
+    # Наблюдений в окне не было — диапазоном служит последняя цена
+    return stats.last_price, stats.last_price
+
+
+def describe_stats(stats: PriceSeriesStats, price: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Статистика ряда для ответа API и оценка цены относительно нее:
+    z-оценка к среднему и отклонение от EWMA. Без price оценивается последняя цена.
+    """
+    price = stats.last_price if price is None else price
+    std_dev = math.sqrt(variance(stats))
+    window_min, window_max = window_range(stats)
+    return {
+        "product_id": stats.product_id,
+        "marketplace": stats.marketplace,
+        "count": stats.count,
+        "mean": stats.mean,
+        "std_dev": std_dev,
+        "ewma": stats.ewma,
+        "ewm_std_dev": math.sqrt(stats.ewm_variance),
+        "min_price": stats.min_price,
+        "max_price": stats.max_price,
+        "window_days": settings.PRICE_STATS_WINDOW_DAYS,
+        "window_min": window_min,
+        "window_max": window_max,
+        "last_price": stats.last_price,
+        "first_observed_at": stats.first_observed_at,
+        "last_observed_at": stats.last_observed_at,
+        "last_changed_at": stats.last_changed_at,
+        "price": price,
+        "z_score": (price - stats.mean) / std_dev if std_dev > 0 else 0.0,
+        "ewma_deviation_percent": (price - stats.ewma) / stats.ewma * 100 if stats.ewma else 0.0,
+    }
+
+
+async def _lock_stats(session: AsyncSession, product_id: int, marketplace: str) -> Optional[PriceSeriesStats]:
+    return await session.get(
+        PriceSeriesStats,
+        (product_id, marketplace),
+        with_for_update=True,
+        populate_existing=True,
+    )
+
+
+async def update_price_stats(
+    session: AsyncSession,
+    product_id: int,
+    marketplace: str,
+    price: float,
+    observed_at: datetime,
+) -> Optional[Dict[str, Any]]:
+    """
+    Обновить статистику ряда в транзакции записи цены. Строка блокируется
+    до коммита, поэтому параллельные записи одного ряда не теряют наблюдений.
+    Возвращает состояние ряда до наблюдения; None — ряд только что создан.
+    """
+    stats = await _lock_stats(session, product_id, marketplace)
+    if stats is None:
+        # Первая цена ряда; если строку успел вставить сосед — обычный путь
+        result = await session.execute(
+            insert(PriceSeriesStats)
+            .values(
+                product_id=product_id,
+                marketplace=marketplace,
+                **initial_stats(price, observed_at, settings.PRICE_STATS_WINDOW_DAYS),
+            )
+            .on_conflict_do_nothing(index_elements=["product_id", "marketplace"])
+            .returning(PriceSeriesStats.product_id)
+        )
+        if result.first() is not None:
+            return None
+        stats = await _lock_stats(session, product_id, marketplace)
+
+    baseline = {field: getattr(stats, field) for field in BASELINE_FIELDS}
+    apply_observation(
+        stats, price, observed_at,
+        settings.PRICE_STATS_EWMA_ALPHA,
+        settings.PRICE_STATS_WINDOW_DAYS,
+    )
+    return baseline
@@ -0,0 +1,140 @@
+"""
+Рассылка обновлений цен в реальном времени через Redis pub/sub
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from redis.exceptions import RedisError
+
+from app.utils.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+PRICE_UPDATES_CHANNEL = "prices:updates"
+
+
+def build_price_event(
+    product_id: int,
+    marketplace: str,
+    price: float,
+    currency: str = "RUB",
+    observed_at: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    return {
+        "product_id": product_id,
+        "user_id": user_id,
+        "marketplace": marketplace,
+        "price": price,
+        "currency": currency,
+        "observed_at": (observed_at or datetime.utcnow()).isoformat(),
+    }
+
+
+async def publish_price_updates(events: Iterable[Dict[str, Any]]) -> None:
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.publish(PRICE_UPDATES_CHANNEL, json.dumps(event))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to publish price updates: {e}")
+
+
+@dataclass(eq=False)
+class PriceSubscription:
+    product_ids: Set[int] = field(default_factory=set)
+    user_ids: Set[int] = field(default_factory=set)
+    marketplaces: Set[str] = field(default_factory=set)
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=100))
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.product_ids and event.get("product_id") not in self.product_ids:
+            return False
+        if self.user_ids and event.get("user_id") not in self.user_ids:
+            return False
+        if self.marketplaces and event.get("marketplace") not in self.marketplaces:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        # Медленный клиент не должен тормозить остальных: вытесняем самое старое событие
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class PriceUpdateBroker:
+    """
+    Одна подписка на канал Redis на процесс API.
+    Входящие события раскладываются по очередям подписчиков с учетом их фильтров.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self):
+        self._subscriptions: List[PriceSubscription] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(
+        self,
+        product_ids: Iterable[int] = (),
+        user_ids: Iterable[int] = (),
+        marketplaces: Iterable[str] = (),
+    ) -> PriceSubscription:
+        subscription = PriceSubscription(
+            product_ids=set(product_ids),
+            user_ids=set(user_ids),
+            marketplaces=set(marketplaces),
+        )
+        self._subscriptions.append(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        return subscription
+
+    def unsubscribe(self, subscription: PriceSubscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(PRICE_UPDATES_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        self.dispatch(json.loads(message["data"]))
+                    except (ValueError, TypeError) as e:
+                        logger.warning(f"Malformed price update: {e}")
+            except RedisError as e:
+                logger.error(f"Price updates subscription lost: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+
+price_update_broker = PriceUpdateBroker()
@@ -0,0 +1,217 @@
+"""
+Массовая загрузка товаров из CSV/NDJSON пакетными вставками
+с фоновым поиском карточек на площадках
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import get_async_session, close_db
+from app.models.product import Product
+from app.schemas.product import ProductCreate, ProductImportJob
+from app.utils.metrics import observe_db_write
+from app.utils.redis_client import async_redis_client, close_redis
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_JOB_PREFIX = "import:products"
+URL_FIELDS = ("amazon_url", "wildberries_url", "ozon_url", "yandex_market_url")
+MARKETPLACE_ID_FIELDS = ("wildberries_id", "ozon_id", "yandex_market_id")
+
+
+def _job_key(job_id: str) -> str:
+    return f"{IMPORT_JOB_PREFIX}:{job_id}"
+
+
+def _normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверка строки схемой ProductCreate; пустые ячейки CSV считаются отсутствующими"""
+    product = ProductCreate.model_validate({k: v for k, v in raw.items() if v not in ("", None)})
+    values = product.model_dump()
+    for field in URL_FIELDS:
+        if values[field] is not None:
+            values[field] = str(values[field])
+    return values
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """Пары (значения товара, ошибка): битая строка не останавливает загрузку"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        # line_num — номер физической строки файла с учетом многострочных ячеек
+        rows = ((reader.line_num, row) for row in reader)
+    else:
+        rows = ((number, line) for number, line in enumerate(lines, start=1) if line.strip())
+
+    for number, row in rows:
+        try:
+            if fmt == "ndjson":
+                row = json.loads(row)
+            yield _normalize(row), None
+        except (ValueError, TypeError, ValidationError) as e:
+            yield None, f"строка {number}: {e}".splitlines()[0]
+
+
+async def create_import_job(fmt: str) -> ProductImportJob:
+    job = ProductImportJob(job_id=uuid.uuid4().hex, status="pending", format=fmt)
+    key = _job_key(job.job_id)
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=job.model_dump(exclude_none=True))
+        pipe.expire(key, settings.PRODUCT_IMPORT_JOB_TTL)
+        await pipe.execute()
+    return job
+
+
+async def get_import_job(job_id: str) -> Optional[ProductImportJob]:
+    data = await async_redis_client.hgetall(_job_key(job_id))
+    return ProductImportJob.model_validate(data) if data else None
+
+
+async def update_import_job(job_id: str, fields: Optional[Dict[str, Any]] = None, **counters: int) -> None:
+    """Счетчики прибавляются атомарно — их параллельно двигают и загрузка, и воркеры сопоставления"""
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for name, value in counters.items():
+                if value:
+                    pipe.hincrby(_job_key(job_id), name, value)
+            if fields:
+                pipe.hset(_job_key(job_id), mapping=fields)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to update import job {job_id}: {e}")
+
+
+def _queue_matching(product_ids: List[int], job_id: str) -> None:
+    # Celery импортируется только когда действительно есть что сопоставлять
+    from celery.price_monitoring import match_imported_products
+
+    chunk_size = settings.PRODUCT_MATCH_CHUNK_SIZE
+    for start in range(0, len(product_ids), chunk_size):
+        match_imported_products.delay(product_ids[start:start + chunk_size], job_id)
+
+
+async def _insert_batch(batch: List[Dict[str, Any]], job_id: str, match: bool) -> None:
+    try:
+        async with get_async_session() as session:
+            with observe_db_write("product_import", len(batch)):
+                # Одна многострочная INSERT ... VALUES (...), (...) RETURNING на пакет
+                result = await session.execute(
+                    insert(Product)
+                    .values(batch)
+                    .returning(Product.id, *(getattr(Product, field) for field in MARKETPLACE_ID_FIELDS))
+                )
+                rows = result.all()
+                await session.commit()
+    except Exception as e:
+        logger.error(f"Product import batch failed: {e}")
+        await update_import_job(job_id, {"last_error": str(e).splitlines()[0]}, failed=len(batch))
+        return
+
+    unmatched = [row.id for row in rows if not any(row[1:])]
+    if match and unmatched:
+        await asyncio.to_thread(_queue_matching, unmatched, job_id)
+    await update_import_job(
+        job_id,
+        inserted=len(rows),
+        queued_for_matching=len(unmatched) if match else 0,
+    )
+
+
+async def import_products(
+    lines: Iterable[str],
+    fmt: str,
+    job_id: str,
+    user_id: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    match: bool = True,
+) -> None:
+    """
+    Загрузить товары пакетами по batch_size строк; у каждой пачки свой коммит,
+    поэтому прогресс виден сразу, а ошибка пачки не откатывает уже загруженное.
+    Товары без идентификаторов площадок уходят в Celery на сопоставление.
+    """
+    batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+    await update_import_job(job_id, {"status": "running"})
+
+    batch: List[Dict[str, Any]] = []
+    total = failed = 0
+    last_error = None
+    try:
+        for values, error in iter_records(lines, fmt):
+            total += 1
+            if error:
+                failed += 1
+                last_error = error
+            else:
+                values["user_id"] = user_id
+                batch.append(values)
+
+            if len(batch) >= batch_size:
+                await _insert_batch(batch, job_id, match)
+                batch = []
+                await update_import_job(
+                    job_id,
+                    {"last_error": last_error} if last_error else None,
+                    total=total,
+                    failed=failed,
+                )
+                total = failed = 0
+
+        if batch:
+            await _insert_batch(batch, job_id, match)
+        await update_import_job(
+            job_id,
+            {"status": "completed", **({"last_error": last_error} if last_error else {})},
+            total=total,
+            failed=failed,
+        )
+    except Exception as e:
+        logger.error(f"Product import {job_id} failed: {e}")
+        await update_import_job(job_id, {"status": "failed", "last_error": str(e)}, total=total, failed=failed)
+
+
+async def _import_from_file(args: argparse.Namespace) -> None:
+    source = open(args.input, encoding="utf-8-sig", newline="") if args.input else sys.stdin
+    try:
+        job = await create_import_job(args.format)
+        await import_products(
+            source,
+            args.format,
+            job.job_id,
+            user_id=args.user_id,
+            batch_size=args.batch_size,
+            match=not args.no_match,
+        )
+        job = await get_import_job(job.job_id)
+        print(job.model_dump_json(indent=2))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        await close_redis()
+        await close_db()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Загрузка товаров из CSV/NDJSON")
+    parser.add_argument("input", nargs="?", help="Файл для загрузки; по умолчанию stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv")
+    parser.add_argument("--user-id", type=int, help="Владелец загружаемых товаров")
+    parser.add_argument("--batch-size", type=int, default=settings.PRODUCT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--no-match", action="store_true", help="Не ставить сопоставление в очередь")
+    args = parser.parse_args(argv)
+
+    asyncio.run(_import_from_file(args))
+
+
+if __name__ == "__main__":
+    main()
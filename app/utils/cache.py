@@ -1 +1,147 @@
- 
\ No newline at end of file
+"""
+Кеш HTTP-ответов в Redis с ETag и точечной инвалидацией по товару
+"""
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Sequence, Union
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_read_session, get_async_session
+from app.utils.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "httpcache"
+# Тарифы площадок: от них зависит чистая прибыль в сравнении цен
+FEES_SCOPE = "marketplace_fees"
+
+
+def _version_key(product_id: int) -> str:
+    return f"{CACHE_PREFIX}:version:product:{product_id}"
+
+
+def _scope_version_key(scope: str) -> str:
+    return f"{CACHE_PREFIX}:version:scope:{scope}"
+
+
+def _initial_version() -> int:
+    return int(time.time() * 1000)
+
+
+def _encode(payload: Union[BaseModel, bytes]) -> Union[str, bytes]:
+    """Быстрый путь отдает уже готовые байты, обычный — модель Pydantic"""
+    if isinstance(payload, (bytes, str)):
+        return payload
+    return payload.model_dump_json()
+
+
+def _variant_digest(request: Request) -> str:
+    """Один товар — много представлений: путь и отсортированные параметры запроса"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+
+
+async def _get_version(key: str) -> str:
+    """
+    Начальное значение версии — время в мс, а не 0, чтобы после очистки
+    Redis старые ETag клиентов не совпали с новыми. Засеянная версия живет
+    RESPONSE_CACHE_TTL, как и тела под ней: запросы к несуществующим товарам
+    не оставляют вечных ключей, а истекшая версия засевается заново более
+    поздним временем и лишь приводит к одному промаху.
+    """
+    version = await async_redis_client.get(key)
+    if version is None:
+        await async_redis_client.set(key, _initial_version(), nx=True, ex=settings.RESPONSE_CACHE_TTL)
+        version = await async_redis_client.get(key)
+    return version
+
+
+async def _bump_versions(keys: Sequence[str]) -> None:
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            # Отсутствующий ключ засевается так же, как в _get_version, а не с нуля
+            pipe.set(key, _initial_version(), nx=True, ex=settings.RESPONSE_CACHE_TTL)
+            pipe.incr(key)
+        await pipe.execute()
+
+
+async def get_product_version(product_id: int) -> str:
+    """Версия данных товара"""
+    return await _get_version(_version_key(product_id))
+
+
+async def invalidate_product_cache(*product_ids: int) -> None:
+    """Сбросить кеш ответов по товарам: новая версия делает старые ключи недостижимыми"""
+    try:
+        await _bump_versions([_version_key(product_id) for product_id in product_ids])
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate response cache for {product_ids}: {e}")
+
+
+async def invalidate_cache_scope(scope: str) -> None:
+    """Сбросить кеш всех ответов, зависящих от общих данных scope (например, тарифов)"""
+    try:
+        await _bump_versions([_scope_version_key(scope)])
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate response cache scope {scope}: {e}")
+
+
+async def cached_json_response(
+    request: Request,
+    product_id: int,
+    build: Callable[[AsyncSession], Awaitable[Union[BaseModel, bytes]]],
+    scopes: Sequence[str] = (),
+) -> Response:
+    """
+    Отдать ответ из кеша или собрать его через build(session).
+    ETag выводится из версии товара, поэтому If-None-Match отвечается 304
+    без чтения тела из Redis и без обращения к Postgres.
+
+    Тело для кеша собирается с основной базы: версия прочитана до сборки,
+    и отстающая реплика сохранила бы старые данные под новой версией
+    на весь RESPONSE_CACHE_TTL. Без Redis кешировать нечего — читаем с реплики.
+    scopes — общие данные помимо товара, от которых зависит ответ: их версии
+    входят в ETag и ключ кеша.
+    """
+    try:
+        version = await get_product_version(product_id)
+        for scope in scopes:
+            version = f"{version}.{await _get_version(_scope_version_key(scope))}"
+    except RedisError as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        async with get_async_read_session() as session:
+            return Response(content=_encode(await build(session)), media_type="application/json")
+
+    digest = _variant_digest(request)
+    etag = f'W/"{product_id}-{version}-{digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.RESPONSE_CACHE_MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    key = f"{CACHE_PREFIX}:product:{product_id}:{version}:{digest}"
+    try:
+        body = await async_redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Response cache read failed: {e}")
+        body = None
+
+    if body is None:
+        async with get_async_session() as session:
+            body = _encode(await build(session))
+        try:
+            await async_redis_client.set(key, body, ex=settings.RESPONSE_CACHE_TTL)
+        except RedisError as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    return Response(content=body, media_type="application/json", headers=headers)
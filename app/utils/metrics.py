@@ -0,0 +1,142 @@
+"""
+Метрики горячих путей в формате Prometheus
+
+Счетчики и гистограммы живут в памяти процесса: запись — это инкремент
+под локом, без сетевых вызовов. API отдает их на /metrics, воркеры Celery —
+на отдельном порту (CELERY_METRICS_PORT, см. celery/app.py).
+
+В многопроцессном режиме (несколько воркеров uvicorn, prefork Celery)
+нужно задать переменную окружения PROMETHEUS_MULTIPROC_DIR: процессы пишут
+значения в файлы каталога, а /metrics собирает их вместе.
+"""
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Внешние площадки отвечают за сотни миллисекунд, разбор и запись — за миллисекунды
+NETWORK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CPU_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+TASK_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+MARKETPLACE_REQUEST_SECONDS = Histogram(
+    "marketplace_request_duration_seconds",
+    "Время HTTP-запроса к площадке",
+    ["marketplace"],
+    buckets=NETWORK_BUCKETS,
+)
+MARKETPLACE_RESPONSES = Counter(
+    "marketplace_responses_total",
+    "Ответы площадок по коду статуса; error — запрос не дошел",
+    ["marketplace", "status"],
+)
+MARKETPLACE_IDENTITY_COOLDOWNS = Counter(
+    "marketplace_identity_cooldowns_total",
+    "Паузы личностей клиента после блокировки; error — запрос не дошел",
+    ["marketplace", "reason"],
+)
+PARSE_SECONDS = Histogram(
+    "marketplace_parse_duration_seconds",
+    "Время разбора ответа площадки",
+    ["marketplace", "page"],
+    buckets=CPU_BUCKETS,
+)
+MATCH_SECONDS = Histogram(
+    "product_match_duration_seconds",
+    "Время оценки кандидатов при сопоставлении товаров",
+    buckets=CPU_BUCKETS,
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Время от публикации задачи до начала выполнения",
+    ["task"],
+    buckets=TASK_BUCKETS,
+)
+TASK_RUN_SECONDS = Histogram(
+    "celery_task_run_duration_seconds",
+    "Время выполнения задачи",
+    ["task", "state"],
+    buckets=TASK_BUCKETS,
+)
+DB_WRITE_SECONDS = Histogram(
+    "db_write_duration_seconds",
+    "Время записи пачки в базу вместе с коммитом",
+    ["operation"],
+    buckets=DB_BUCKETS,
+)
+DB_WRITE_BATCH_SIZE = Histogram(
+    "db_write_batch_rows",
+    "Строк в одной записи в базу",
+    ["operation"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+PRICE_ANOMALIES = Counter(
+    "price_anomalies_total",
+    "Цены, отмеченные как аномальные при записи",
+    ["marketplace", "rule"],
+)
+NOTIFICATIONS_SENT = Counter(
+    "notification_digests_total",
+    "Отправленные сводки уведомлений по результату",
+    ["status"],
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Замерить блок кода; метрика пишется и при исключении"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+def timed(histogram: Histogram, **labels: str):
+    """Декоратор для корутин: то же, что observe, на весь вызов"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with observe(histogram, **labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def observe_db_write(operation: str, rows: int) -> Iterator[None]:
+    DB_WRITE_BATCH_SIZE.labels(operation=operation).observe(rows)
+    with observe(DB_WRITE_SECONDS, operation=operation):
+        yield
+
+
+def metrics_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> bytes:
+    return generate_latest(metrics_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """Убрать файлы живых gauge завершившегося процесса в многопроцессном режиме"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
@@ -0,0 +1,46 @@
+"""
+Keyset-пагинация с непрозрачными курсорами
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Упаковать значения ключа последней строки в курсор"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Распаковать курсор и привести значения к типам ключа"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor shape mismatch")
+        return [
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for value, type_ in zip(values, types)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+
+def build_page(
+    rows: Sequence[Any],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]],
+) -> Tuple[List[Any], Optional[str], bool]:
+    """
+    Обрезать выборку из limit + 1 строк до страницы.
+    Лишняя строка означает, что есть следующая страница.
+    """
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(key(items[-1])) if has_more else None
+    return items, next_cursor, has_more
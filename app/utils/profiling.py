@@ -0,0 +1,134 @@
+"""
+Выборочное статистическое профилирование запросов API и задач Celery
+
+Пока профилирование выключено (PROFILE_SAMPLE_RATE = 0 и заголовок не
+разрешен), middleware не подключается вовсе, а задача делает одну проверку.
+Профиль снимается отдельным потоком: раз в PROFILE_INTERVAL_MS он читает
+стек профилируемого потока через sys._current_frames() и считает
+одинаковые стеки. Результат пишется в PROFILE_DIR в свернутом формате
+(«кадр;кадр;кадр число»), который понимают flamegraph.pl и speedscope.
+
+Запрос в asyncio профилируется по потоку цикла событий, поэтому в профиль
+попадает и то, что цикл в это время делал для соседних запросов, а работа,
+унесенная в пул потоков (run_in_threadpool), видна только как ожидание.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from types import FrameType
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame: Optional[FrameType]) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Сэмплер стека одного потока"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: Optional[float] = None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or settings.PROFILE_INTERVAL_MS / 1000
+        self.stacks: Counter = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def write(self, kind: str, name: str) -> Optional[str]:
+        """Сохранить профиль; пустой профиль (операция короче интервала) не пишется"""
+        if not self.stacks:
+            return None
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")[:80] or "root"
+        path = os.path.join(
+            settings.PROFILE_DIR,
+            f"{kind}-{slug}-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{self.duration * 1000:.0f}ms.folded",
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def should_profile(sample_rate: float, forced: bool = False) -> bool:
+    return forced or (sample_rate > 0 and random.random() < sample_rate)
+
+
+def api_profiling_enabled() -> bool:
+    return settings.PROFILE_SAMPLE_RATE > 0 or settings.PROFILE_ALLOW_HEADER
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профилирует долю PROFILE_SAMPLE_RATE запросов
+    и запросы с заголовком X-Profile: 1, если PROFILE_ALLOW_HEADER включен
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = settings.PROFILE_ALLOW_HEADER and any(
+            key == PROFILE_HEADER.encode() and value in (b"1", b"true")
+            for key, value in scope.get("headers", ())
+        )
+        if not should_profile(settings.PROFILE_SAMPLE_RATE, forced):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler().start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            try:
+                path = sampler.write("api", f"{scope['method']}{scope['path']}")
+                if path:
+                    logger.info(f"Request profile saved: {path}")
+            except OSError as e:
+                logger.warning(f"Failed to save request profile: {e}")
@@ -1 +1,64 @@
- 
\ No newline at end of file
+"""
+Ограничение частоты действий, общее для всех процессов
+
+Счетчик фиксированного окна в Redis: ключ живет period секунд, каждое
+разрешенное действие увеличивает его на единицу. Проверка и увеличение
+выполняются одним Lua-скриптом, поэтому воркеры не превышают лимит
+при одновременных попытках, а отказ не расходует лимит.
+"""
+from typing import Optional
+
+from app.utils.redis_client import async_redis_client
+
+RATE_LIMIT_PREFIX = "ratelimit"
+
+_ACQUIRE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current >= tonumber(ARGV[1]) then
+    return 0
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# Вернуть действие только в открытое окно: после истечения ключа возвращать нечего
+_RELEASE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current > 0 then
+    redis.call('DECR', KEYS[1])
+end
+return current
+"""
+
+
+class RateLimiter:
+    """Не больше limit действий за period секунд на каждый идентификатор"""
+
+    def __init__(self, name: str, limit: int, period: float):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self._script = async_redis_client.register_script(_ACQUIRE_SCRIPT)
+        self._release_script = async_redis_client.register_script(_RELEASE_SCRIPT)
+
+    def _key(self, identity: str) -> str:
+        return f"{RATE_LIMIT_PREFIX}:{self.name}:{identity}"
+
+    async def acquire(self, identity: str = "global") -> bool:
+        """Занять одно действие; False — лимит окна исчерпан"""
+        allowed = await self._script(
+            keys=[self._key(identity)],
+            args=[self.limit, int(self.period * 1000)],
+        )
+        return bool(allowed)
+
+    async def release(self, identity: str = "global") -> None:
+        """Вернуть занятое действие, если оно так и не было выполнено"""
+        await self._release_script(keys=[self._key(identity)])
+
+    async def retry_after(self, identity: str = "global") -> Optional[float]:
+        """Секунд до начала следующего окна; None — окно не открыто"""
+        ttl = await async_redis_client.pttl(self._key(identity))
+        return ttl / 1000 if ttl and ttl > 0 else None
@@ -1,15 +1,93 @@
 """
 Redis клиент для кеширования
+
+Основной клиент асинхронный и работает поверх общего пула соединений
+на процесс. Пул открывается в lifespan FastAPI и при старте процесса
+воркера Celery (см. celery/app.py) и закрывается при их остановке.
+Синхронный клиент создается лениво: для CLI-проверки подключения и сигналов Celery вне цикла событий.
 """
+import logging
+from typing import Any, List, Mapping, Optional, Sequence
+
 import redis
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
 from app.config import settings
 
-redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+logger = logging.getLogger(__name__)
+
+# Ключей в одной команде MGET/MSET: не держим Redis на огромном ответе
+REDIS_BATCH_SIZE = 1000
+
+# Блокирующий пул ждет свободное соединение вместо ошибки при всплеске нагрузки
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    health_check_interval=30,
+    decode_responses=True,
+)
+
+async_redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+_sync_client: Optional[redis.Redis] = None
+
+
+async def init_redis() -> None:
+    """Открыть первое соединение заранее, чтобы ошибка конфигурации была видна при старте"""
+    try:
+        await async_redis_client.ping()
+    except RedisError as e:
+        logger.warning(f"Redis is unavailable on startup: {e}")
+
+
+async def close_redis() -> None:
+    await async_redis_client.aclose()
+    await redis_pool.disconnect()
+
+
+async def mget_batched(keys: Sequence[str], batch_size: int = REDIS_BATCH_SIZE) -> List[Optional[str]]:
+    """MGET любого числа ключей: пачки по batch_size уходят одним pipeline"""
+    if not keys:
+        return []
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for start in range(0, len(keys), batch_size):
+            pipe.mget(keys[start:start + batch_size])
+        chunks = await pipe.execute()
+    return [value for chunk in chunks for value in chunk]
+
+
+async def mset_batched(
+    mapping: Mapping[str, Any],
+    ex: Optional[int] = None,
+    batch_size: int = REDIS_BATCH_SIZE,
+) -> None:
+    """MSET пачками в одном pipeline; с ex ключам ставится TTL в той же пересылке"""
+    if not mapping:
+        return
+    items = list(mapping.items())
+    async with async_redis_client.pipeline(transaction=False) as pipe:
+        for start in range(0, len(items), batch_size):
+            chunk = dict(items[start:start + batch_size])
+            pipe.mset(chunk)
+            if ex:
+                for key in chunk:
+                    pipe.expire(key, ex)
+        await pipe.execute()
+
+
+def get_sync_redis() -> redis.Redis:
+    """Синхронный клиент для кода вне цикла событий"""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_client
 
 
 def test_redis_connection():
     try:
-        redis_client.ping()
+        get_sync_redis().ping()
         print("Redis подключение успешно!")
         return True
     except Exception as e:
@@ -18,4 +96,4 @@ def test_redis_connection():
 
 
 if __name__ == "__main__":
-    test_redis_connection()
\ No newline at end of file
+    test_redis_connection()
@@ -1,9 +1,31 @@
 """
 Утилиты для безопасности
 """
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt отпускает GIL, поэтому хватает потоков; размер пула ограничивает
+# число одновременных хешей, чтобы всплеск логинов не съел все ядра
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
 
 
 def hash_password(password: str) -> str:
@@ -13,4 +35,53 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверить пароль"""
-    return pwd_context.verify(plain_password, hashed_password) 
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Хешировать пароль, не блокируя цикл событий"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль, не блокируя цикл событий"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+
+def create_access_token(user_id: int, expires_in: Optional[int] = None) -> str:
+    """
+    Токен доступа вида payload.signature (HMAC-SHA256 на SECRET_KEY).
+    Проверка подписи стоит микросекунды — bcrypt нужен только при логине.
+    """
+    expires_at = int(time.time()) + (expires_in or settings.ACCESS_TOKEN_TTL)
+    payload = _b64encode(json.dumps({"sub": user_id, "exp": expires_at}).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_access_token(token: str) -> Optional[int]:
+    """ID пользователя из токена или None, если токен поддельный или истек"""
+    try:
+        payload, signature = token.split(".", 1)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        data = json.loads(_b64decode(payload))
+        if data["exp"] < time.time():
+            return None
+        return int(data["sub"])
+    except (ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,30 @@
+"""
+Быстрый путь сериализации больших ответов: кортежи колонок без Pydantic и orjson
+"""
+from typing import Any, Dict, Iterable, List, Sequence
+
+import orjson
+from fastapi import HTTPException
+
+
+def rows_to_dicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Строки select(*columns) в словари — без ORM-объектов и валидации моделей"""
+    return [row._asdict() for row in rows]
+
+
+def dumps(payload: Any) -> bytes:
+    """orjson сам сериализует datetime в ISO 8601, как и стандартный путь FastAPI"""
+    return orjson.dumps(payload)
+
+
+def check_page_size(limit: int, fast: bool, max_size: int) -> None:
+    """Большие страницы разрешены только быстрому пути"""
+    if not fast and limit > max_size:
+        raise HTTPException(
+            status_code=422,
+            detail=f"limit больше {max_size} доступен только с fast=true"
+        )
+
+
+def columns_of(model: Any, names: Sequence[str]) -> List[Any]:
+    return [getattr(model, name) for name in names]
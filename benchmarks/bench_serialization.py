@@ -0,0 +1,124 @@
+"""
+Бенчмарк сериализации ответа истории цен на 50k строк
+
+Запуск из корня проекта:
+    python benchmarks/bench_serialization.py [--rows 50000] [--runs 3]
+
+Сравниваются два пути на одной и той же выборке из SQLite в памяти:
+  - обычный: ORM-сущности -> PriceHistoryList (Pydantic) -> jsonable_encoder + json.dumps,
+    как это делает FastAPI для response_model;
+  - быстрый (fast=true): кортежи колонок -> словари -> orjson.
+Для каждого пути печатается время и пиковая память (tracemalloc).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.simplefilter("ignore")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.product import Product
+from app.models.price_history import PriceHistory
+from app.schemas.price_history import PriceHistoryList
+from app.utils.serialization import columns_of, dumps, rows_to_dicts
+
+HISTORY_COLUMNS = ("id", "product_id", "marketplace", "price", "currency", "created_at")
+
+
+def prepare(rows: int):
+    engine = create_engine("sqlite://")
+    for table in (User.__table__, Product.__table__, PriceHistory.__table__):
+        table.create(engine)
+
+    start = datetime(2024, 1, 1)
+    marketplaces = ("wildberries", "ozon", "yandex_market")
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__).values(id=1, name="iPhone 15"))
+        conn.execute(insert(PriceHistory.__table__), [
+            {
+                "product_id": 1,
+                "marketplace": marketplaces[i % 3],
+                "price": 1000.0 + i % 500,
+                "currency": "RUB",
+                "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+    return engine
+
+
+def standard_path(engine) -> bytes:
+    with Session(engine) as session:
+        history = session.execute(select(PriceHistory)).scalars().all()
+        payload = PriceHistoryList(
+            product_id=1,
+            product_name="iPhone 15",
+            total_records=len(history),
+            history=history,
+            limit=len(history),
+        )
+        return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def fast_path(engine) -> bytes:
+    with Session(engine) as session:
+        rows = session.execute(select(*columns_of(PriceHistory, HISTORY_COLUMNS))).all()
+        return dumps({
+            "product_id": 1,
+            "product_name": "iPhone 15",
+            "resolution": "raw",
+            "total_records": len(rows),
+            "history": rows_to_dicts(rows),
+            "candles": [],
+            "next_cursor": None,
+            "has_more": False,
+            "limit": len(rows),
+        })
+
+
+def measure(func, engine, runs: int):
+    timings = []
+    peaks = []
+    size = 0
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        body = func(engine)
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        size = len(body)
+    return statistics.median(timings), max(peaks), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сериализации истории цен")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = prepare(args.rows)
+
+    print(f"строк: {args.rows}")
+    print(f"{'путь':<12} {'время, мс':>10} {'строк/с':>12} {'пик памяти, МБ':>16} {'ответ, КБ':>10}")
+    for name, func in (("обычный", standard_path), ("fast=true", fast_path)):
+        elapsed, peak, size = measure(func, engine, args.runs)
+        print(
+            f"{name:<12} {elapsed * 1000:>10.1f} {args.rows / elapsed:>12.0f} "
+            f"{peak / 2 ** 20:>16.1f} {size / 1024:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
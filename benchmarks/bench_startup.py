@@ -0,0 +1,91 @@
+"""
+Бенчмарк холодного старта API
+
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py [--runs 5] [--with-db]
+
+Каждый замер — отдельный процесс Python, чтобы кеш модулей не искажал результат.
+С --with-db дополнительно меряется startup-часть lifespan (нужна доступная база).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# сценарий -> (подготовка вне замера, замеряемый код)
+SNIPPETS = {
+    "import app.main": ("", "import app.main"),
+    "UserAgent() x3 (старое поведение)": (
+        "from fake_useragent import UserAgent",
+        "for _ in range(3): UserAgent()",
+    ),
+    "get_user_agent() x3 (общий на процесс)": (
+        "from app.external.base_api import get_user_agent",
+        "for _ in range(3): get_user_agent()",
+    ),
+}
+
+LIFESPAN_SNIPPETS = {
+    "lifespan: create_all": (
+        "import asyncio\n"
+        "from app.database import init_db, close_db\n"
+        "async def main():\n"
+        "    await init_db()\n"
+        "    await close_db()",
+        "asyncio.run(main())",
+    ),
+    "lifespan: проверка ревизии": (
+        "import asyncio\n"
+        "from app.database import check_db_revision, close_db\n"
+        "async def main():\n"
+        "    await check_db_revision()\n"
+        "    await close_db()",
+        "asyncio.run(main())",
+    ),
+}
+
+TIMER = (
+    "import time, warnings\n"
+    "warnings.simplefilter('ignore')\n"
+    "{setup}\n"
+    "_t = time.perf_counter()\n"
+    "{body}\n"
+    "print(time.perf_counter() - _t)\n"
+)
+
+
+def measure(setup: str, body: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(setup=setup, body=body)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--with-db", action="store_true", help="Мерить startup lifespan с базой")
+    args = parser.parse_args()
+
+    snippets = dict(SNIPPETS)
+    if args.with_db:
+        snippets.update(LIFESPAN_SNIPPETS)
+
+    print(f"{'сценарий':<45} {'медиана, мс':>12} {'мин, мс':>10}")
+    for name, (setup, body) in snippets.items():
+        timings = measure(setup, body, args.runs)
+        print(f"{name:<45} {statistics.median(timings) * 1000:>12.1f} {min(timings) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,47 @@
- 
\ No newline at end of file
+"""
+Celery задачи аналитики
+"""
+from typing import Dict
+
+from celery import current_app as celery_app
+from celery.app import run_async
+
+from app.config import settings
+from app.database import get_async_read_session
+from app.services.analytics_service import refresh_price_analytics
+from app.services.arbitrage_ranking import rebuild_arbitrage_ranking
+from app.services.net_arbitrage import refresh_net_arbitrage
+from app.services.price_snapshot import export_new_price_history
+
+
+@celery_app.task
+def export_price_history_snapshot() -> Dict:
+    """Дописать новые строки истории цен в Parquet-снимок"""
+    return run_async(export_new_price_history(
+        settings.PARQUET_EXPORT_DIR,
+        batch_size=settings.PARQUET_EXPORT_BATCH_SIZE
+    ))
+
+
+@celery_app.task
+def rebuild_arbitrage_ranking_task() -> Dict:
+    """Перестроить рейтинг арбитража с нуля по текущим ценам"""
+    return run_async(_rebuild_arbitrage_ranking_async())
+
+
+async def _rebuild_arbitrage_ranking_async() -> Dict:
+    async with get_async_read_session() as session:
+        ranked = await rebuild_arbitrage_ranking(session)
+    return {"ranked_products": ranked}
+
+
+@celery_app.task
+def refresh_price_analytics_summary() -> Dict:
+    """Пересчитать сводную аналитику цен по всем товарам"""
+    return run_async(refresh_price_analytics())
+
+
+@celery_app.task
+def refresh_net_arbitrage_task() -> Dict:
+    """Пересчитать чистую арбитражную маржу по всему каталогу"""
+    return run_async(refresh_net_arbitrage())
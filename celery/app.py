@@ -1,9 +1,54 @@
 """
 Celery приложение для фоновых задач
 """
-from celery import Celery
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Dict, Optional
 
-app = Celery('arbitration')
+from celery import Celery, Task
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from prometheus_client import start_http_server
+
+from app.config import settings
+from app.database import close_db
+from app.external.base_api import preload_shared_data
+from app.services.notification_service import close_smtp_pool
+from app.utils.profiling import StackSampler, should_profile
+from app.utils.metrics import TASK_QUEUE_WAIT_SECONDS, TASK_RUN_SECONDS, mark_process_dead, metrics_registry
+from app.utils.redis_client import init_redis, close_redis
+
+class ProfiledTask(Task):
+    """
+    Базовый класс задач: профилирует долю PROFILE_TASK_SAMPLE_RATE вызовов
+    и вызовы, опубликованные с заголовком profile=True:
+        task.apply_async(args, headers={"profile": True})
+    """
+
+    def __call__(self, *args, **kwargs):
+        forced = bool(getattr(self.request, "profile", False))
+        if not should_profile(settings.PROFILE_TASK_SAMPLE_RATE, forced):
+            return super().__call__(*args, **kwargs)
+
+        sampler = StackSampler().start()
+        try:
+            return super().__call__(*args, **kwargs)
+        finally:
+            sampler.stop()
+            try:
+                sampler.write("task", self.name)
+            except OSError as e:
+                print(f"Не удалось сохранить профиль задачи {self.name}: {e}")
+
+
+app = Celery('arbitration', task_cls=ProfiledTask)
 
 app.config_from_object('celery.config')
 
@@ -14,8 +59,9 @@ app.autodiscover_tasks([
 ])
 
 app.conf.update(
-    broker_url='redis://localhost:6379/0',
-    result_backend='redis://localhost:6379/0',
+    # Тот же Redis, что у API: /monitoring читает celery-task-meta-* напрямую через async_redis_client
+    broker_url=settings.REDIS_URL,
+    result_backend=settings.REDIS_URL,
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
@@ -26,10 +72,95 @@ app.conf.update(
             'task': 'celery.price_monitoring.monitor_all_products',
             'schedule': 3600.0,
         },
+        'export-price-snapshot-every-hour': {
+            'task': 'celery.analytics.export_price_history_snapshot',
+            'schedule': 3600.0,
+        },
+        'refresh-price-analytics-every-hour': {
+            'task': 'celery.analytics.refresh_price_analytics_summary',
+            'schedule': 3600.0,
+        },
+        'send-notification-digests': {
+            'task': 'celery.notifications.send_notification_digests',
+            'schedule': float(settings.NOTIFICATION_FLUSH_INTERVAL),
+        },
+        'refresh-net-arbitrage-every-hour': {
+            'task': 'celery.analytics.refresh_net_arbitrage_task',
+            'schedule': 3600.0,
+        },
+        'rebuild-arbitrage-ranking-daily': {
+            'task': 'celery.analytics.rebuild_arbitrage_ranking_task',
+            'schedule': 86400.0,
+        },
     },
 )
 
 
+# Один цикл событий на процесс воркера: пулы Redis и Postgres привязаны
+# к циклу, и с asyncio.run на каждую задачу их соединения терялись бы
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Выполнить корутину задачи в долгоживущем цикле процесса"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coro)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    preload_shared_data()
+    run_async(init_redis())
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    global _worker_loop
+    mark_process_dead(os.getpid())
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    run_async(close_smtp_pool())
+    run_async(close_redis())
+    run_async(close_db())
+    _worker_loop.close()
+    _worker_loop = None
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    # Для prefork нужен PROMETHEUS_MULTIPROC_DIR — иначе главный процесс
+    # не видит метрик дочерних, в которых выполняются задачи
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=metrics_registry())
+
+
+_task_started: Dict[str, float] = {}
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    published_at = getattr(task.request, "published_at", None)
+    if published_at:
+        TASK_QUEUE_WAIT_SECONDS.labels(task=task.name).observe(max(time.time() - published_at, 0.0))
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_finish(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_RUN_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
 def test_celery_connection():
     try:
         result = app.control.inspect().stats()
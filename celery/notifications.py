@@ -1 +1,38 @@
- 
\ No newline at end of file
+"""
+Celery задачи уведомлений
+"""
+from typing import Dict
+
+from celery import current_app as celery_app
+from celery.app import run_async
+from celery.signals import task_failure
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.notification_service import (
+    ADMIN_RECIPIENT,
+    send_due_digests,
+    stage_notifications,
+    task_failure_event,
+)
+from app.utils.redis_client import get_sync_redis
+
+
+@celery_app.task
+def send_notification_digests() -> Dict:
+    """Отправить созревшие сводки уведомлений"""
+    return run_async(send_due_digests())
+
+
+@task_failure.connect
+def queue_task_failure_notification(sender=None, task_id=None, exception=None, **kwargs):
+    # Сигнал приходит вне цикла событий задачи, поэтому событие ставится
+    # синхронным клиентом; сбои одной задачи схлопываются в строку сводки
+    if not settings.NOTIFICATIONS_ENABLED or not settings.NOTIFICATION_ADMIN_EMAILS:
+        return
+    try:
+        pipe = get_sync_redis().pipeline(transaction=False)
+        stage_notifications(pipe, ADMIN_RECIPIENT, [task_failure_event(sender.name, task_id, exception)])
+        pipe.execute()
+    except RedisError as e:
+        print(f"Не удалось поставить уведомление о сбое задачи {sender.name}: {e}")
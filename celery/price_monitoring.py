@@ -1,16 +1,24 @@
 """
 Celery задачи для мониторинга цен
 """
-import asyncio
 from datetime import datetime
 from typing import Dict, List, Optional
 
 from celery import current_app as celery_app
+from celery.app import run_async
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_async_session
 from app.models.product import Product
-from app.models.price_history import PriceHistory
+from app.services.arbitrage_ranking import refresh_arbitrage_ranking
+from app.services.notification_service import notify_price_alerts, notify_price_drops
+from app.services.price_recorder import pop_recorded_anomalies, pop_triggered_alerts, record_price
+from app.services.price_stream import build_price_event, publish_price_updates
+from app.services.product_import import update_import_job
+from app.services.product_matcher import ProductMatchingService
+from app.utils.cache import invalidate_product_cache
+from app.utils.metrics import observe_db_write
 from app.external.wildberries_api import WildberriesAPI
 from app.external.ozon_api import OzonAPI
 from app.external.yandex_market_api import YandexMarketAPI
@@ -19,7 +27,7 @@ from app.external.yandex_market_api import YandexMarketAPI
 @celery_app.task(bind=True)
 def monitor_product_price(self, product_id: int, product_name: str):
     """Мониторинг цены конкретного товара"""
-    return asyncio.run(_monitor_product_price_async(product_id, product_name))
+    return run_async(_monitor_product_price_async(product_id, product_name))
 
 
 async def _monitor_product_price_async(product_id: int, product_name: str) -> Dict:
@@ -52,7 +60,7 @@ async def _monitor_product_price_async(product_id: int, product_name: str) -> Di
 @celery_app.task
 def monitor_product_prices(product_id: int):
     """Задача мониторинга цен товара на всех площадках"""
-    return asyncio.run(_monitor_product_prices_async(product_id))
+    return run_async(_monitor_product_prices_async(product_id))
 
 
 async def _monitor_product_prices_async(product_id: int) -> Dict:
@@ -83,17 +91,33 @@ async def _monitor_product_prices_async(product_id: int) -> Dict:
                     ym_price = await ym_api.get_product_price(product.yandex_market_id)
                     prices['yandex_market'] = ym_price
             
-            for marketplace, price in prices.items():
-                if price and price > 0:
-                    price_entry = PriceHistory(
+            # В метрику идут записанные цены, а не опрошенные площадки
+            valid_prices = {marketplace: price for marketplace, price in prices.items() if price and price > 0}
+            events = []
+            with observe_db_write("price_monitoring", len(valid_prices)):
+                for marketplace, price in valid_prices.items():
+                    entry = await record_price(
+                        session,
                         product_id=product_id,
                         marketplace=marketplace,
-                        price=price,
-                        timestamp=datetime.utcnow()
+                        price=price
                     )
-                    session.add(price_entry)
+                    events.append(build_price_event(
+                        product_id,
+                        marketplace,
+                        price,
+                        entry.currency,
+                        entry.created_at,
+                        user_id=product.user_id
+                    ))
+                
+                await session.commit()
             
-            await session.commit()
+            await invalidate_product_cache(product_id)
+            await refresh_arbitrage_ranking(session, [product_id])
+            await publish_price_updates(events)
+            await notify_price_drops(product, pop_recorded_anomalies(session))
+            await notify_price_alerts(product, pop_triggered_alerts(session))
             
             result = {
                 "product_id": product_id,
@@ -115,7 +139,7 @@ async def _monitor_product_prices_async(product_id: int) -> Dict:
 def monitor_all_products():
     """Задача мониторинга всех продуктов"""
     print("Запуск мониторинга всех продуктов")
-    return asyncio.run(_monitor_all_products_async())
+    return run_async(_monitor_all_products_async())
 
 
 async def _monitor_all_products_async() -> List[Dict]:
@@ -142,4 +166,43 @@ async def _monitor_all_products_async() -> List[Dict]:
             return results
             
         except Exception as e:
-            return [{"error": str(e)}]
\ No newline at end of file
+            return [{"error": str(e)}]
+
+
+@celery_app.task
+def match_imported_products(product_ids: List[int], job_id: Optional[str] = None):
+    """Найти карточки загруженных товаров на площадках и сохранить их ID и ссылки"""
+    return run_async(_match_imported_products_async(product_ids, job_id))
+
+
+async def _match_imported_products_async(product_ids: List[int], job_id: Optional[str]) -> Dict:
+    matched = 0
+    
+    async with get_async_session() as session:
+        result = await session.execute(select(Product).where(Product.id.in_(product_ids)))
+        products = result.scalars().all()
+        
+        async with ProductMatchingService() as matcher:
+            for product in products:
+                try:
+                    match = await matcher.find_product_everywhere(product.name)
+                    if not match.found_count or not await matcher.validate_product_match(match):
+                        continue
+                except Exception as e:
+                    print(f"Ошибка сопоставления товара {product.id}: {e}")
+                    continue
+                
+                found = {**matcher.get_ids_for_monitoring(match), **matcher.get_urls_for_database(match)}
+                for field, value in found.items():
+                    # Заданное пользователем не перезаписываем
+                    if value and not getattr(product, field):
+                        setattr(product, field, str(value))
+                matched += 1
+        
+        await session.commit()
+    
+    await invalidate_product_cache(*product_ids)
+    if job_id:
+        await update_import_job(job_id, matched=matched, unmatched=len(product_ids) - matched)
+    
+    return {"job_id": job_id, "products": len(product_ids), "matched": matched}
@@ -0,0 +1,62 @@
+"""
+Тестирование векторной аналитики цен
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.analytics_service import compute_series_stats, rolling_means
+
+
+def make_series():
+    """Два товара, у первого две площадки; наблюдения перемешаны"""
+    start = datetime(2024, 1, 1)
+    rows = []
+    for day, price in enumerate([100.0, 110.0, 99.0, 121.0, 120.0]):
+        rows.append((1, "ozon", price, start + timedelta(days=day)))
+    for day, price in enumerate([200.0, 190.0, 180.0]):
+        rows.append((1, "wildberries", price, start + timedelta(days=day)))
+    rows.append((2, "ozon", 50.0, start))
+    rows = [rows[i] for i in np.random.default_rng(0).permutation(len(rows))]
+
+    product_ids, marketplaces, prices, observed_at = zip(*rows)
+    return (
+        np.array(product_ids),
+        np.array(marketplaces, dtype=object),
+        np.array(prices),
+        np.array(observed_at, dtype="datetime64[us]"),
+    )
+
+
+def test_series_stats_match_naive_computation():
+    stats = compute_series_stats(*make_series(), short_window=2, long_window=30)
+
+    assert list(zip(stats["product_id"], stats["marketplace"])) == [
+        (1, "ozon"), (1, "wildberries"), (2, "ozon")
+    ]
+    assert stats["observations"].tolist() == [5, 3, 1]
+
+    ozon = np.array([100.0, 110.0, 99.0, 121.0, 120.0])
+    returns = np.diff(ozon) / ozon[:-1]
+    assert stats["min_price"][0] == 99.0 and stats["max_price"][0] == 121.0
+    assert stats["mean_price"][0] == pytest.approx(ozon.mean())
+    assert stats["moving_average_short"][0] == pytest.approx(120.5)
+    assert stats["change_percent"][0] == pytest.approx(20.0)
+    assert stats["volatility"][0] == pytest.approx(returns.std() * 100)
+    assert stats["trend_per_day"][0] == pytest.approx(np.polyfit(np.arange(5), ozon, 1)[0])
+
+    # Ряд из одной точки: без изменений и тренда
+    assert stats["volatility"][2] == 0.0
+    assert stats["trend_per_day"][2] == 0.0
+
+
+def test_rolling_window_does_not_cross_series():
+    prices = np.array([1.0, 2.0, 3.0, 10.0, 20.0])
+    series_start = np.array([0, 0, 0, 3, 3])
+
+    assert rolling_means(prices, series_start, 2).tolist() == [1.0, 1.5, 2.5, 10.0, 15.0]
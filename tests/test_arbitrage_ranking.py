@@ -0,0 +1,135 @@
+"""
+Тестирование рейтинга арбитражных возможностей
+"""
+import asyncio
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import arbitrage_ranking
+from app.services.arbitrage_ranking import (
+    DETAILS_KEY,
+    REBUILD_DIRTY_KEY,
+    REBUILD_PREFIX,
+    build_arbitrage_entry,
+    ranking_key,
+    _stage_updates,
+)
+
+
+class RecordingPipeline:
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args))
+
+
+def test_entry_spreads():
+    """Разрыв считается между самой дешевой и самой дорогой площадкой"""
+    entry = build_arbitrage_entry(
+        1, "iPhone 15", 7, "phones", {"wildberries": 900.0, "ozon": 1000.0, "yandex_market": 1080.0}
+    )
+
+    assert (entry["min_marketplace"], entry["max_marketplace"]) == ("wildberries", "yandex_market")
+    assert entry["spread"] == 180.0
+    assert entry["spread_percent"] == 20.0
+
+
+def test_single_marketplace_is_not_ranked():
+    assert build_arbitrage_entry(1, "iPhone 15", None, None, {"ozon": 1000.0, "wildberries": 0}) is None
+
+
+def test_category_change_moves_product():
+    """Товар убирается из множеств прежней категории и попадает в новые"""
+    old = build_arbitrage_entry(1, "iPhone 15", None, "phones", {"ozon": 1000.0, "wildberries": 900.0})
+    new = dict(old, category="gadgets")
+    pipe = RecordingPipeline()
+
+    _stage_updates(pipe, {1: new}, [json.dumps(old)])
+
+    removed = {args[0] for name, args in pipe.commands if name == "zrem"}
+    added = {args[0] for name, args in pipe.commands if name == "zadd"}
+    assert ranking_key("absolute", category="phones") in removed
+    assert ranking_key("relative", category="gadgets") in added
+    assert ranking_key("absolute", category="phones") not in added
+
+
+def test_rebuild_stages_outside_live_keys():
+    """Перестройка пишет только в свои ключи, рабочий рейтинг не трогает"""
+    entry = build_arbitrage_entry(1, "iPhone 15", 7, "phones", {"ozon": 1000.0, "wildberries": 900.0})
+    pipe = RecordingPipeline()
+
+    _stage_updates(pipe, {1: entry}, [None], prefix=REBUILD_PREFIX)
+
+    keys = {args[0] for name, args in pipe.commands}
+    assert ranking_key("absolute", user_id=7, prefix=REBUILD_PREFIX) in keys
+    assert f"{REBUILD_PREFIX}:details" in keys
+    assert all(key.startswith(f"{REBUILD_PREFIX}:") for key in keys)
+
+
+class FakeTransaction(RecordingPipeline):
+    """Конвейер с WATCH: чтения до multi() отвечают из заданных данных"""
+
+    def __init__(self, reads):
+        super().__init__()
+        self.reads = reads
+        self.executed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *keys):
+        self.commands.append(("watch", keys))
+
+    async def smembers(self, key):
+        return self.reads["smembers"]
+
+    async def hmget(self, key, fields):
+        return self.reads[key]
+
+    async def execute(self):
+        self.executed = True
+
+
+class FakeRedis:
+    def __init__(self, pipe, keys):
+        self.pipe = pipe
+        self.keys = keys
+
+    def pipeline(self, transaction=True):
+        return self.pipe
+
+    async def scan_iter(self, match):
+        for key in self.keys:
+            if key.startswith(match[:-1]):
+                yield key
+
+
+def test_swap_carries_removals_made_during_rebuild(monkeypatch):
+    """Товар, удаленный из рабочего рейтинга во время прохода, не возвращается подменой"""
+    entry = build_arbitrage_entry(1, "iPhone 15", 7, "phones", {"ozon": 1000.0, "wildberries": 900.0})
+    staged_all = ranking_key("absolute", prefix=REBUILD_PREFIX)
+    pipe = FakeTransaction({
+        "smembers": {b"1"},
+        DETAILS_KEY: [None],
+        f"{REBUILD_PREFIX}:details": [json.dumps(entry)],
+    })
+    monkeypatch.setattr(
+        arbitrage_ranking, "async_redis_client",
+        FakeRedis(pipe, [staged_all, f"{REBUILD_PREFIX}:details", ranking_key("absolute"), DETAILS_KEY]),
+    )
+
+    assert asyncio.run(arbitrage_ranking._swap_rebuilt_ranking())
+    names = [name for name, _ in pipe.commands]
+    assert pipe.commands[0] == ("watch", (DETAILS_KEY, REBUILD_DIRTY_KEY))
+    # Удаление переносится в собранные ключи до переименования, в одной транзакции
+    assert ("zrem", (staged_all, 1)) in pipe.commands
+    assert ("hdel", (f"{REBUILD_PREFIX}:details", 1)) in pipe.commands
+    assert names.index("multi") < names.index("zrem") < names.index("eval")
+    assert pipe.executed
@@ -0,0 +1,38 @@
+"""
+Тестирование массового сравнения цен
+"""
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints.prices import get_bulk_price_comparison
+from app.schemas.price_history import BulkComparisonRequest
+
+
+class FakeResult:
+    def all(self):
+        return []
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult()
+
+
+def test_name_filter_matches_literally():
+    """% и _ из подстроки названия экранируются, а не работают как шаблон"""
+    db = RecordingSession()
+    asyncio.run(get_bulk_price_comparison(BulkComparisonRequest(name_contains="50%_off"), db))
+
+    compiled = db.statements[0].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "products.name ILIKE '%%' || %(name_1)s || '%%' ESCAPE '/'" in sql
+    assert compiled.params["name_1"] == "50/%/_off"
@@ -0,0 +1,123 @@
+"""
+Тестирование пула личностей клиентов площадок
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.external.identity_pool import IdentityPool, build_identities
+
+
+def make_pool():
+    identities = build_identities(["ua-1", "ua-2"], ["http://proxy-1:8080"], direct=True)
+    return IdentityPool(identities, alpha=0.5, cooldown=10.0, max_cooldown=60.0)
+
+
+def test_build_identities():
+    """Каждый User-Agent на каждом маршруте, индексы по порядку"""
+    identities = build_identities(["ua-1", "ua-2"], ["http://proxy-1:8080"], direct=True)
+    assert [(i.index, i.user_agent, i.proxy) for i in identities] == [
+        (0, "ua-1", None), (1, "ua-2", None),
+        (2, "ua-1", "http://proxy-1:8080"), (3, "ua-2", "http://proxy-1:8080"),
+    ]
+    assert all(i.proxy for i in build_identities(["ua-1"], ["http://proxy-1:8080"], direct=False))
+    assert build_identities(["ua-1"], [], direct=False)[0].proxy is None
+
+
+def test_block_cooldown_and_recovery():
+    """Блокировка снижает оценку и ставит паузу, растущую с каждой неудачей подряд"""
+    pool = make_pool()
+    identity = pool.identities[0]
+
+    pool.report("ozon", identity, 403, 0.2)
+    health = pool.health("ozon", identity)
+    assert health.score == 0.5
+    assert health.failures == 1
+    first_pause = health.cooldown_until
+
+    pool.report("ozon", identity, 403, 0.2)
+    assert health.failures == 2
+    assert health.cooldown_until > first_pause + 9
+
+    pool.report("ozon", identity, 200, 0.2)
+    assert health.failures == 0
+    assert health.score == 0.625
+    # Оценка по другой площадке не затронута
+    assert pool.health("wildberries", identity).score == 1.0
+
+
+def test_rate_limit_pauses_route():
+    """429 ставит на паузу весь маршрут, а выбор обходит его"""
+    pool = make_pool()
+    proxied = [i for i in pool.identities if i.proxy]
+    pool.report("ozon", proxied[0], 429, 0.1, retry_after=30.0)
+
+    assert pool.available_at("ozon", proxied[1]) == pool.health("ozon", proxied[0]).cooldown_until
+    for _ in range(50):
+        assert pool.acquire("ozon").proxy is None
+    assert {pool.acquire("wildberries").proxy for _ in range(200)} == {None, "http://proxy-1:8080"}
+
+
+def test_server_errors_do_not_penalize():
+    """5xx — проблема площадки: оценка и паузы не меняются"""
+    pool = make_pool()
+    identity = pool.identities[0]
+    pool.report("ozon", identity, 503, 2.0)
+    health = pool.health("ozon", identity)
+    assert (health.score, health.failures, health.cooldown_until) == (1.0, 0, 0.0)
+    assert health.latency == 2.0
+
+
+def test_all_cooling_down_returns_soonest():
+    """Если на паузе весь пул, берется личность, освобождающаяся раньше"""
+    pool = make_pool()
+    for identity in pool.identities[1:]:
+        pool.report("ozon", identity, None, 0.0)
+        pool.report("ozon", identity, None, 0.0)
+    pool.report("ozon", pool.identities[0], None, 0.0)
+    assert pool.acquire("ozon") is pool.identities[0]
+
+
+def test_send_uses_single_identity_user_agent(monkeypatch):
+    """Запрос уходит ровно с одним User-Agent — от выбранной личности"""
+    import asyncio
+
+    import httpx
+
+    from app.external import identity_pool
+    from app.external.base_api import BaseMarketplaceAPI
+
+    monkeypatch.setattr(
+        identity_pool, "_identity_pool",
+        IdentityPool(build_identities(["ua-identity"], [], direct=True)),
+    )
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200, json={})
+
+    class DummyAPI(BaseMarketplaceAPI):
+        marketplace_name = "dummy"
+
+        async def search_products(self, query, limit=10):
+            return []
+
+        async def get_product_by_id(self, product_id):
+            return None
+
+    async def main():
+        api = DummyAPI()
+        await api._init_session()
+        api.session._transport = httpx.MockTransport(handler)
+        try:
+            await api._send("GET", "https://example.com/", headers={"Referer": "https://example.com/"})
+        finally:
+            await api._close_session()
+
+    asyncio.run(main())
+    raw = sent[0].headers.raw
+    assert [value for key, value in raw if key.lower() == b"user-agent"] == [b"ua-identity"]
+    assert sent[0].headers["Referer"] == "https://example.com/"
+    assert sent[0].headers["Accept-Language"].startswith("ru-RU")
@@ -0,0 +1,59 @@
+"""
+Тестирование чистой арбитражной маржи
+"""
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.net_arbitrage import (
+    best_net_arbitrage,
+    compute_net_arbitrage,
+    fee_matrices,
+    rank_by_profit,
+)
+
+MARKETPLACES = ["wildberries", "ozon", "yandex_market"]
+FEE_MODELS = {
+    ("wildberries", ""): (20.0, 80.0, 5.0, 50.0),
+    ("ozon", ""): (18.0, 90.0, 4.0, 50.0),
+    ("ozon", "electronics"): (10.0, 90.0, 4.0, 50.0),
+}
+
+
+def _naive_net(buy_price, sell_price, fees):
+    commission, logistics, return_rate, return_cost = fees
+    return sell_price * (1 - commission / 100) - logistics - return_rate / 100 * return_cost - buy_price
+
+
+def test_matrix_matches_per_pair_calculation():
+    """Векторный расчет совпадает с расчетом по каждой паре, категория переопределяет тариф"""
+    prices = np.array([
+        [1000.0, 1500.0, np.nan],
+        [2000.0, 1800.0, 2100.0],
+    ])
+    categories = np.array(["electronics", ""], dtype=object)
+    pairs = compute_net_arbitrage(prices, fee_matrices(categories, MARKETPLACES, FEE_MODELS), MARKETPLACES)
+
+    # Без цены на Маркете у первого товара остается одна пара в каждую сторону
+    assert pairs["product_index"].tolist() == [0, 0, 1, 1, 1, 1, 1, 1]
+
+    zero = (0.0, 0.0, 0.0, 0.0)
+    for i in range(pairs["product_index"].size):
+        product = pairs["product_index"][i]
+        sell = pairs["sell_marketplace"][i]
+        fees = FEE_MODELS.get((sell, categories[product]), FEE_MODELS.get((sell, ""), zero))
+        expected = _naive_net(pairs["buy_price"][i], pairs["sell_price"][i], fees)
+        assert np.isclose(pairs["net_profit"][i], expected)
+
+
+def test_best_pair_and_ranking():
+    """Лучшая пара товара и места по чистой прибыли"""
+    best = best_net_arbitrage({"wildberries": 1000.0, "ozon": 1500.0, "yandex_market": None}, "electronics", FEE_MODELS)
+    assert (best["buy_marketplace"], best["sell_marketplace"]) == ("wildberries", "ozon")
+    assert np.isclose(best["net_profit"], 1500 * 0.9 - 90 - 2 - 1000)
+    assert best_net_arbitrage({"ozon": 1500.0}, None, FEE_MODELS) is None
+
+    assert rank_by_profit(np.array([10.0, 300.0, -5.0, 120.0])).tolist() == [3, 1, 4, 2]
@@ -0,0 +1,82 @@
+"""
+Тестирование сводок уведомлений
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.config import settings
+from app.services.notification_service import (
+    DUE_KEY,
+    events_key,
+    is_permanent_smtp_error,
+    price_drop_event,
+    render_digest,
+    stage_notifications,
+    task_failure_event,
+)
+
+
+class RecordingPipeline:
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+
+def _anomaly(marketplace, price):
+    return SimpleNamespace(marketplace=marketplace, price=price, baseline=1000.0, change_percent=(price - 1000) / 10)
+
+
+def test_events_coalesce_by_key():
+    """Повторные события о том же товаре и площадке занимают одно поле хеша"""
+    events = [price_drop_event(1, "Чайник", _anomaly("ozon", price)) for price in (700.0, 650.0, 600.0)]
+    pipe = RecordingPipeline()
+    stage_notifications(pipe, "user:5", events)
+
+    (hset, (key,), hset_kwargs), (zadd, (due_key, _), zadd_kwargs) = pipe.commands
+    assert (hset, key) == ("hset", events_key("user:5"))
+    assert list(hset_kwargs["mapping"]) == ["price_drop:1:ozon"]
+    assert '"price": 600.0' in hset_kwargs["mapping"]["price_drop:1:ozon"]
+    assert (zadd, due_key, zadd_kwargs) == ("zadd", DUE_KEY, {"nx": True})
+
+
+def test_render_digest_limits_items(monkeypatch):
+    """Сводка группирует события по видам и обрезается по NOTIFICATION_DIGEST_MAX_ITEMS"""
+    monkeypatch.setattr(settings, "NOTIFICATION_DIGEST_MAX_ITEMS", 3)
+    events = [price_drop_event(i, f"Товар {i}", _anomaly("wildberries", 500.0)) for i in range(5)]
+    events.append(task_failure_event("celery.analytics.refresh_price_analytics_summary", "abc", "timeout"))
+
+    subject, body = render_digest(events)
+
+    assert subject == "Сводка уведомлений: 6 событий"
+    assert "Падения цен (5):" in body
+    assert "… и еще 2" in body
+    assert "Сбои задач (1):" in body
+    assert "… и еще 1" in body
+    assert "-50.0% к обычной 1000.00 ₽" in body
+
+
+def test_permanent_smtp_errors():
+    """Отказ адреса 5xx не повторяется, временные ошибки и отказ входа — повторяются"""
+    SMTPRecipientsRefused = type("SMTPRecipientsRefused", (Exception,), {})
+    SMTPDataError = type("SMTPDataError", (Exception,), {})
+    SMTPAuthenticationError = type("SMTPAuthenticationError", (Exception,), {})
+
+    refused = SMTPRecipientsRefused()
+    refused.recipients = [SimpleNamespace(code=550)]
+    assert is_permanent_smtp_error(refused)
+    refused.recipients = [SimpleNamespace(code=450)]
+    assert not is_permanent_smtp_error(refused)
+
+    rejected = SMTPDataError()
+    rejected.code = 554
+    assert is_permanent_smtp_error(rejected)
+
+    auth = SMTPAuthenticationError()
+    auth.code = 535
+    assert not is_permanent_smtp_error(auth)
+    assert not is_permanent_smtp_error(ConnectionError("timeout"))
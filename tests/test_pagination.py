@@ -0,0 +1,45 @@
+"""
+Тестирование keyset-пагинации
+"""
+import sys
+import os
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.pagination import encode_cursor, decode_cursor, build_page
+
+
+def test_cursor_roundtrip():
+    """Курсор восстанавливает ключ последней строки с исходными типами"""
+    created_at = datetime(2024, 1, 15, 10, 30, 5, 123456)
+    cursor = encode_cursor((created_at, 42))
+
+    assert decode_cursor(cursor, (datetime, int)) == [created_at, 42]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor((1,)), ""])
+def test_invalid_cursor(cursor):
+    """Поврежденный курсор или курсор от другого ключа дает 400"""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, (datetime, int))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_build_page():
+    """Лишняя строка выборки превращается в курсор следующей страницы"""
+    rows = [{"id": i} for i in range(1, 5)]
+
+    items, next_cursor, has_more = build_page(rows, 3, key=lambda row: (row["id"],))
+    assert [row["id"] for row in items] == [1, 2, 3]
+    assert has_more
+    assert decode_cursor(next_cursor, (int,)) == [3]
+
+    items, next_cursor, has_more = build_page(rows, 10, key=lambda row: (row["id"],))
+    assert len(items) == 4
+    assert next_cursor is None
+    assert not has_more
@@ -0,0 +1,34 @@
+"""
+Тестирование оповещений о ценах
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.price_alerts import RULE_BELOW, RULE_DROP_PERCENT, RULE_SPREAD, rule_threshold, _trigger_statement
+
+
+def test_rule_threshold():
+    """Процентное падение хранится как цена срабатывания"""
+    assert rule_threshold(RULE_BELOW, 900.0) == 900.0
+    assert rule_threshold(RULE_DROP_PERCENT, 25.0, 1200.0) == 900.0
+    assert rule_threshold(RULE_SPREAD, 15.0) == 15.0
+
+
+def test_trigger_statement_sql():
+    """Сработавшие правила ищутся диапазоном по порогу и выключаются одним UPDATE"""
+    stmt = _trigger_statement(1, "ozon", 850.0, datetime(2024, 1, 15, 10, 0))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("UPDATE price_alert_rules SET is_active=")
+    assert "price_alert_rules.threshold >= %(threshold_1)s" in sql
+    assert "price_alert_rules.threshold <= (SELECT" in sql
+    assert "UNION ALL" in sql
+    assert "RETURNING price_alert_rules.id" in sql
+    # Условие совпадает с предикатом частичного индекса ix_price_alert_rules_lookup
+    assert "WHERE price_alert_rules.is_active AND price_alert_rules.product_id" in sql
+    assert "price_alert_rules.is_active IS" not in sql
@@ -0,0 +1,154 @@
+"""
+Тестирование потоковой выгрузки истории цен
+"""
+import sys
+import os
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import price_export
+from app.services.price_export import (
+    EXPORT_COLUMNS,
+    _encode_csv,
+    _encode_ndjson,
+    build_export_query,
+    stream_price_history,
+)
+
+ROWS = [
+    (1, 10, "ozon", 1500.0, "RUB", datetime(2024, 1, 15, 10, 37, 12)),
+    (2, 10, 'wildberries, "sale"', 1450.5, "RUB", datetime(2024, 1, 15, 11, 0)),
+    (3, 11, "yandex_market", 990.0, "RUB", None),
+]
+
+
+def compile_sql(query):
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.parametrize("filters, expected, absent", [
+    ({}, [], ["WHERE"]),
+    ({"product_ids": [10, 11]}, ["price_history.product_id IN"], ["marketplace =", "created_at >=", "created_at <"]),
+    ({"marketplace": "ozon"}, ["price_history.marketplace = %(marketplace_1)s"], ["product_id IN"]),
+    (
+        {"since": datetime(2024, 1, 1), "until": datetime(2024, 2, 1)},
+        ["price_history.created_at >= %(created_at_1)s", "price_history.created_at < %(created_at_2)s"],
+        ["product_id IN"],
+    ),
+    (
+        {"product_ids": [10], "marketplace": "ozon", "since": datetime(2024, 1, 1)},
+        ["product_id IN", "marketplace = %(marketplace_1)s", "created_at >= %(created_at_1)s"],
+        ["created_at <"],
+    ),
+])
+def test_export_query_filters(filters, expected, absent):
+    """Каждый фильтр добавляет ровно свое условие, порядок — по id"""
+    sql = compile_sql(build_export_query(**filters))
+
+    assert sql.startswith("SELECT " + ", ".join(f"price_history.{column}" for column in EXPORT_COLUMNS))
+    assert sql.rstrip().endswith("ORDER BY price_history.id")
+    for fragment in expected:
+        assert fragment in sql
+    for fragment in absent:
+        assert fragment not in sql
+
+
+def test_encode_ndjson():
+    """Строка на запись, дата в ISO 8601, пустая дата — null"""
+    lines = _encode_ndjson(ROWS).splitlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[0]) == {
+        "id": 1, "product_id": 10, "marketplace": "ozon", "price": 1500.0,
+        "currency": "RUB", "created_at": "2024-01-15T10:37:12",
+    }
+    assert json.loads(lines[2])["created_at"] is None
+
+
+def test_encode_csv_quoting():
+    """Запятые и кавычки в значениях экранируются, дата — в ISO 8601"""
+    assert _encode_csv(ROWS) == (
+        "1,10,ozon,1500.0,RUB,2024-01-15T10:37:12\r\n"
+        '2,10,"wildberries, ""sale""",1450.5,RUB,2024-01-15T11:00:00\r\n'
+        "3,11,yandex_market,990.0,RUB,\r\n"
+    )
+
+
+class FakeStreamResult:
+    def __init__(self, rows, size):
+        self.rows = rows
+        self.size = size
+
+    async def partitions(self):
+        for start in range(0, len(self.rows), self.size):
+            yield self.rows[start:start + self.size]
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def stream(self, statement):
+        self.statements.append(statement)
+        return FakeStreamResult(self.rows, statement.get_execution_options()["yield_per"])
+
+
+def collect(iterator):
+    async def run():
+        return [chunk async for chunk in iterator]
+    return asyncio.run(run())
+
+
+def test_stream_yields_chunks():
+    """Курсор читается кусками yield_per, каждый кусок кодируется отдельно"""
+    session = FakeSession(ROWS)
+    chunks = collect(stream_price_history(session, "csv", chunk_size=2))
+
+    assert session.statements[0].get_execution_options()["yield_per"] == 2
+    assert chunks[0] == ",".join(EXPORT_COLUMNS) + "\r\n"
+    assert len(chunks) == 3
+    assert chunks[1].count("\r\n") == 2 and chunks[2].count("\r\n") == 1
+
+    ndjson = collect(stream_price_history(FakeSession(ROWS), "ndjson", chunk_size=1))
+    assert len(ndjson) == 3
+
+
+def test_stream_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        collect(stream_price_history(FakeSession(ROWS), "xml"))
+
+
+def test_cli_writes_file(tmp_path, monkeypatch):
+    """CLI передает фильтры в выгрузку и пишет куски в файл"""
+    calls = []
+
+    async def fake_export(fmt, **filters):
+        calls.append((fmt, filters))
+        yield "a\n"
+        yield "b\n"
+
+    async def fake_close_db():
+        pass
+
+    monkeypatch.setattr(price_export, "export_price_history", fake_export)
+    monkeypatch.setattr(price_export, "close_db", fake_close_db)
+    output = tmp_path / "prices.csv"
+
+    price_export.main([
+        "--format", "csv", "--product-id", "10", "--product-id", "11",
+        "--since", "2024-01-01", "--output", str(output),
+    ])
+
+    assert output.read_text(encoding="utf-8") == "a\nb\n"
+    fmt, filters = calls[0]
+    assert fmt == "csv"
+    assert filters["product_ids"] == [10, 11]
+    assert filters["since"] == datetime(2024, 1, 1)
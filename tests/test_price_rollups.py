@@ -0,0 +1,66 @@
+"""
+Тестирование свечей OHLC по истории цен
+"""
+import sys
+import os
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.price_rollup import PriceRollupHourly
+from app.services.price_rollups import (
+    RESOLUTION_RAW,
+    RESOLUTION_HOURLY,
+    RESOLUTION_DAILY,
+    bucket_start,
+    choose_resolution,
+    _rollup_upsert,
+)
+from app.services.price_recorder import _latest_price_upsert
+
+
+def test_bucket_start():
+    """Начало интервала для почасовых и дневных свечей"""
+    ts = datetime(2024, 1, 15, 10, 37, 12, 500)
+
+    assert bucket_start(ts, RESOLUTION_HOURLY) == datetime(2024, 1, 15, 10, 0)
+    assert bucket_start(ts, RESOLUTION_DAILY) == datetime(2024, 1, 15, 0, 0)
+
+    with pytest.raises(ValueError):
+        bucket_start(ts, RESOLUTION_RAW)
+
+
+def test_choose_resolution():
+    """Длинные окна читаются из свечей, а не из сырых записей"""
+    assert choose_resolution(1) == RESOLUTION_RAW
+    assert choose_resolution(7) == RESOLUTION_HOURLY
+    assert choose_resolution(30) == RESOLUTION_DAILY
+    assert choose_resolution(365) == RESOLUTION_DAILY
+
+
+def test_rollup_upsert_sql():
+    """Свеча обновляется одним INSERT ... ON CONFLICT"""
+    stmt = _rollup_upsert(
+        PriceRollupHourly, RESOLUTION_HOURLY, 1, "ozon", 1500.0, datetime(2024, 1, 15, 10, 37)
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (product_id, marketplace, bucket) DO UPDATE" in sql
+    assert "greatest(price_rollup_hourly.high, excluded.high)" in sql
+    assert "least(price_rollup_hourly.low, excluded.low)" in sql
+
+
+def test_latest_price_upsert_ignores_late_observations():
+    """Текущая цена обновляется, только если наблюдение не старше сохраненного"""
+    stmt = _latest_price_upsert(1, "ozon", 1500.0, "RUB", True, datetime(2024, 1, 15, 10, 37))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (product_id, marketplace) DO UPDATE" in sql
+    assert sql.rstrip().endswith(
+        "WHERE product_latest_price.observed_at <= excluded.observed_at "
+        "RETURNING product_latest_price.product_id"
+    )
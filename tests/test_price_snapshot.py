@@ -0,0 +1,104 @@
+"""
+Тестирование выгрузки истории цен в Parquet
+"""
+import sys
+import os
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import price_snapshot
+from app.services.price_snapshot import (
+    WATERMARK_FILE,
+    close_gaps,
+    export_new_price_history,
+    missing_ranges,
+    read_price_snapshot,
+    write_partitions,
+)
+
+
+def row(row_id, marketplace="ozon", day=15):
+    return (row_id, 1, marketplace, 100.0 + row_id, "RUB", datetime(2024, 1, day, 12, 0))
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """Отдает заранее заданные ответы на запросы по порядку"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    async def execute(self, statement):
+        return FakeResult(self.responses.pop(0))
+
+
+def fake_read_session(responses):
+    @asynccontextmanager
+    async def factory():
+        yield FakeSession(responses)
+    return factory
+
+
+def test_missing_ranges():
+    """Пропуски id между отметкой и концом пачки"""
+    assert missing_ranges(1, 10, [1, 2, 5, 6, 10]) == [(3, 4), (7, 9)]
+    assert missing_ranges(1, 3, [1, 2, 3]) == []
+    assert missing_ranges(4, 8, []) == [(4, 8)]
+
+
+def test_close_gaps():
+    """Найденные id закрывают пропуск, устаревшие пропуски забываются"""
+    gaps = [(3, 6, "2024-01-15T12:00:00"), (9, 9, "2024-01-15T11:00:00")]
+    assert close_gaps(gaps, [4], expire_before="2024-01-15T11:30:00") == [
+        (3, 3, "2024-01-15T12:00:00"), (5, 6, "2024-01-15T12:00:00"),
+    ]
+
+
+def test_write_partitions(tmp_path):
+    """Строки раскладываются по разделам дата/площадка и читаются обратно"""
+    rows = [row(1), row(2, "wildberries"), row(3, day=16)]
+    assert write_partitions(str(tmp_path), rows) == 3
+    assert os.path.exists(tmp_path / "date=2024-01-15" / "marketplace=ozon" / "part-1-1.parquet")
+
+    table = read_price_snapshot(str(tmp_path), marketplace="ozon")
+    assert table.column("id").to_pylist() == [1, 3]
+
+
+def test_export_picks_up_late_committed_rows(tmp_path, monkeypatch):
+    """Строка с меньшим id, закоммиченная после большего, не теряется"""
+    root = str(tmp_path)
+    # Первая выгрузка: id 3 еще в незакоммиченной транзакции
+    monkeypatch.setattr(price_snapshot, "get_async_read_session", fake_read_session([[row(1), row(2), row(4)], []]))
+    result = asyncio.run(export_new_price_history(root))
+    assert result == {"rows": 3, "files": 1, "last_id": 4, "gaps": 1}
+
+    # Вторая выгрузка: пропуск перечитывается, id 3 уже виден
+    monkeypatch.setattr(price_snapshot, "get_async_read_session", fake_read_session([[row(3)], []]))
+    result = asyncio.run(export_new_price_history(root))
+    assert result == {"rows": 1, "files": 1, "last_id": 4, "gaps": 0}
+
+    assert sorted(read_price_snapshot(root).column("id").to_pylist()) == [1, 2, 3, 4]
+    with open(os.path.join(root, WATERMARK_FILE), encoding="utf-8") as f:
+        assert json.load(f)["gaps"] == []
+
+
+def test_export_forgets_expired_gaps(tmp_path, monkeypatch):
+    """Пропуск, не заполнившийся за lag_margin, считается откатом"""
+    root = str(tmp_path)
+    monkeypatch.setattr(price_snapshot, "get_async_read_session", fake_read_session([[row(1), row(3)], []]))
+    asyncio.run(export_new_price_history(root))
+
+    monkeypatch.setattr(price_snapshot, "get_async_read_session", fake_read_session([[], []]))
+    result = asyncio.run(export_new_price_history(root, lag_margin=-60))
+    assert result["gaps"] == 0
@@ -0,0 +1,78 @@
+"""
+Тестирование онлайн-статистики рядов цен и обнаружения аномалий
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.models.price_stats import PriceSeriesStats
+from app.services.price_anomalies import detect_anomaly
+from app.services.price_stats import BASELINE_FIELDS, apply_observation, initial_stats, variance, window_start
+
+
+def _series(prices, start, step=timedelta(hours=12), alpha=0.2, window_days=7):
+    stats = PriceSeriesStats(product_id=1, marketplace="ozon", **initial_stats(prices[0], start, window_days))
+    for i, price in enumerate(prices[1:], start=1):
+        apply_observation(stats, price, start + step * i, alpha, window_days)
+    return stats
+
+
+def test_welford_and_ewma_match_batch():
+    """Инкрементальные среднее, дисперсия и EWMA совпадают с расчетом по всей истории"""
+    prices = [1000.0, 1020.0, 990.0, 1100.0, 1100.0, 950.0, 1010.0]
+    stats = _series(prices, datetime(2024, 1, 1))
+
+    assert stats.count == len(prices)
+    assert np.isclose(stats.mean, np.mean(prices))
+    assert np.isclose(variance(stats), np.var(prices, ddof=1))
+    assert (stats.min_price, stats.max_price) == (950.0, 1100.0)
+
+    ewma = prices[0]
+    for price in prices[1:]:
+        ewma = 0.2 * price + 0.8 * ewma
+    assert np.isclose(stats.ewma, ewma)
+
+
+def test_window_rotation_and_late_observation():
+    """Окна сдвигаются по времени, запоздавшее наблюдение не двигает последнюю цену"""
+    start = window_start(datetime(2024, 1, 10), 7)
+    stats = _series([500.0, 400.0], start, step=timedelta(days=1))
+    apply_observation(stats, 600.0, start + timedelta(days=8), 0.2, 7)
+
+    assert stats.window_started_at == start + timedelta(days=7)
+    assert (stats.window_min, stats.window_max) == (600.0, 600.0)
+    assert (stats.prev_window_min, stats.prev_window_max) == (400.0, 500.0)
+
+    apply_observation(stats, 300.0, start + timedelta(days=2), 0.2, 7)
+    assert stats.prev_window_min == 300.0
+    assert stats.last_price == 600.0
+    assert stats.last_changed_at == start + timedelta(days=8)
+
+    # Пропуск больше окна: предыдущее окно пусто
+    apply_observation(stats, 700.0, start + timedelta(days=30), 0.2, 7)
+    assert stats.prev_window_min is None
+
+
+def test_detect_anomaly_rules():
+    """Резкое падение к EWMA отмечается, обычное колебание и короткий ряд — нет"""
+    start = datetime(2024, 1, 1)
+    stats = _series([1000.0, 1010.0, 990.0, 1005.0, 995.0, 1000.0], start)
+    baseline = {field: getattr(stats, field) for field in BASELINE_FIELDS}
+    observed_at = start + timedelta(days=5)
+
+    assert detect_anomaly(baseline, 1002.0, observed_at) is None
+
+    anomaly = detect_anomaly(baseline, 600.0, observed_at)
+    assert anomaly["rule"] == "z_score,percent_drop"
+    assert anomaly["change_percent"] < -30
+
+    # Рост цены ловит только z-оценка
+    assert detect_anomaly(baseline, 1200.0, observed_at)["rule"] == "z_score"
+
+    assert detect_anomaly(None, 600.0, observed_at) is None
+    assert detect_anomaly(dict(baseline, count=2), 600.0, observed_at) is None
+    assert detect_anomaly(baseline, 600.0, start) is None
@@ -0,0 +1,41 @@
+"""
+Тестирование разбора файлов массовой загрузки товаров
+"""
+import io
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.product_import import iter_records
+
+
+def test_csv_records():
+    """Пустые ячейки CSV становятся None, ссылки — строками"""
+    source = io.StringIO(
+        "name,wildberries_url,ozon_id\n"
+        "iPhone 15,https://www.wildberries.ru/catalog/1/detail.aspx,\n"
+        "\"Чехол, силикон\",,12345\n"
+    )
+    records = list(iter_records(source, "csv"))
+
+    assert [error for _, error in records] == [None, None]
+    assert records[0][0]["wildberries_url"] == "https://www.wildberries.ru/catalog/1/detail.aspx"
+    assert records[0][0]["ozon_id"] is None
+    assert records[1][0]["name"] == "Чехол, силикон"
+    assert records[1][0]["ozon_id"] == "12345"
+
+
+def test_ndjson_bad_rows_do_not_stop_import():
+    """Битый JSON и строка без названия считаются ошибками, остальные загружаются"""
+    source = io.StringIO(
+        '{"name": "iPhone 15"}\n'
+        '{not json\n'
+        '\n'
+        '{"ozon_url": "https://ozon.ru/product/1"}\n'
+        '{"name": "Galaxy S23"}\n'
+    )
+    records = list(iter_records(source, "ndjson"))
+
+    assert [values["name"] for values, _ in records if values] == ["iPhone 15", "Galaxy S23"]
+    assert [error.split(":")[0] for _, error in records if error] == ["строка 2", "строка 4"]
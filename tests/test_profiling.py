@@ -0,0 +1,55 @@
+"""
+Тестирование выборочного профилирования
+"""
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.config import settings
+from app.utils import profiling
+from app.utils.profiling import ProfilingMiddleware, StackSampler
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def test_sampler_writes_folded_stacks(tmp_path, monkeypatch):
+    """Занятая функция попадает в свернутые стеки вместе с вызывающим кадром"""
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    sampler = StackSampler(interval=0.001).start()
+    busy_loop(0.1)
+    sampler.stop()
+
+    path = sampler.write("task", "analytics.refresh summary")
+    assert os.path.basename(path).startswith("task-analytics.refresh_summary-")
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "test_sampler_writes_folded_stacks (test_profiling.py:" in stack
+    assert stack.index("test_sampler_writes_folded_stacks") < stack.index("busy_loop (test_profiling.py:")
+
+
+def test_middleware_passes_through_when_not_sampled(monkeypatch):
+    """Без выборки и заголовка запрос уходит в приложение без сэмплера"""
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "PROFILE_ALLOW_HEADER", False)
+    monkeypatch.setattr(profiling, "StackSampler", None)
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+
+    scope = {"type": "http", "method": "GET", "path": "/prices/1", "headers": [(b"x-profile", b"1")]}
+    asyncio.run(ProfilingMiddleware(app)(scope, None, None))
+    assert calls == ["/prices/1"]
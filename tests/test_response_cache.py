@@ -0,0 +1,137 @@
+"""
+Тестирование кеша HTTP-ответов
+"""
+import sys
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from starlette.requests import Request
+
+from app.config import settings
+from app.utils import cache
+
+
+class FakeRedis:
+    """Словарь вместо Redis: GET/SET NX/INCR и конвейер поверх них"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value) if not isinstance(value, (bytes, str)) else value
+        if ex:
+            self.ttl[key] = ex
+        return True
+
+    def pipeline(self, transaction=True):
+        redis = self
+        commands = []
+
+        class Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def set(self, key, value, nx=False, ex=None):
+                commands.append(("set", key, value, nx, ex))
+
+            def incr(self, key):
+                commands.append(("incr", key))
+
+            async def execute(self):
+                for command in commands:
+                    if command[0] == "set":
+                        await redis.set(command[1], command[2], nx=command[3], ex=command[4])
+                    else:
+                        redis.data[command[1]] = str(int(redis.data.get(command[1], 0)) + 1)
+
+        return Pipeline()
+
+
+def make_request():
+    return Request({"type": "http", "method": "GET", "path": "/prices/1/comparison", "query_string": b"", "headers": []})
+
+
+def test_invalidate_seeds_missing_version(monkeypatch):
+    """После очистки Redis версия засевается временем, а не начинается с 1"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+    monkeypatch.setattr(cache, "_initial_version", lambda: 1700000000000)
+
+    asyncio.run(cache.invalidate_product_cache(1))
+    assert redis.data[cache._version_key(1)] == "1700000000001"
+    assert redis.ttl[cache._version_key(1)] == settings.RESPONSE_CACHE_TTL
+
+    asyncio.run(cache.invalidate_product_cache(1))
+    assert redis.data[cache._version_key(1)] == "1700000000002"
+
+
+def test_cache_miss_builds_from_primary(monkeypatch):
+    """Тело, которое попадет в кеш, читается с основной базы, а не с реплики"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+    used = []
+
+    def session_factory(name):
+        @asynccontextmanager
+        async def factory():
+            used.append(name)
+            yield name
+        return factory
+
+    monkeypatch.setattr(cache, "get_async_session", session_factory("primary"))
+    monkeypatch.setattr(cache, "get_async_read_session", session_factory("replica"))
+
+    async def build(session):
+        return f'{{"session": "{session}"}}'.encode()
+
+    response = asyncio.run(cache.cached_json_response(make_request(), 1, build))
+    assert response.body == b'{"session": "primary"}'
+    assert used == ["primary"]
+
+    # Повторный запрос отдается из кеша без сборки
+    asyncio.run(cache.cached_json_response(make_request(), 1, build))
+    assert used == ["primary"]
+
+
+def test_scope_invalidation_changes_etag(monkeypatch):
+    """Смена тарифов меняет ETag сравнения, хотя версия товара та же"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+
+    @asynccontextmanager
+    async def factory():
+        yield None
+
+    monkeypatch.setattr(cache, "get_async_session", factory)
+
+    async def build(session):
+        return b"{}"
+
+    async def etag():
+        response = await cache.cached_json_response(make_request(), 1, build, scopes=(cache.FEES_SCOPE,))
+        return response.headers["ETag"]
+
+    before = asyncio.run(etag())
+    asyncio.run(cache.invalidate_cache_scope(cache.FEES_SCOPE))
+    assert asyncio.run(etag()) != before
+
+
+def test_seeded_version_expires(monkeypatch):
+    """Версия, засеянная запросом к товару, получает TTL — даже если товара нет"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "async_redis_client", redis)
+
+    asyncio.run(cache.get_product_version(404))
+    assert redis.ttl[cache._version_key(404)] == settings.RESPONSE_CACHE_TTL
@@ -0,0 +1,28 @@
+"""
+Тестирование токенов доступа
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.security import create_access_token, decode_access_token
+
+
+def test_token_roundtrip():
+    """Токен возвращает ID пользователя, для которого выдан"""
+    assert decode_access_token(create_access_token(42)) == 42
+
+
+def test_tampered_token():
+    """Подмена payload ломает подпись"""
+    payload, signature = create_access_token(42).split(".")
+    forged_payload = create_access_token(1).split(".")[0]
+
+    assert decode_access_token(f"{forged_payload}.{signature}") is None
+    assert decode_access_token("garbage") is None
+
+
+def test_expired_token():
+    """Истекший токен не принимается"""
+    assert decode_access_token(create_access_token(42, expires_in=-1)) is None